@@ -0,0 +1,86 @@
+
+import os
+import shutil
+import tempfile
+import uuid
+
+from config import logger
+
+# RAM-backed where the OS has it, so handing a batch over never touches the disk
+SHARED_MEMORY_DIR = '/dev/shm'
+
+
+def arrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def make_handoff_dir():
+    """Private directory for one pool run's IPC files; remove it with remove_handoff_dir"""
+    base = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK) else None
+    return tempfile.mkdtemp(prefix='harvest-arrow-', dir=base)
+
+
+def remove_handoff_dir(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def write_frame(frame, directory):
+    """Write a DataFrame as an Arrow IPC file in directory; returns the reference to send back instead.
+
+    Runs in the worker process. The reference is a small dict (path and
+    row count), so the parent receives a few bytes instead of a pickled
+    frame, and maps the data itself with open_table.
+    """
+    import pyarrow as pa
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    path = os.path.join(directory, f'{uuid.uuid4().hex}.arrow')
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return {'arrow_path': path, 'rows': table.num_rows}
+
+
+def is_reference(result):
+    return isinstance(result, dict) and 'arrow_path' in result
+
+
+def open_table(reference):
+    """Memory-map a handed over batch as a pyarrow Table, without copying it.
+
+    The file is unlinked right away: the mapping keeps the data alive for as
+    long as the table is referenced. Where an open mapping cannot be
+    unlinked (Windows) it is left to remove_handoff_dir.
+    """
+    import pyarrow as pa
+    path = reference['arrow_path']
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.debug(f"Could not remove {path} yet: {e}")
+    return table
+
+
+def read_frame(reference):
+    """Handed over batch as a DataFrame over the mapped file, without copying the data.
+
+    String columns become pyarrow-backed StringDtype columns that wrap the
+    mapped buffers (what pandas 3 does by default; older pandas would build
+    Python str objects), and split_blocks keeps numeric columns as views
+    instead of consolidating them into a new block.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    try:
+        # pandas 3's default str dtype, so frames match the ones read in-process
+        strings = pd.StringDtype('pyarrow', na_value=float('nan'))
+    except TypeError:
+        strings = pd.StringDtype('pyarrow')
+    return open_table(reference).to_pandas(
+        split_blocks=True,
+        types_mapper=lambda arrow_type: strings if arrow_type in (pa.string(), pa.large_string()) else None
+    )
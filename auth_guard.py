@@ -0,0 +1,138 @@
+
+import re
+
+from config import logger
+
+TOKEN_VALID = 'valid'
+TOKEN_INVALID = 'invalid'
+TOKEN_UNKNOWN = 'unknown'
+
+# The auth_token cookie x.com sets is 40 hex characters
+TOKEN_PATTERN = re.compile(r'^[0-9a-f]{40}$', re.IGNORECASE)
+PREFLIGHT_URL = 'https://x.com/home'
+PREFLIGHT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36'
+
+
+def mask_token(token):
+    if not token or len(token) <= 8:
+        return '****'
+    return f"{token[:4]}...{token[-4:]}"
+
+
+def is_placeholder_token(token):
+    return not token or token == 'your_auth_token_here'
+
+
+def check_token_format(token):
+    return bool(token) and bool(TOKEN_PATTERN.match(token.strip()))
+
+
+def preflight_token(token, timeout=5):
+    """Cheaply check a token before spending a batch on it; returns (status, detail).
+
+    x.com/home is requested with only the auth_token cookie: a redirect to
+    the login flow or a response that clears the cookie means the session
+    is dead, a plain 200 means it is alive. This is a heuristic, so network
+    trouble or an unexpected answer gives TOKEN_UNKNOWN and the batch goes
+    ahead. A token that does not look like the usual 40 hex characters is
+    only warned about, since the cookie format is not ours to decide.
+    """
+    if not token or not token.strip():
+        return TOKEN_INVALID, 'No token'
+    if not check_token_format(token):
+        logger.warning(f"Auth token {mask_token(token)} is not the usual 40 character hex auth_token cookie, "
+                       f"checking it anyway")
+
+    # urllib pulls in http.client and email; only pay for that when a check actually runs
+    import urllib.error
+    import urllib.request
+
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, req, fp, code, msg, headers, newurl):
+            return None
+
+    request = urllib.request.Request(PREFLIGHT_URL, headers={
+        'Cookie': f'auth_token={token.strip()}',
+        'User-Agent': PREFLIGHT_USER_AGENT,
+    })
+    opener = urllib.request.build_opener(NoRedirect)
+    try:
+        response = opener.open(request, timeout=timeout)
+        status, headers = response.status, response.headers
+        response.close()
+    except urllib.error.HTTPError as e:
+        status, headers = e.code, e.headers
+    except (urllib.error.URLError, OSError) as e:
+        return TOKEN_UNKNOWN, f"Preflight request failed: {getattr(e, 'reason', e)}"
+
+    cookies = headers.get_all('Set-Cookie') or []
+    if any(re.match(r'auth_token=(?:;|""|$)', cookie) for cookie in cookies):
+        return TOKEN_INVALID, 'x.com cleared the auth_token cookie'
+    if 300 <= status < 400:
+        location = headers.get('Location', '')
+        if 'login' in location or 'logout' in location:
+            return TOKEN_INVALID, 'x.com redirected to the login page'
+        return TOKEN_UNKNOWN, f"Unexpected redirect to {location}"
+    if status in (401, 403):
+        return TOKEN_INVALID, f"x.com answered HTTP {status}"
+    if status == 200:
+        return TOKEN_VALID, 'Session is active'
+    return TOKEN_UNKNOWN, f"Unexpected HTTP {status}"
+
+
+class AuthCircuitBreaker:
+    """Stops a batch from burning jobs on a token the harvester keeps rejecting.
+
+    Every finished job is reported with record(). Only jobs that failed on
+    an auth error before fetching anything count. After threshold consecutive
+    auth failures on the current token that token is retired and the next
+    one in the pool takes over; when the pool is exhausted the breaker trips
+    and batch_scrape stops scheduling jobs. Results from jobs that were
+    started with an already retired token are ignored.
+    """
+
+    def __init__(self, tokens, threshold=3):
+        self.tokens = []
+        for token in tokens:
+            if not is_placeholder_token(token) and token not in self.tokens:
+                self.tokens.append(token)
+        self.threshold = max(1, int(threshold))
+        self.index = 0
+        self.failures = 0
+        self.retired = []
+
+    @property
+    def tripped(self):
+        return self.index >= len(self.tokens)
+
+    @property
+    def current_token(self):
+        return None if self.tripped else self.tokens[self.index]
+
+    @property
+    def has_backup(self):
+        return self.index + 1 < len(self.tokens)
+
+    def record(self, token, result):
+        if token is None or token != self.current_token:
+            return
+        # A job that fetched tweets was logged in, whatever else it printed
+        if result.get('auth_error') and not result.get('harvest', {}).get('tweets_reported'):
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self._retire_current()
+        elif result.get('success'):
+            self.failures = 0
+
+    def _retire_current(self):
+        token = self.current_token
+        self.retired.append(token)
+        self.index += 1
+        self.failures = 0
+        if self.tripped:
+            logger.error(f"Auth token {mask_token(token)} rejected {self.threshold} times in a row and no backup token is left")
+        else:
+            logger.warning(
+                f"Auth token {mask_token(token)} rejected {self.threshold} times in a row, "
+                f"failing over to {mask_token(self.current_token)}"
+            )
@@ -0,0 +1,60 @@
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+MODULES = ['config', 'twitter_scraper', 'cli', 'gui']
+HEAVY_MODULES = ['pandas', 'numpy', 'PIL']
+SIDE_EFFECT_PATHS = ['.env', 'logs']
+
+CHECK_SNIPPET = (
+    "import sys, {module}; "
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+def time_command(code, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, capture_output=True, text=True)
+        samples.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1:]
+    return samples, result.stdout.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time a cold import of each entry module in a fresh interpreter")
+    parser.add_argument('-n', '--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    existing = {name for name in SIDE_EFFECT_PATHS if (REPO_DIR / name).exists()}
+
+    baseline, _ = time_command('pass', args.runs)
+    baseline_ms = statistics.median(baseline) * 1000
+    print(f"{'interpreter':<16} {baseline_ms:8.1f} ms")
+
+    for module in MODULES:
+        samples, output = time_command(CHECK_SNIPPET.format(module=module, heavy=HEAVY_MODULES), args.runs)
+        if samples is None:
+            print(f"{module:<16} {'n/a':>8}    ({' '.join(output)})")
+            continue
+        median_ms = statistics.median(samples) * 1000
+        heavy = f"loads {output}" if output else "no heavy imports"
+        print(f"{module:<16} {median_ms:8.1f} ms  (+{median_ms - baseline_ms:.1f} ms over bare interpreter, {heavy})")
+
+    created = [name for name in SIDE_EFFECT_PATHS if name not in existing and (REPO_DIR / name).exists()]
+    if created:
+        print(f"Importing created files: {', '.join(created)}")
+    else:
+        print("Importing created no files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+
+import argparse
+import re
+import sys
+
+from config import config, ensure_env_file, setup_logging
+from process_control import CancelToken
+from twitter_scraper import (
+    TwitterScraper, EVENT_STARTED, EVENT_LINE, EVENT_PROGRESS, EVENT_RETRY, EVENT_FINISHED, EVENT_FAILED, EVENT_DONE
+)
+from harvest_parser import OUTPUT_TWEETS
+
+
+def parse_keywords(values):
+    keywords = []
+    use_quotes = []
+    for value in values:
+        value = value.strip()
+        if not value:
+            continue
+        quoted_match = re.match(r'^"(.+)"$', value)
+        if quoted_match:
+            keywords.append(quoted_match.group(1))
+            use_quotes.append(True)
+        else:
+            keywords.append(value)
+            use_quotes.append(False)
+    return keywords, use_quotes
+
+
+def cmd_scrape(args):
+    keywords, use_quotes = parse_keywords(args.keywords)
+    if not keywords:
+        print("Please provide at least one keyword", file=sys.stderr)
+        return 2
+
+    scraper = TwitterScraper(auth_token=args.token, output_dir=args.output_dir)
+    if args.retries is not None:
+        scraper.retry_policy.max_attempts = max(1, args.retries)
+    cancel_token = CancelToken()
+    results = None
+
+    events = scraper.iter_batch_scrape(
+        keywords, args.start, args.end,
+        interval=args.interval,
+        use_quotes=use_quotes,
+        limit=args.limit,
+        lang=args.lang,
+        tab=args.tab,
+        journal_path=args.journal,
+        cancel_token=cancel_token,
+        max_concurrent=args.concurrency,
+        preflight=args.preflight
+    )
+    # A redrawn status line only makes sense on a terminal and when raw output is not interleaved
+    live = sys.stdout.isatty() and not args.verbose
+    status_shown = False
+
+    # Harvesters run in their own process group and never see Ctrl+C themselves;
+    # iter_batch_scrape turns the interrupt into cancel_token.cancel()
+    for event in events:
+        if event.kind == EVENT_PROGRESS:
+            if live and event.output.kind == OUTPUT_TWEETS:
+                output = event.output
+                sys.stdout.write(f"\r    [{event.job_number}] {output.tweets}/{args.limit} tweets, "
+                                 f"{output.tweets_per_second:.1f}/s\033[K")
+                sys.stdout.flush()
+                status_shown = True
+            continue
+        if status_shown:
+            sys.stdout.write("\r\033[K")
+            status_shown = False
+
+        if event.kind == EVENT_LINE:
+            if args.verbose:
+                print(f"    {event.line}")
+        elif event.kind == EVENT_STARTED:
+            print(f"[{event.job_number}/{event.total_jobs}] {event.keyword} {event.start_date} to {event.end_date}")
+        elif event.kind == EVENT_FINISHED:
+            print(f"    ok: {event.result.get('tweet_count')} tweets -> {event.result['path']}")
+        elif event.kind == EVENT_RETRY:
+            print(f"    attempt {event.result['attempt']} failed: {event.result.get('reason', 'Unknown error')}, "
+                  f"retrying in {event.result['retry_in']:.0f}s")
+        elif event.kind == EVENT_FAILED:
+            print(f"    failed: {event.result.get('reason', 'Unknown error')}")
+        elif event.kind == EVENT_DONE:
+            results = event.result
+
+    if 'total_jobs' not in results:
+        print(f"Batch not started: {results.get('reason', 'Unknown error')}", file=sys.stderr)
+        return 1
+
+    print(f"Completed {results['successful_jobs']}/{results['total_jobs']} jobs in {results['total_duration']:.1f}s"
+          f" ({results['retried_attempts']} retried attempts)")
+    if results['cancelled']:
+        print(f"Cancelled after {results['completed_jobs']} jobs")
+        return 130
+    if results['auth_halted']:
+        print(f"Halted after {results['completed_jobs']} jobs: {results['halt_reason']}", file=sys.stderr)
+        return 1
+    return 0 if results['overall_success'] else 1
+
+
+def cmd_query(args):
+    from corpus_query import CorpusQuery
+
+    output_dir = args.output_dir or config['output_dir']
+    keywords = parse_keywords(args.keywords)[0] or None
+    columns = [column.strip() for column in args.columns.split(',') if column.strip()] if args.columns else None
+    engine = CorpusQuery(output_dir, max_workers=args.workers)
+    filters = dict(keywords=keywords, start_date=args.start, end_date=args.end, lang=args.lang,
+                   user=args.user, text=args.text)
+    clusters = dict(clusters=args.clusters, collapse=args.collapse)
+
+    if args.count and not args.collapse:
+        print(engine.count(**filters))
+        return 0
+
+    if args.count:
+        print(sum(len(frame) for frame in engine.iter_frames(columns=['keyword'], **filters, **clusters)))
+        return 0
+
+    if args.out:
+        # Frames are appended one file at a time so the full result is never held in memory
+        rows = 0
+        for frame in engine.iter_frames(columns=columns, **filters, **clusters):
+            frame.to_csv(args.out, mode='a' if rows else 'w', header=not rows, index=False)
+            rows += len(frame)
+        print(f"Wrote {rows} tweets to {args.out}")
+        return 0
+
+    header = True
+    for frame in engine.iter_frames(columns=columns, **filters, **clusters):
+        frame.to_csv(sys.stdout, header=header, index=False)
+        header = False
+    return 0
+
+
+def cmd_search(args):
+    from ingest import reingest_all
+    from search_index import SearchIndex
+
+    output_dir = args.output_dir or config['output_dir']
+    if args.reindex:
+        files = reingest_all(output_dir, on_file=lambda entry: print(f"indexed {entry['path']}"))
+        print(f"Reindexed {files} files")
+        if not args.query:
+            return 0
+    if not args.query:
+        print("Please provide a search query", file=sys.stderr)
+        return 2
+
+    index = SearchIndex(output_dir)
+    try:
+        if args.count:
+            print(index.count(args.query))
+            return 0
+        hits = index.search(args.query, limit=args.limit, keyword=args.keyword)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    for hit in hits:
+        text = ' '.join((hit['full_text'] or '').split())
+        print(f"{hit['created_at']}  @{hit['username']}  [{hit['keyword']}]  {text}")
+    return 0
+
+
+def cmd_rollups(args):
+    import csv
+    from ingest import reingest_all
+    from rollups import RollupStore
+
+    output_dir = args.output_dir or config['output_dir']
+    if args.reindex:
+        print(f"Reindexed {reingest_all(output_dir)} files", file=sys.stderr)
+
+    keywords = parse_keywords(args.keywords)[0] or None
+    series = RollupStore(output_dir).series(keywords, args.start, args.end, granularity=args.by)
+    columns = ['keyword', 'period', 'tweets', 'authors', 'favorites', 'retweets', 'replies', 'quotes']
+
+    out = open(args.out, 'w', newline='', encoding='utf-8') if args.out else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(series)
+    finally:
+        if args.out:
+            out.close()
+            print(f"Wrote {len(series)} rows to {args.out}")
+    return 0
+
+
+def cmd_top(args):
+    from rollups import RollupStore
+
+    output_dir = args.output_dir or config['output_dir']
+    keywords = parse_keywords(args.keywords)[0] or None
+    store = RollupStore(output_dir)
+    if args.kind == 'authors':
+        print(f"~{store.approx_authors(keywords, args.start, args.end)} distinct authors")
+        return 0
+    for term, count in store.top_terms(args.kind, keywords, args.start, args.end, k=args.limit):
+        print(f"{count:>10}  {term}")
+    return 0
+
+
+def cmd_dupes(args):
+    from dedup import DedupIndex
+    from search_index import SearchIndex
+
+    output_dir = args.output_dir or config['output_dir']
+    index = DedupIndex(output_dir)
+    stats = index.stats()
+    print(f"{stats['tweets']} tweets in {stats['clusters']} clusters ({stats['duplicates']} near-duplicates)")
+    largest = index.largest_clusters(limit=args.limit, min_size=args.min_size)
+    samples = SearchIndex(output_dir).fetch(cluster_id for cluster_id, _ in largest)
+    for cluster_id, size in largest:
+        text = ' '.join((samples.get(cluster_id, {}).get('full_text') or '').split())
+        print(f"{size:>8}  {cluster_id}  {text[:100]}")
+    return 0
+
+
+def cmd_graph(args):
+    from graph_builder import build_graphs
+
+    output_dir = args.output_dir or config['output_dir']
+    keywords = parse_keywords(args.keywords)[0] or None
+    written = build_graphs(output_dir, window=args.by, keywords=keywords, start_date=args.start,
+                           end_date=args.end, target_dir=args.out)
+    for period, counts in sorted(written.items()):
+        print(f"{period}  {counts['tweets']:>9} tweets  "
+              f"{counts['mentions']['nodes']:>8} users / {counts['mentions']['edges']:>9} mentions  "
+              f"{counts['hashtags']['nodes']:>7} hashtags / {counts['hashtags']['edges']:>9} pairs")
+    if not written:
+        print("No tweets matched", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Tweet Harvest Agent command line interface")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scrape = subparsers.add_parser('scrape', help="Run a batch scrape")
+    scrape.add_argument('keywords', nargs='+', help='Keywords; wrap in double quotes for exact phrases')
+    scrape.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
+    scrape.add_argument('--end', required=True, help='End date (YYYY-MM-DD)')
+    scrape.add_argument('--interval', default='monthly',
+                        choices=['yearly', 'quarterly', 'monthly', 'weekly', 'daily'])
+    scrape.add_argument('--limit', type=int, default=config['default_limit'])
+    scrape.add_argument('--lang', default=config['default_lang'])
+    scrape.add_argument('--tab', default=config['default_tab'], choices=['LATEST', 'TOP'])
+    scrape.add_argument('--output-dir', default=None)
+    scrape.add_argument('--token', default=None, help='Auth token (defaults to AUTH_TOKEN from .env)')
+    scrape.add_argument('-j', '--concurrency', type=int, default=None,
+                        help='Harvesters to run at the same time (defaults to MAX_CONCURRENT_JOBS)')
+    scrape.add_argument('--journal', default=None,
+                        help='Append per-job results to this JSONL file instead of keeping them in memory')
+    scrape.add_argument('--retries', type=int, default=None,
+                        help='Attempts per job for transient failures (defaults to RETRY_MAX_ATTEMPTS)')
+    scrape.add_argument('--no-preflight', dest='preflight', action='store_false', default=None,
+                        help='Skip the auth token check before the batch starts')
+    scrape.add_argument('-v', '--verbose', action='store_true', help='Print harvester output')
+    scrape.set_defaults(func=cmd_scrape)
+
+    query = subparsers.add_parser('query', help="Filter already scraped tweets")
+    query.add_argument('keywords', nargs='*', help='Only these keywords (default: all)')
+    query.add_argument('--start', default=None, help='First tweet date (YYYY-MM-DD, UTC)')
+    query.add_argument('--end', default=None, help='Last tweet date (YYYY-MM-DD, UTC)')
+    query.add_argument('--lang', default=None)
+    query.add_argument('--user', default=None, help='Only tweets by this username')
+    query.add_argument('--text', default=None, help='Only tweets containing this text (case-insensitive)')
+    query.add_argument('--columns', default=None,
+                       help='Comma-separated columns to output, e.g. keyword,created_at,full_text')
+    query.add_argument('--count', action='store_true', help='Only print the number of matching tweets')
+    query.add_argument('--clusters', action='store_true', help='Add a cluster_id column (near-duplicate group)')
+    query.add_argument('--collapse', action='store_true',
+                       help='Keep one tweet per near-duplicate cluster, so copy-paste text counts once')
+    query.add_argument('--out', default=None, help='Write matches to this CSV instead of stdout')
+    query.add_argument('--output-dir', default=None)
+    query.add_argument('-j', '--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    query.set_defaults(func=cmd_query)
+
+    search = subparsers.add_parser('search', help="Full-text search over scraped tweets")
+    search.add_argument('query', nargs='?', default=None,
+                        help='Words, "exact phrases", #hashtags, @mentions, AND / OR / NOT, prefix*')
+    search.add_argument('--keyword', default=None, help='Only tweets scraped for this keyword')
+    search.add_argument('--limit', type=int, default=50)
+    search.add_argument('--count', action='store_true', help='Only print the number of matching tweets')
+    search.add_argument('--reindex', action='store_true',
+                        help='Ingest every scraped file first (for data scraped before search existed)')
+    search.add_argument('--output-dir', default=None)
+    search.set_defaults(func=cmd_search)
+
+    rollups = subparsers.add_parser('rollups', help="Export tweet volume per keyword and day or hour")
+    rollups.add_argument('keywords', nargs='*', help='Only these keywords (default: all)')
+    rollups.add_argument('--by', default='day', choices=['day', 'hour'])
+    rollups.add_argument('--start', default=None, help='First date (YYYY-MM-DD, UTC)')
+    rollups.add_argument('--end', default=None, help='Last date (YYYY-MM-DD, UTC)')
+    rollups.add_argument('--out', default=None, help='Write CSV to this file instead of stdout')
+    rollups.add_argument('--reindex', action='store_true',
+                         help='Rebuild from every scraped file first (for data scraped before rollups existed)')
+    rollups.add_argument('--output-dir', default=None)
+    rollups.set_defaults(func=cmd_rollups)
+
+    top = subparsers.add_parser('top', help="Approximate top hashtags, mentions or domains, or distinct authors")
+    top.add_argument('kind', choices=['hashtags', 'mentions', 'domains', 'authors'])
+    top.add_argument('keywords', nargs='*', help='Only these keywords (default: all)')
+    top.add_argument('--start', default=None, help='First date (YYYY-MM-DD, UTC)')
+    top.add_argument('--end', default=None, help='Last date (YYYY-MM-DD, UTC)')
+    top.add_argument('-k', '--limit', type=int, default=20)
+    top.add_argument('--output-dir', default=None)
+    top.set_defaults(func=cmd_top)
+
+    dupes = subparsers.add_parser('dupes', help="Show the largest near-duplicate (copy-paste) clusters")
+    dupes.add_argument('-n', '--limit', type=int, default=20)
+    dupes.add_argument('--min-size', type=int, default=2)
+    dupes.add_argument('--output-dir', default=None)
+    dupes.set_defaults(func=cmd_dupes)
+
+    graph = subparsers.add_parser('graph', help="Build mention and hashtag co-occurrence matrices per time window")
+    graph.add_argument('keywords', nargs='*', help='Only these keywords (default: all)')
+    graph.add_argument('--by', choices=['day', 'week', 'month'], default='month')
+    graph.add_argument('--start', default=None, help='First day (YYYY-MM-DD)')
+    graph.add_argument('--end', default=None, help='Last day (YYYY-MM-DD)')
+    graph.add_argument('--out', default=None, help='Target directory (default: <output dir>/graphs)')
+    graph.add_argument('--output-dir', default=None)
+    graph.set_defaults(func=cmd_graph)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    ensure_env_file()
+    setup_logging()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
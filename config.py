@@ -1,57 +1,195 @@
 
 import os
+import sys
+import atexit
 import logging
+import logging.handlers
+import queue
+from collections.abc import MutableMapping
 from pathlib import Path
-from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).parent.absolute()
 ENV_FILE = BASE_DIR / '.env'
 
-def setup_logging(log_level=logging.INFO):
+_log_listener = None
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _log_file():
+    # One file per process: rotating a shared file fails on Windows while another process has it open
     log_dir = BASE_DIR / 'logs'
     log_dir.mkdir(exist_ok=True)
+    return log_dir / f'twitter_agent_{os.getpid()}.log'
+
+def _file_formatter(text_formatter):
+    from log_handlers import JsonLinesFormatter
+    return JsonLinesFormatter() if config['log_format'] == 'json' else text_formatter
+
+def setup_logging(log_level=logging.INFO):
+    """Route all logging through a queue to a console handler and this process's rotating log file.
+
+    Callers (including the harvester output readers) only enqueue records; a
+    QueueListener thread formats and writes them. The file is
+    logs/twitter_agent_<pid>.log, owned by this process alone, and rotates
+    by size (LOG_MAX_BYTES, LOG_BACKUP_COUNT) or daily (LOG_ROTATION=daily);
+    LOG_FORMAT=json writes compact JSON lines instead of text. Raw harvester
+    lines go through harvester_logger, sampled to LOG_HARVESTER_LINES_PER_SEC.
+    Safe to call more than once.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return logger
+    
+    from log_handlers import RateLimitFilter
     
-    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    date_format = '%Y-%m-%d %H:%M:%S'
+    text_formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
     
-    logging.basicConfig(
-        level=log_level,
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(log_dir / f'twitter_agent_{os.getpid()}.log')
-        ]
-    )
+    log_file = _log_file()
+    if config['log_rotation'] == 'daily':
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when='midnight', backupCount=config['log_backup_count'], encoding='utf-8', delay=True
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=config['log_max_bytes'], backupCount=config['log_backup_count'],
+            encoding='utf-8', delay=True
+        )
+    file_handler.setFormatter(_file_formatter(text_formatter))
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(text_formatter)
+    
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(log_level)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    harvester_logger.addFilter(RateLimitFilter(config['log_harvester_lines_per_sec']))
     
-    return logging.getLogger('TwitterAgent')
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler)
+    _log_listener.start()
+    atexit.register(stop_logging)
+    
+    return logger
 
-def load_config():
+def setup_worker_logging():
+    """Initializer for worker process pools: log straight to this process's own file.
+
+    A forked worker inherits the parent's QueueHandler, but the listener
+    thread draining it only exists in the parent, so records would pile up
+    unread. Workers write directly instead (they log little), and their file
+    is only created if they log anything at all.
+    """
+    global _log_listener
+    _log_listener = None
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    for log_filter in list(harvester_logger.filters):
+        harvester_logger.removeFilter(log_filter)
+    
+    text_formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+    file_handler = logging.FileHandler(_log_file(), encoding='utf-8', delay=True)
+    file_handler.setFormatter(_file_formatter(text_formatter))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(text_formatter)
+    root_logger.addHandler(stream_handler)
+    root_logger.addHandler(file_handler)
+    root_logger.setLevel(logging.INFO)
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+def ensure_env_file():
+    """Create .env from .env.example on first run; called by the gui, launch and cli entry points"""
     if not ENV_FILE.exists():
         if (BASE_DIR / '.env.example').exists():
             with open(BASE_DIR / '.env.example', 'r') as example_file:
                 with open(ENV_FILE, 'w') as env_file:
                     env_file.write(example_file.read())
-            print(f"Created .env file. Please edit {ENV_FILE} with your settings.")
+            # stderr, so a first 'cli.py query' run still writes clean CSV to stdout
+            print(f"Created .env file. Please edit {ENV_FILE} with your settings.", file=sys.stderr)
         else:
-            print("Warning: .env.example file not found.")
-    
+            print("Warning: .env.example file not found.", file=sys.stderr)
+
+def load_config():
+    from dotenv import load_dotenv
     load_dotenv(ENV_FILE)
     
     config = {
         'auth_token': os.getenv('AUTH_TOKEN', ''),
+        'auth_tokens': [t.strip() for t in os.getenv('AUTH_TOKENS', '').split(',') if t.strip()],
+        'auth_failure_threshold': int(os.getenv('AUTH_FAILURE_THRESHOLD', '3')),
+        'auth_preflight': os.getenv('AUTH_PREFLIGHT', '1').strip().lower() not in ('0', 'false', 'no', ''),
         'output_dir': os.getenv('OUTPUT_DIR', str(BASE_DIR / 'scraped_tweets')),
         'default_lang': os.getenv('DEFAULT_LANG', 'id'),
         'default_tab': os.getenv('DEFAULT_TAB', 'LATEST'),
         'default_limit': int(os.getenv('DEFAULT_LIMIT', '100')),
+        'idle_timeout': float(os.getenv('IDLE_TIMEOUT', '300')),
+        'job_timeout': float(os.getenv('JOB_TIMEOUT', '1800')),
+        'max_concurrent_jobs': int(os.getenv('MAX_CONCURRENT_JOBS', '1')),
+        'tools_dir': os.getenv('TOOLS_DIR') or str(BASE_DIR / 'tools'),
+        'output_compression': os.getenv('OUTPUT_COMPRESSION', 'none'),
+        'search_index': os.getenv('SEARCH_INDEX', '1').strip().lower() not in ('0', 'false', 'no', ''),
+        'rollups': os.getenv('ROLLUPS', '1').strip().lower() not in ('0', 'false', 'no', ''),
+        'dedup': os.getenv('DEDUP', '1').strip().lower() not in ('0', 'false', 'no', ''),
+        'normalize': os.getenv('NORMALIZE', '1').strip().lower() not in ('0', 'false', 'no', ''),
+        'normalize_workers': int(os.getenv('NORMALIZE_WORKERS', '0')),
+        'retry_max_attempts': int(os.getenv('RETRY_MAX_ATTEMPTS', '3')),
+        'retry_base_delay': float(os.getenv('RETRY_BASE_DELAY', '30')),
+        'retry_max_delay': float(os.getenv('RETRY_MAX_DELAY', '600')),
+        'log_format': os.getenv('LOG_FORMAT', 'text').strip().lower(),
+        'log_rotation': os.getenv('LOG_ROTATION', 'size').strip().lower(),
+        'log_max_bytes': int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+        'log_backup_count': int(os.getenv('LOG_BACKUP_COUNT', '5')),
+        'log_harvester_lines_per_sec': float(os.getenv('LOG_HARVESTER_LINES_PER_SEC', '20')),
     }
     
-    Path(config['output_dir']).mkdir(parents=True, exist_ok=True)
-    
     return config
 
-config = load_config()
-logger = setup_logging()
+class LazyConfig(MutableMapping):
+    """The settings dict, read from .env and the environment on first access.
+
+    Importing this module has no side effects: nothing is read, created or
+    logged until a value is needed, so worker processes and CLI calls that
+    never touch a setting pay nothing for it. The entry points (gui, launch,
+    cli) call ensure_env_file() and setup_logging() themselves.
+    """
+
+    def __init__(self):
+        self._values = None
+
+    def _loaded(self):
+        if self._values is None:
+            self._values = load_config()
+        return self._values
+
+    def reload(self):
+        self._values = load_config()
+
+    def __getitem__(self, key):
+        return self._loaded()[key]
+
+    def __setitem__(self, key, value):
+        self._loaded()[key] = value
+
+    def __delitem__(self, key):
+        del self._loaded()[key]
+
+    def __iter__(self):
+        return iter(self._loaded())
+
+    def __len__(self):
+        return len(self._loaded())
+
+config = LazyConfig()
+logger = logging.getLogger('TwitterAgent')
+harvester_logger = logging.getLogger('TwitterAgent.harvester')
 
 def update_auth_token(new_token):
     if not ENV_FILE.exists():
@@ -0,0 +1,379 @@
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from arrow_handoff import arrow_available, is_reference, make_handoff_dir, read_frame, remove_handoff_dir, write_frame
+from config import logger, setup_worker_logging
+from dedup import DedupIndex
+from output_index import OutputIndex
+from storage import open_text, read_dataframe
+from tweet_fields import CREATED_AT_FORMAT
+
+CHUNK_ROWS = 50000
+
+# Columns a filter needs, so they are read even when not projected
+FILTER_COLUMNS = {
+    'start_date': 'created_at',
+    'end_date': 'created_at',
+    'lang': 'lang',
+    'user': 'username',
+    'text': 'full_text',
+}
+
+
+class CorpusFilter:
+    """Row filters of a corpus query; plain attributes so it pickles into worker processes"""
+
+    def __init__(self, start_date=None, end_date=None, lang=None, user=None, text=None, columns=None,
+                 clusters_dir=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.lang = lang
+        self.user = user.lstrip('@').lower() if user else None
+        self.text = text.lower() if text else None
+        self.columns = list(columns) if columns else None
+        # Output dir whose dedup index supplies a cluster_id column, or None
+        self.clusters_dir = clusters_dir
+
+    def needed_columns(self):
+        if self.columns is None:
+            return None
+        needed = set(self.columns)
+        for name, column in FILTER_COLUMNS.items():
+            if getattr(self, name):
+                needed.add(column)
+        if self.clusters_dir:
+            needed.add('id_str')
+        return needed
+
+    def apply(self, chunk):
+        import pandas as pd
+        mask = pd.Series(True, index=chunk.index)
+        if self.start_date or self.end_date:
+            # created_at is Twitter's 'Thu Dec 28 21:59:59 +0000 2023'; compare on the UTC date
+            day = pd.to_datetime(chunk['created_at'], format=CREATED_AT_FORMAT, errors='coerce',
+                                 utc=True).dt.strftime('%Y-%m-%d')
+            if self.start_date:
+                mask &= day >= self.start_date
+            if self.end_date:
+                mask &= day <= self.end_date
+        if self.lang:
+            mask &= chunk['lang'] == self.lang
+        if self.user:
+            mask &= chunk['username'].str.lower() == self.user
+        if self.text:
+            mask &= chunk['full_text'].str.lower().str.contains(self.text, regex=False, na=False)
+        return chunk[mask]
+
+
+def _iter_file(path, keyword, row_filter, chunk_rows=CHUNK_ROWS):
+    """Matching rows of one output file, as filtered and projected chunks of at most chunk_rows"""
+    import pandas as pd
+    needed = row_filter.needed_columns()
+    with open_text(path) as text:
+        reader = pd.read_csv(text, chunksize=chunk_rows, dtype=str, keep_default_na=False,
+                             usecols=(lambda column: column in needed) if needed is not None else None)
+        for chunk in reader:
+            chunk = row_filter.apply(chunk)
+            if not len(chunk):
+                continue
+            chunk.insert(0, 'keyword', keyword)
+            if row_filter.clusters_dir:
+                chunk = _with_clusters(chunk, row_filter.clusters_dir)
+            if row_filter.columns is not None:
+                chunk = chunk[[column for column in row_filter.columns if column in chunk.columns]]
+            yield chunk
+
+
+def _scan_file(path, keyword, row_filter, count_only):
+    """Filter one output file chunk by chunk; runs in a worker process"""
+    import pandas as pd
+    if count_only:
+        return sum(len(chunk) for chunk in _iter_file(path, keyword, row_filter))
+    frames = list(_iter_file(path, keyword, row_filter))
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def _rebatch(frames, chunk_rows):
+    """Regroup frames of any size into frames of exactly chunk_rows rows (the last one may be shorter)"""
+    import pandas as pd
+    pending = []
+    pending_rows = 0
+    for frame in frames:
+        pending.append(frame)
+        pending_rows += len(frame)
+        if pending_rows < chunk_rows:
+            continue
+        merged = pd.concat(pending, ignore_index=True)
+        start = 0
+        while len(merged) - start >= chunk_rows:
+            yield merged.iloc[start:start + chunk_rows].reset_index(drop=True)
+            start += chunk_rows
+        pending = [merged.iloc[start:]] if start < len(merged) else []
+        pending_rows = len(merged) - start
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def _with_clusters(chunk, output_dir):
+    """Add cluster_id (the near-duplicate group); unclustered tweets are their own group"""
+    tweet_ids = [int(value) if value.isdigit() else None for value in chunk['id_str']]
+    clusters = DedupIndex(output_dir).cluster_ids(tweet_id for tweet_id in tweet_ids if tweet_id is not None)
+    chunk = chunk.copy()
+    chunk['cluster_id'] = [clusters.get(tweet_id, tweet_id) for tweet_id in tweet_ids]
+    return chunk
+
+
+def _scan_file_task(task, handoff_dir=None):
+    """Worker entry point; with handoff_dir a result frame comes back as an Arrow IPC reference, not a pickle"""
+    path, keyword, row_filter, count_only = task
+    try:
+        result = _scan_file(path, keyword, row_filter, count_only)
+    except (OSError, ValueError, KeyError, RuntimeError) as e:
+        return e
+    if handoff_dir and result is not None and not count_only:
+        try:
+            return write_frame(result, handoff_dir)
+        except OSError as e:
+            # A full /dev/shm or temp dir must not lose the rows; they come back pickled instead
+            logger.warning(f"Could not hand {path} over through Arrow, sending it pickled: {e}")
+    return result
+
+
+class CorpusQuery:
+    """Filter the whole scraped corpus without loading it by hand.
+
+    Files are chosen through the output index: a file is only opened when
+    its keyword is asked for, its job's date range overlaps the query range
+    and its job language matches, so a month query over a year of data
+    reads a twelfth of it. Each remaining file is streamed in chunks
+    (compressed files included) by a pool of worker processes, and only the
+    projected columns plus the ones a filter needs are parsed. Files that
+    are not in the index (loose CSVs from old versions) are not searched.
+    """
+
+    def __init__(self, output_dir, max_workers=None):
+        self.output_dir = output_dir
+        self.index = OutputIndex(output_dir)
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def plan(self, keywords=None, start_date=None, end_date=None, lang=None):
+        """Index entries of the files a query has to read"""
+        wanted = {keyword.lower() for keyword in keywords} if keywords else None
+        selected = []
+        for entry in self.index.iter_outputs():
+            if wanted is not None and entry['keyword'].lower() not in wanted:
+                continue
+            if start_date and entry['end_date'] < start_date:
+                continue
+            if end_date and entry['start_date'] > end_date:
+                continue
+            if lang and entry['lang'] and entry['lang'] != lang:
+                continue
+            if not os.path.exists(entry['path']):
+                continue
+            selected.append(entry)
+        return selected
+
+    def _tasks(self, keywords, start_date, end_date, lang, user, text, columns, count_only, clusters_dir=None):
+        row_filter = CorpusFilter(start_date, end_date, lang, user, text, columns, clusters_dir)
+        entries = self.plan(keywords, start_date, end_date, lang)
+        logger.info(f"Corpus query reads {len(entries)} of {self.index.totals()['files']} indexed files")
+        return [(entry['path'], entry['keyword'], row_filter, count_only) for entry in entries]
+
+    def _run(self, tasks):
+        """Yield (path, result) in file order, in-process when a pool would not pay off.
+
+        Only workers + 1 files are in flight at a time; the next one is
+        submitted as each result is taken, so a slow consumer holds a bounded
+        number of results rather than the whole corpus. With pyarrow
+        installed, workers write their frames to memory-mapped Arrow IPC
+        files (in shared memory where available) and send back only a
+        reference, so results are not pickled through the pool's pipe.
+        """
+        if self.max_workers <= 1 or len(tasks) <= 1:
+            results = map(_scan_file_task, tasks)
+            for task, result in zip(tasks, results):
+                yield task[0], result
+            return
+        workers = min(self.max_workers, len(tasks))
+        handoff_dir = make_handoff_dir() if arrow_available() else None
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=setup_worker_logging) as executor:
+                queued = iter(tasks)
+                in_flight = deque((task, executor.submit(_scan_file_task, task, handoff_dir))
+                                  for task in islice(queued, workers + 1))
+                try:
+                    while in_flight:
+                        task, future = in_flight.popleft()
+                        result = future.result()
+                        for next_task in islice(queued, 1):
+                            in_flight.append((next_task, executor.submit(_scan_file_task, next_task, handoff_dir)))
+                        if is_reference(result):
+                            try:
+                                result = read_frame(result)
+                            except (OSError, ValueError) as e:
+                                result = e
+                        yield task[0], result
+                finally:
+                    # A consumer that stops early should not wait for files nobody will read
+                    for _, future in in_flight:
+                        future.cancel()
+        finally:
+            if handoff_dir:
+                remove_handoff_dir(handoff_dir)
+
+    def iter_frames(self, keywords=None, start_date=None, end_date=None, lang=None, user=None, text=None,
+                    columns=None, clusters=False, collapse=False):
+        """Yield one DataFrame of matching rows per file; unreadable files are logged and skipped.
+
+        clusters adds a cluster_id column from the near-duplicate index;
+        collapse keeps only the first tweet of each cluster across the
+        whole result, so copy-paste campaigns count once.
+        """
+        clusters = clusters or collapse
+        projected = columns
+        if collapse and columns is not None and 'cluster_id' not in columns:
+            columns = list(columns) + ['cluster_id']
+        tasks = self._tasks(keywords, start_date, end_date, lang, user, text, columns, False,
+                            clusters_dir=self.output_dir if clusters else None)
+        seen = set()
+        for path, result in self._run(tasks):
+            if isinstance(result, Exception):
+                logger.warning(f"Skipping {path}: {result}")
+                continue
+            if result is None:
+                continue
+            if collapse:
+                keep = ~result['cluster_id'].isin(seen) & ~result['cluster_id'].duplicated()
+                seen.update(result['cluster_id'])
+                result = result[keep]
+                if projected is not None and 'cluster_id' not in projected:
+                    result = result.drop(columns=['cluster_id'])
+            if len(result):
+                yield result
+
+    def iter_chunks(self, keywords=None, start_date=None, end_date=None, lang=None, user=None, text=None,
+                    columns=None, clusters=False, chunk_rows=CHUNK_ROWS, readahead=2, as_arrow=False):
+        """Yield the matching rows of the whole corpus as chunks of chunk_rows rows.
+
+        Unlike iter_frames, no file is ever held whole: files are streamed
+        in index order and regrouped into fixed-size DataFrames (pyarrow
+        RecordBatches with as_arrow), so memory stays at about
+        (readahead + 2) chunks whatever the size of the archive. The next
+        chunks are read and filtered on a background thread while the
+        caller works on the current one. Stopping the iteration early stops
+        the reader too.
+        """
+        import queue
+        import threading
+        if as_arrow:
+            import pyarrow as pa
+        tasks = self._tasks(keywords, start_date, end_date, lang, user, text, columns, False,
+                            clusters_dir=self.output_dir if clusters else None)
+        ready = queue.Queue(maxsize=max(1, readahead))
+        stopped = threading.Event()
+        done = object()
+
+        def frames():
+            for path, keyword, row_filter, _ in tasks:
+                try:
+                    yield from _iter_file(path, keyword, row_filter, chunk_rows)
+                except (OSError, ValueError, KeyError, RuntimeError) as e:
+                    logger.warning(f"Skipping {path}: {e}")
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read_ahead():
+            try:
+                for chunk in _rebatch(frames(), chunk_rows):
+                    if not put(chunk):
+                        return
+                put(done)
+            except BaseException as e:
+                put(e)
+
+        reader = threading.Thread(target=read_ahead, name='corpus-readahead', daemon=True)
+        reader.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                if as_arrow:
+                    # Rebatched string columns can be chunked arrays; one contiguous batch per chunk
+                    item = pa.Table.from_pandas(item, preserve_index=False).combine_chunks().to_batches()[0]
+                yield item
+        finally:
+            stopped.set()
+            reader.join()
+
+    def iter_typed(self, keywords=None, start_date=None, end_date=None, lang=None, columns=None):
+        """Yield one typed DataFrame (see normalize.normalize_frame) per matching file.
+
+        The typed table written next to a file (NORMALIZE=1, needs pyarrow)
+        is read when it is up to date, with only the wanted columns; other
+        files are typed on the fly. Dates and lang filter rows; this runs in
+        the calling process and is meant for analysis, not bulk export.
+        """
+        import pandas as pd
+        from normalize import normalize_frame, read_typed
+        needed = None
+        if columns is not None:
+            needed = list(dict.fromkeys(list(columns) + (['created_at'] if start_date or end_date else [])
+                                        + (['lang'] if lang else [])))
+        for entry in self.plan(keywords, start_date, end_date, lang):
+            try:
+                frame = read_typed(entry['path'], needed) if arrow_available() else None
+                if frame is None:
+                    frame = normalize_frame(read_dataframe(entry['path'], dtype=str, keep_default_na=False))
+            except (OSError, ValueError, KeyError, RuntimeError) as e:
+                logger.warning(f"Skipping {entry['path']}: {e}")
+                continue
+            mask = pd.Series(True, index=frame.index)
+            if start_date or end_date:
+                day = frame['created_at'].dt.strftime('%Y-%m-%d')
+                if start_date:
+                    mask &= day >= start_date
+                if end_date:
+                    mask &= day <= end_date
+            if lang:
+                mask &= frame['lang'] == lang
+            frame = frame[mask]
+            if columns is not None:
+                frame = frame[[column for column in columns if column in frame.columns]]
+            if len(frame):
+                frame.insert(0, 'keyword', entry['keyword'])
+                yield frame.reset_index(drop=True)
+
+    def run(self, keywords=None, start_date=None, end_date=None, lang=None, user=None, text=None, columns=None,
+            clusters=False, collapse=False):
+        import pandas as pd
+        frames = list(self.iter_frames(keywords, start_date, end_date, lang, user, text, columns, clusters, collapse))
+        if not frames:
+            return pd.DataFrame(columns=columns or ['keyword'])
+        return pd.concat(frames, ignore_index=True)
+
+    def count(self, keywords=None, start_date=None, end_date=None, lang=None, user=None, text=None):
+        """Number of matching tweets, without building any result frame"""
+        total = 0
+        tasks = self._tasks(keywords, start_date, end_date, lang, user, text, ['id_str'], True)
+        for path, result in self._run(tasks):
+            if isinstance(result, Exception):
+                logger.warning(f"Skipping {path}: {result}")
+            else:
+                total += result
+        return total
@@ -0,0 +1,221 @@
+import csv
+import mmap
+import os
+import threading
+from itertools import islice
+
+from config import logger
+from storage import COMPRESSION_NONE, compression_of, long_fields, open_text
+
+INDEX_STRIDE = 1000
+SCAN_BLOCK = 16 * 1024 * 1024
+
+# Sparse indexes of files already opened, keyed by (path, size, mtime), so reopening is instant
+_INDEX_CACHE = {}
+
+
+class CsvPreview:
+    """Random access to the rows of a (possibly huge) output CSV, for the Results tab preview.
+
+    The file is memory-mapped, never read whole. A background pass records
+    the byte offset of every INDEX_STRIDE-th row by scanning blocks for
+    newlines and quotes with numpy: a newline only ends a record when the
+    number of quotes before it is even, so line breaks inside quoted tweet
+    text are handled. page() seeks to the nearest checkpoint and parses at
+    most INDEX_STRIDE + count rows, wherever the row is. Compressed files
+    cannot be mapped; they are counted and paged by streaming them on
+    background threads. page() never reads more than the first
+    INDEX_STRIDE rows on the caller's thread: a page that is not there yet
+    returns None and is ready on a later call. Call close() when done.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open_text(self.path) as text, long_fields():
+            self.header = next(csv.reader(text), [])
+        self.offsets = []
+        self.rows = None
+        self.error = None
+        self.compressed = compression_of(self.path) != COMPRESSION_NONE
+        self._file = None
+        self._map = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._requests = threading.Condition()
+        self._request = None
+        self._served = None
+        self._reader = None
+        self._thread = threading.Thread(target=self._prepare, name='csv-preview-index', daemon=True)
+        self._thread.start()
+
+    @property
+    def indexed(self):
+        return self.rows is not None
+
+    def _prepare(self):
+        try:
+            stat = os.stat(self.path)
+            key = (self.path, stat.st_size, stat.st_mtime_ns)
+            if self.compressed:
+                if key in _INDEX_CACHE:
+                    self.rows = _INDEX_CACHE[key][1]
+                    return
+                self._count_rows()
+                if self.rows is not None:
+                    _INDEX_CACHE[key] = ([], self.rows)
+                return
+            self._file = open(self.path, 'rb')
+            size = os.fstat(self._file.fileno()).st_size
+            if not size:
+                self.rows = 0
+                return
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._ready.set()
+
+            if key in _INDEX_CACHE:
+                self.offsets, self.rows = _INDEX_CACHE[key]
+                return
+            self._build_index()
+            if self.rows is not None:
+                _INDEX_CACHE[key] = (self.offsets, self.rows)
+        except (OSError, ValueError, RuntimeError, csv.Error) as e:
+            self.error = str(e)
+            logger.warning(f"Could not index {self.path} for preview: {e}")
+
+    def _count_rows(self):
+        with open_text(self.path) as text, long_fields():
+            reader = csv.reader(text)
+            next(reader, None)
+            rows = 0
+            while not self._stop.is_set():
+                counted = sum(1 for _ in islice(reader, INDEX_STRIDE))
+                rows += counted
+                if counted < INDEX_STRIDE:
+                    self.rows = rows
+                    return
+
+    def _build_index(self):
+        import numpy as np
+        data = self._map
+        size = len(data)
+        quotes = 0
+        records = 0
+        for start in range(0, size, SCAN_BLOCK):
+            if self._stop.is_set():
+                return
+            block = np.frombuffer(data, dtype=np.uint8, count=min(SCAN_BLOCK, size - start), offset=start)
+            newlines = np.flatnonzero(block == ord('\n'))
+            quote_positions = np.flatnonzero(block == ord('"'))
+            # Quotes seen before each newline, across blocks; even means the newline is outside a field
+            before = np.searchsorted(quote_positions, newlines) + quotes
+            ends = newlines[before % 2 == 0] + start
+            quotes += len(quote_positions)
+            del block
+            # Record records + 1 + i starts after ends[i]; record 0 is the header, so it is data row records + i
+            rows = np.arange(records, records + len(ends))
+            checkpoints = (rows % INDEX_STRIDE == 0) & (ends + 1 < size)
+            self.offsets.extend(int(offset) for offset in ends[checkpoints] + 1)
+            records += len(ends)
+        if data[size - 1:size] != b'\n':
+            records += 1
+        self.rows = max(records - 1, 0)
+
+    def _lines(self, offset):
+        data = self._map
+        while offset < len(data):
+            end = data.find(b'\n', offset)
+            end = len(data) if end < 0 else end + 1
+            yield data[offset:end].decode('utf-8', errors='replace')
+            offset = end
+
+    def page(self, first, count, columns=None):
+        """Data rows first .. first + count - 1 (row 0 follows the header), as lists of the given columns.
+
+        None while the rows are still being indexed or read; ask again later.
+        """
+        positions = [self.header.index(column) for column in columns] if columns else None
+        checkpoint = first // INDEX_STRIDE
+        if self._ready.is_set() and checkpoint < len(self.offsets):
+            with long_fields():
+                rows = list(islice(csv.reader(self._lines(self.offsets[checkpoint])),
+                                   first - checkpoint * INDEX_STRIDE, first - checkpoint * INDEX_STRIDE + count))
+        elif first + count <= INDEX_STRIDE:
+            # No further than the first checkpoint would take us anyway
+            with open_text(self.path) as text, long_fields():
+                rows = list(islice(csv.reader(text), first + 1, first + 1 + count))
+        elif self.compressed:
+            rows = self._streamed(first, count)
+        elif self.error:
+            raise OSError(self.error)
+        else:
+            rows = [] if self.rows is not None else None
+        if rows is None or positions is None:
+            return rows
+        return [[row[position] if position < len(row) else '' for position in positions] for row in rows]
+
+    def _streamed(self, first, count):
+        """A page of a compressed file once the reader thread has it, else None after asking for it"""
+        with self._requests:
+            if self._served is not None and self._served[0] == (first, count):
+                if isinstance(self._served[1], Exception):
+                    raise self._served[1]
+                return self._served[1]
+            self._request = (first, count)
+            if self._reader is None:
+                self._reader = threading.Thread(target=self._serve, name='csv-preview-reader', daemon=True)
+                self._reader.start()
+            self._requests.notify()
+        return None
+
+    def _serve(self):
+        text, reader, position = None, None, 0
+        try:
+            while True:
+                with self._requests:
+                    while self._request is None and not self._stop.is_set():
+                        self._requests.wait()
+                    if self._stop.is_set():
+                        return
+                    request = self._request
+                first, count = request
+                try:
+                    with long_fields():
+                        if reader is None or first < position:
+                            # Streams only go forward; paging back starts over
+                            if text is not None:
+                                text.close()
+                            text = open_text(self.path)
+                            reader = csv.reader(text)
+                            next(reader, None)
+                            position = 0
+                        while position < first and self._request == request and not self._stop.is_set():
+                            skipped = sum(1 for _ in islice(reader, min(INDEX_STRIDE, first - position)))
+                            if not skipped:
+                                break
+                            position += skipped
+                        if self._request != request or self._stop.is_set():
+                            continue
+                        rows = list(islice(reader, count)) if position == first else []
+                        position += len(rows)
+                except (OSError, ValueError, RuntimeError, csv.Error) as e:
+                    logger.warning(f"Could not read {self.path} for preview: {e}")
+                    rows, reader = OSError(str(e)), None
+                with self._requests:
+                    self._served = (request, rows)
+                    if self._request == request:
+                        self._request = None
+        finally:
+            if text is not None:
+                text.close()
+
+    def close(self):
+        self._stop.set()
+        with self._requests:
+            self._requests.notify()
+        self._thread.join()
+        if self._reader is not None:
+            self._reader.join()
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
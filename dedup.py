@@ -0,0 +1,358 @@
+
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from config import logger, setup_worker_logging
+from sqlite_store import SqliteStore
+
+DEDUP_FILE = 'dedup.sqlite'
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+SIMILARITY_THRESHOLD = 0.7
+PARALLEL_MIN_ROWS = 20000
+PARALLEL_CHUNK_ROWS = 5000
+# Largest prime below 2**32: permuted hashes fit the uint32 signature and a*x + b fits in uint64
+HASH_PRIME = 4294967291
+EMPTY_HASH = 0xFFFFFFFF
+MINHASH_BLOCK_ROWS = 1024
+
+URL_PATTERN = re.compile(r'https?://\S+')
+WORD_PATTERN = re.compile(r'[#@]?\w+')
+
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+# signatures.cluster_id is the smallest tweet id of the cluster, so it is
+# stable while the cluster grows and readable as "the first copy". bands
+# holds the LSH buckets: tweets sharing any (band, bucket) are candidates
+# and become duplicates when their estimated Jaccard similarity is at least
+# SIMILARITY_THRESHOLD. signature_paths links each tweet to every file it
+# was scraped into; signatures.path is just one of them, for display.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    tweet_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    cluster_id INTEGER NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signatures_path ON signatures (path);
+CREATE INDEX IF NOT EXISTS signatures_cluster ON signatures (cluster_id);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, tweet_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS signature_paths (
+    tweet_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (tweet_id, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signature_paths_path ON signature_paths (path);
+"""
+
+
+def _permutations():
+    import numpy as np
+    generator = np.random.default_rng(20240214)
+    a = generator.integers(1, HASH_PRIME, size=NUM_PERM, dtype=np.uint64)
+    b = generator.integers(0, HASH_PRIME, size=NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+def shingles(text):
+    """Word 3-grams of the normalised text; URLs are dropped since every copy gets its own t.co link"""
+    words = WORD_PATTERN.findall(URL_PATTERN.sub(' ', (text or '').lower()))
+    if len(words) < SHINGLE_WORDS:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _shingle_hash(shingle):
+    # Any stable 32-bit hash will do here, the permutations below make the MinHash family
+    return zlib.crc32(shingle.encode('utf-8'))
+
+
+def minhash_signatures(texts):
+    """uint32 array (len(texts), NUM_PERM); rows of texts without words are all EMPTY_HASH.
+
+    The shingle hashes of all texts go into one flat array and every
+    permutation (a*x + b) mod HASH_PRIME is applied to a block of rows at
+    once, then reduced to per-row minima with np.minimum.reduceat. With
+    32-bit inputs and a prime below 2**32, a*x + b never exceeds 2**64, so
+    the arithmetic is exact.
+    """
+    import numpy as np
+    a, b = _permutations()
+    sizes = np.zeros(len(texts), dtype=np.int64)
+    hashed = []
+    for row, text in enumerate(texts):
+        row_hashes = [_shingle_hash(shingle) for shingle in shingles(text)]
+        sizes[row] = len(row_hashes)
+        hashed.extend(row_hashes)
+    hashed = np.array(hashed, dtype=np.uint64) % np.uint64(HASH_PRIME)
+    ends = np.cumsum(sizes)
+    signatures = np.full((len(texts), NUM_PERM), EMPTY_HASH, dtype=np.uint32)
+    for first in range(0, len(texts), MINHASH_BLOCK_ROWS):
+        rows = np.arange(first, min(first + MINHASH_BLOCK_ROWS, len(texts)))
+        rows = rows[sizes[rows] > 0]
+        if not len(rows):
+            continue
+        offset = ends[rows[0]] - sizes[rows[0]]
+        block = hashed[offset:ends[rows[-1]]]
+        permuted = (block[:, None] * a + b) % np.uint64(HASH_PRIME)
+        starts = ends[rows] - sizes[rows] - offset
+        signatures[rows] = np.minimum.reduceat(permuted, starts, axis=0).astype(np.uint32)
+    return signatures
+
+
+def _signature_pool(workers):
+    """One worker pool for the life of the process, created on first use"""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=setup_worker_logging)
+            _pool_size = workers
+        return _pool
+
+
+def compute_signatures(texts, max_workers=None):
+    """MinHash all texts, spread over processes when there are enough of them to pay off.
+
+    Inside a pool worker (the ingest worker) the work stays in-process: a
+    pool started from a worker is never shut down with it and hangs the
+    parent pool's shutdown.
+    """
+    import numpy as np
+    workers = max_workers or os.cpu_count() or 1
+    if workers <= 1 or len(texts) < PARALLEL_MIN_ROWS or multiprocessing.parent_process() is not None:
+        return minhash_signatures(texts)
+    chunks = [texts[start:start + PARALLEL_CHUNK_ROWS] for start in range(0, len(texts), PARALLEL_CHUNK_ROWS)]
+    return np.concatenate(list(_signature_pool(workers).map(minhash_signatures, chunks)))
+
+
+def band_buckets(signature):
+    """(band, bucket) keys of one signature; the bucket is a signed 63-bit hash so sqlite can store it"""
+    raw = signature.tobytes()
+    width = ROWS_PER_BAND * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(raw[band * width:(band + 1) * width], digest_size=8).digest(),
+                              'big') >> 1)
+        for band in range(BANDS)
+    ]
+
+
+def _similarity(first, second):
+    return float((first == second).mean())
+
+
+class DedupIndex(SqliteStore):
+    """Near-duplicate clusters of scraped tweets (MinHash + LSH), under .harvest/dedup.sqlite.
+
+    add_file runs per finished job: the new file's tweets are only compared
+    with the LSH candidates they share a bucket with, never pairwise with
+    the corpus, so the cost of a job stays proportional to its own size.
+    Re-adding a file replaces its tweets; a tweet another file already
+    brought in keeps its cluster and is only linked to the new file, and is
+    dropped when the last file holding it goes. A tweet whose text has no
+    words is left unclustered (cluster id = its own id).
+    """
+
+    FILENAME = DEDUP_FILE
+    SCHEMA = SCHEMA
+    PRAGMAS = ('journal_mode=WAL', 'synchronous=NORMAL')
+
+    VERSION = 2
+
+    def _upgrade(self, connection):
+        if connection.execute('PRAGMA user_version').fetchone()[0] < 1:
+            # Signatures from before the 32-bit hash family cannot be compared with new ones
+            if connection.execute('SELECT 1 FROM signatures LIMIT 1').fetchone():
+                logger.warning("Near-duplicate clusters were reset for the new signature format; "
+                               "run 'python cli.py search --reindex' to rebuild them")
+            connection.execute('DELETE FROM signatures')
+            connection.execute('DELETE FROM bands')
+        # Stores from before signature_paths linked each tweet to its latest file only
+        connection.execute('INSERT OR IGNORE INTO signature_paths SELECT tweet_id, path FROM signatures')
+
+    def _delete_file(self, connection, relative):
+        """Unlink one file and drop the tweets no other file has.
+
+        Clusters that lose their smallest member take the next one as id.
+        """
+        connection.execute('CREATE TEMP TABLE IF NOT EXISTS unlinked (tweet_id INTEGER PRIMARY KEY)')
+        connection.execute('DELETE FROM unlinked')
+        connection.execute('INSERT INTO unlinked SELECT tweet_id FROM signature_paths WHERE path = ?', (relative,))
+        connection.execute('DELETE FROM signature_paths WHERE path = ?', (relative,))
+        connection.execute('DELETE FROM unlinked WHERE tweet_id IN (SELECT tweet_id FROM signature_paths)')
+        affected = [row[0] for row in connection.execute(
+            'SELECT DISTINCT cluster_id FROM signatures WHERE tweet_id IN (SELECT tweet_id FROM unlinked)'
+        )]
+        connection.execute('DELETE FROM bands WHERE tweet_id IN (SELECT tweet_id FROM unlinked)')
+        connection.execute('DELETE FROM signatures WHERE tweet_id IN (SELECT tweet_id FROM unlinked)')
+        # Tweets the file shared with others are attributed to one of those instead
+        connection.execute(
+            'UPDATE signatures SET path = (SELECT path FROM signature_paths '
+            'WHERE signature_paths.tweet_id = signatures.tweet_id LIMIT 1) WHERE path = ?', (relative,)
+        )
+        relabel = []
+        for start in range(0, len(affected), 500):
+            batch = affected[start:start + 500]
+            relabel += [(row[1], row[0]) for row in connection.execute(
+                f"SELECT cluster_id, MIN(tweet_id) FROM signatures WHERE cluster_id IN "
+                f"({', '.join('?' for _ in batch)}) GROUP BY cluster_id", batch
+            ) if row[0] != row[1]]
+        connection.executemany('UPDATE signatures SET cluster_id = ? WHERE cluster_id = ?', relabel)
+
+    def add_file(self, path, tweets, max_workers=None):
+        """Cluster one file's (tweet_id, text) pairs against the corpus; returns how many are duplicates"""
+        import numpy as np
+        relative = self._relative(path)
+        tweets = list({tweet_id: text for tweet_id, text in tweets}.items())
+        connection = self._connect()
+        try:
+            with connection:
+                self._delete_file(connection, relative)
+                connection.executemany('INSERT INTO signature_paths VALUES (?, ?)',
+                                       [(tweet_id, relative) for tweet_id, _ in tweets])
+                clustered = set()
+                for start in range(0, len(tweets), 500):
+                    batch = [tweet_id for tweet_id, _ in tweets[start:start + 500]]
+                    clustered.update(row[0] for row in connection.execute(
+                        f"SELECT tweet_id FROM signatures WHERE tweet_id IN ({', '.join('?' for _ in batch)})",
+                        batch
+                    ))
+                tweets = [(tweet_id, text) for tweet_id, text in tweets if tweet_id not in clustered]
+                if not tweets:
+                    return 0
+                signatures = compute_signatures([text for _, text in tweets], max_workers)
+                empty = np.all(signatures == EMPTY_HASH, axis=1)
+                buckets = [band_buckets(signature) for signature in signatures]
+
+                # Existing tweets sharing a bucket with any new tweet, fetched in one join
+                connection.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (band INTEGER, bucket INTEGER)')
+                connection.execute('DELETE FROM wanted')
+                connection.executemany('INSERT INTO wanted VALUES (?, ?)',
+                                       {key for row, keys in enumerate(buckets) if not empty[row] for key in keys})
+                members = {}
+                for row in connection.execute(
+                    'SELECT bands.band, bands.bucket, bands.tweet_id FROM bands '
+                    'JOIN wanted ON bands.band = wanted.band AND bands.bucket = wanted.bucket'
+                ):
+                    members.setdefault((row['band'], row['bucket']), []).append(row['tweet_id'])
+                known = {}
+                candidate_ids = list({tweet_id for ids in members.values() for tweet_id in ids})
+                for start in range(0, len(candidate_ids), 500):
+                    batch = candidate_ids[start:start + 500]
+                    for row in connection.execute(
+                        f"SELECT tweet_id, cluster_id, signature FROM signatures WHERE tweet_id IN "
+                        f"({', '.join('?' for _ in batch)})", batch
+                    ):
+                        known[row['tweet_id']] = (row['cluster_id'], np.frombuffer(row['signature'], dtype=np.uint32))
+
+                parent = {}
+
+                def find(cluster):
+                    while parent.get(cluster, cluster) != cluster:
+                        cluster = parent[cluster]
+                    return cluster
+
+                def union(first, second):
+                    first, second = find(first), find(second)
+                    if first != second:
+                        parent[max(first, second)] = min(first, second)
+
+                duplicates = 0
+                for row, (tweet_id, _) in enumerate(tweets):
+                    parent.setdefault(tweet_id, tweet_id)
+                    if empty[row]:
+                        continue
+                    matched = False
+                    seen = set()
+                    for key in buckets[row]:
+                        for other_id in members.get(key, ()):
+                            if other_id in seen or other_id == tweet_id:
+                                continue
+                            seen.add(other_id)
+                            other_cluster, other_signature = known[other_id]
+                            if _similarity(signatures[row], other_signature) >= SIMILARITY_THRESHOLD:
+                                parent.setdefault(other_cluster, other_cluster)
+                                union(tweet_id, other_cluster)
+                                matched = True
+                        members.setdefault(key, []).append(tweet_id)
+                    known[tweet_id] = (tweet_id, signatures[row])
+                    duplicates += matched
+
+                # Merged clusters keep the smallest id; relabel stored members of absorbed clusters
+                # (the new tweets' own rows are written with their final cluster just below)
+                relabel = [(find(cluster), cluster) for cluster in parent if find(cluster) != cluster]
+                connection.executemany('UPDATE signatures SET cluster_id = ? WHERE cluster_id = ?', relabel)
+                connection.executemany(
+                    'INSERT INTO signatures VALUES (?, ?, ?, ?)',
+                    [(tweet_id, relative, find(tweet_id), signatures[row].tobytes())
+                     for row, (tweet_id, _) in enumerate(tweets)]
+                )
+                connection.executemany(
+                    'INSERT OR IGNORE INTO bands VALUES (?, ?, ?)',
+                    [(band, bucket, tweet_id) for row, (tweet_id, _) in enumerate(tweets) if not empty[row]
+                     for band, bucket in buckets[row]]
+                )
+                return duplicates
+        finally:
+            connection.close()
+
+    def remove_file(self, path):
+        connection = self._connect()
+        try:
+            with connection:
+                self._delete_file(connection, self._relative(path))
+        finally:
+            connection.close()
+
+    def cluster_ids(self, tweet_ids):
+        """{tweet_id: cluster_id} for the given ids that have been clustered"""
+        tweet_ids = list(tweet_ids)
+        clusters = {}
+        connection = self._connect()
+        try:
+            for start in range(0, len(tweet_ids), 500):
+                batch = tweet_ids[start:start + 500]
+                for row in connection.execute(
+                    f"SELECT tweet_id, cluster_id FROM signatures WHERE tweet_id IN ({', '.join('?' for _ in batch)})",
+                    batch
+                ):
+                    clusters[row['tweet_id']] = row['cluster_id']
+            return clusters
+        finally:
+            connection.close()
+
+    def largest_clusters(self, limit=20, min_size=2):
+        """[(cluster_id, size)] of the biggest copy-paste groups"""
+        connection = self._connect()
+        try:
+            return [tuple(row) for row in connection.execute(
+                'SELECT cluster_id, COUNT(*) AS size FROM signatures GROUP BY cluster_id HAVING size >= ? '
+                'ORDER BY size DESC LIMIT ?', (min_size, limit)
+            )]
+        finally:
+            connection.close()
+
+    def stats(self):
+        connection = self._connect()
+        try:
+            tweets, clusters = connection.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT cluster_id) FROM signatures'
+            ).fetchone()
+            return {'tweets': tweets, 'clusters': clusters, 'duplicates': tweets - clusters}
+        finally:
+            connection.close()
@@ -0,0 +1,265 @@
+
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from config import logger
+from corpus_query import CorpusQuery, CHUNK_ROWS
+from storage import open_text
+from tweet_fields import CREATED_AT_FORMAT, HASHTAG_PATTERN, MENTION_PATTERN
+
+GRAPH_DIR = 'graphs'
+WINDOW_FORMATS = {'day': '%Y-%m-%d', 'week': '%G-W%V', 'month': '%Y-%m'}
+# Tweets may land a little outside their job's range (time zones); keep a window open this long
+LATE_MARGIN = timedelta(days=1)
+MAX_HASHTAGS_PER_TWEET = 20
+COMPACT_EDGES = 2000000
+
+
+class EdgeAccumulator:
+    """Counts (row, col) pairs in bounded memory.
+
+    Pairs are buffered as arrays of packed uint64 keys and periodically
+    folded with np.unique into sorted unique keys plus counts, so memory
+    follows the number of distinct edges, not the number of tweets.
+    """
+
+    def __init__(self):
+        import numpy as np
+        self._np = np
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.uint32)
+        self._buffer = []
+        self._buffered = 0
+
+    def add(self, rows, cols):
+        """Count the pairs (rows[i], cols[i])"""
+        np = self._np
+        keys = (np.asarray(rows, dtype=np.uint64) << np.uint64(32)) | np.asarray(cols, dtype=np.uint64)
+        self._buffer.append(keys)
+        self._buffered += len(keys)
+        if self._buffered >= COMPACT_EDGES:
+            self._compact()
+
+    def _compact(self):
+        np = self._np
+        if not self._buffered:
+            return
+        keys = np.concatenate([self.keys] + self._buffer)
+        counts = np.concatenate([self.counts, np.ones(self._buffered, dtype=np.uint32)])
+        self._buffer, self._buffered = [], 0
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts, minlength=len(self.keys)).astype(np.uint32)
+
+    def to_csr(self, size):
+        """(data, indices, indptr) of the size x size matrix; keys are sorted so rows come out in order"""
+        np = self._np
+        self._compact()
+        rows = (self.keys >> np.uint64(32)).astype(np.int32)
+        cols = (self.keys & np.uint64(0xFFFFFFFF)).astype(np.int32)
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+        return self.counts, cols, indptr
+
+
+class WindowGraphs:
+    """Mention and hashtag co-occurrence edges of one time window"""
+
+    def __init__(self, period):
+        self.period = period
+        self.users = {}
+        self.hashtags = {}
+        self.mentions = EdgeAccumulator()
+        self.cooccurrence = EdgeAccumulator()
+        self.seen = []
+        self.tweets = 0
+
+    @staticmethod
+    def _register(vocabulary, names):
+        """Give new names the next node ids, in order of first appearance"""
+        import pandas as pd
+        for name in pd.unique(names):
+            if name not in vocabulary:
+                vocabulary[name] = len(vocabulary)
+
+    def _unseen(self, tweet_ids):
+        """Mask of ids not added before; the same tweet can sit in the files of several keywords.
+
+        Seen ids are kept as sorted uint64 shards (8 bytes a tweet) rather
+        than a set of Python ints. A chunk is looked up in each shard with a
+        binary search, and the newest shards are merged while one is no
+        larger than the one before it, so a window holds O(log n) shards and
+        each id is merged O(log n) times.
+        """
+        np = self.mentions._np
+        ids = np.asarray(tweet_ids, dtype=np.uint64)
+        unique, first = np.unique(ids, return_index=True)
+        new = np.ones(len(unique), dtype=bool)
+        for shard in self.seen:
+            positions = np.minimum(np.searchsorted(shard, unique), len(shard) - 1)
+            new &= shard[positions] != unique
+        fresh = np.zeros(len(ids), dtype=bool)
+        fresh[first[new]] = True
+        # Rows without an id (0) cannot be matched across files, so they always count
+        fresh |= ids == 0
+        shard = unique[new & (unique != 0)]
+        if len(shard):
+            self.seen.append(shard)
+            while len(self.seen) > 1 and len(self.seen[-2]) <= len(self.seen[-1]):
+                newest = self.seen.pop()
+                self.seen[-1] = np.sort(np.concatenate([self.seen[-1], newest]), kind='stable')
+        return fresh
+
+    def add_chunk(self, tweet_ids, authors, mentions, hashtags):
+        """Add the tweets of a chunk that were not added before, all edges at once"""
+        import pandas as pd
+        np = self.mentions._np
+        fresh = self._unseen(tweet_ids)
+        tweets = pd.DataFrame({'author': list(authors), 'mentions': list(mentions),
+                               'hashtags': list(hashtags)})[fresh].reset_index(drop=True)
+        self.tweets += len(tweets)
+
+        # Each user a tweet mentions counts once; self mentions are left out
+        posted = tweets[tweets['author'].fillna('') != '']
+        mentioned = posted[['author', 'mentions']].explode('mentions').dropna(subset=['mentions'])
+        mentioned = mentioned[mentioned['mentions'] != mentioned['author']]
+        mentioned = mentioned.reset_index().drop_duplicates(['index', 'mentions'])
+        self._register(self.users, pd.concat([
+            pd.Series(posted['author'].to_numpy(), index=posted.index),
+            pd.Series(mentioned['mentions'].to_numpy(), index=mentioned['index'].to_numpy()),
+        ]).sort_index(kind='stable'))
+        self.mentions.add(mentioned['author'].map(self.users).to_numpy(),
+                          mentioned['mentions'].map(self.users).to_numpy())
+
+        # The first MAX_HASHTAGS_PER_TWEET distinct tags of a tweet, in sorted order, pair up
+        tags = tweets['hashtags'].explode().dropna().reset_index().drop_duplicates()
+        tags = tags.sort_values(['index', 'hashtags'], kind='stable')
+        tags = tags[tags.groupby('index').cumcount() < MAX_HASHTAGS_PER_TWEET]
+        self._register(self.hashtags, tags['hashtags'])
+        tags['node'] = tags['hashtags'].map(self.hashtags)
+        pairs = tags.merge(tags, on='index')
+        pairs = pairs[pairs['hashtags_x'] < pairs['hashtags_y']]
+        first, second = pairs['node_x'].to_numpy(), pairs['node_y'].to_numpy()
+        # Symmetric relation: only the upper triangle is stored
+        self.cooccurrence.add(np.minimum(first, second), np.maximum(first, second))
+
+    def write(self, target_dir):
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        written = {}
+        for name, vocabulary, edges in (('mentions', self.users, self.mentions),
+                                        ('hashtags', self.hashtags, self.cooccurrence)):
+            _write_csr(target_dir / f'{name}.npz', edges, len(vocabulary))
+            with open(target_dir / f'{name}.nodes.txt', 'w', encoding='utf-8') as nodes_file:
+                for node in sorted(vocabulary, key=vocabulary.get):
+                    nodes_file.write(node + '\n')
+            written[name] = {'nodes': len(vocabulary), 'edges': int(len(edges.keys))}
+        return written
+
+
+def _write_csr(path, edges, size):
+    """Compressed .npz in the layout scipy.sparse.load_npz reads, without needing scipy here"""
+    import numpy as np
+    data, indices, indptr = edges.to_csr(size)
+    partial = f"{path}.part.npz"
+    np.savez_compressed(partial, data=data, indices=indices, indptr=indptr,
+                        shape=np.array([size, size]), format=np.array('csr'))
+    os.replace(partial, path)
+
+
+def _window_end(period, window):
+    """Last moment of a window, to know when no later file can still add to it"""
+    if window == 'day':
+        start = datetime.strptime(period, '%Y-%m-%d')
+        return start + timedelta(days=1)
+    if window == 'week':
+        start = datetime.strptime(period + '-1', '%G-W%V-%u')
+        return start + timedelta(days=7)
+    start = datetime.strptime(period, '%Y-%m')
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _iter_chunks(path, window, start_date=None, end_date=None):
+    """Per chunk of the file: {period: (tweet ids, authors, mentions, hashtags)}, parsed with vectorised ops"""
+    import pandas as pd
+    with open_text(path) as text:
+        reader = pd.read_csv(text, chunksize=CHUNK_ROWS, dtype=str, keep_default_na=False,
+                             usecols=lambda column: column in ('id_str', 'created_at', 'username', 'full_text'))
+        for chunk in reader:
+            created = pd.to_datetime(chunk['created_at'], format=CREATED_AT_FORMAT, errors='coerce', utc=True)
+            day = created.dt.strftime('%Y-%m-%d')
+            mask = created.notna()
+            if start_date:
+                mask &= day >= start_date
+            if end_date:
+                mask &= day <= end_date
+            chunk, created = chunk[mask], created[mask]
+            if chunk.empty:
+                continue
+            # Parsed from the string: a float round trip would corrupt 19-digit ids
+            raw_ids = chunk['id_str'] if 'id_str' in chunk else pd.Series('', index=chunk.index)
+            ids = raw_ids.where(raw_ids.str.isdigit(), '0').astype('uint64')
+            lowered = chunk['full_text'].str.lower()
+            columns = pd.DataFrame({
+                'period': created.dt.strftime(WINDOW_FORMATS[window]),
+                'id': ids,
+                'author': chunk['username'].str.lower(),
+                'mentions': lowered.str.findall(MENTION_PATTERN),
+                'hashtags': lowered.str.findall(HASHTAG_PATTERN),
+            })
+            yield {
+                period: (group['id'].to_numpy(), group['author'], group['mentions'], group['hashtags'])
+                for period, group in columns.groupby('period', sort=True)
+            }
+
+
+def build_graphs(output_dir, window='month', keywords=None, start_date=None, end_date=None, target_dir=None,
+                 on_window=None):
+    """Stream the corpus into per-window mention and hashtag co-occurrence matrices.
+
+    Writes <target>/<window>/<period>/mentions.npz (user x user, row
+    mentions column) and hashtags.npz (hashtag x hashtag, upper triangle)
+    as CSR matrices with their node names in *.nodes.txt, row i = line i.
+    Files are read once in date order and a window is written and dropped
+    as soon as no remaining file can reach it, so memory is bounded by the
+    distinct users, hashtags, edges and tweet ids of the open windows
+    rather than by the corpus size. Returns {period: counts} of what was written.
+    """
+    if window not in WINDOW_FORMATS:
+        raise ValueError(f"window must be one of {', '.join(WINDOW_FORMATS)}")
+    target_dir = Path(target_dir or Path(output_dir) / GRAPH_DIR) / window
+    entries = sorted(CorpusQuery(output_dir).plan(keywords, start_date, end_date),
+                     key=lambda entry: entry['start_date'])
+
+    open_windows = {}
+    written = {}
+    late = 0
+
+    def flush(before=None):
+        for period in sorted(open_windows):
+            if before is not None and _window_end(period, window) + LATE_MARGIN > before:
+                continue
+            graphs = open_windows.pop(period)
+            written[period] = dict(graphs.write(target_dir / period), tweets=graphs.tweets)
+            logger.info(f"Graph window {period}: {graphs.tweets} tweets, "
+                        f"{written[period]['mentions']['edges']} mention edges, "
+                        f"{written[period]['hashtags']['edges']} hashtag pairs")
+            if on_window:
+                on_window(period, written[period])
+
+    for entry in entries:
+        flush(before=datetime.strptime(entry['start_date'], '%Y-%m-%d'))
+        for periods in _iter_chunks(entry['path'], window, start_date, end_date):
+            for period, (tweet_ids, authors, mentions, hashtags) in periods.items():
+                if period in written:
+                    late += len(tweet_ids)
+                    continue
+                graphs = open_windows.get(period)
+                if graphs is None:
+                    graphs = open_windows[period] = WindowGraphs(period)
+                graphs.add_chunk(tweet_ids, authors, mentions, hashtags)
+    flush()
+
+    if late:
+        logger.warning(f"{late} tweets fell in windows that were already written and were skipped")
+    return written
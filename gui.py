@@ -5,18 +5,39 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import json
+import logging
 import time
 from datetime import datetime, timedelta
+from collections import deque
 import calendar
-import pandas as pd
 import webbrowser
 from pathlib import Path
 import re
+import sqlite3
+import csv
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import config, logger, update_auth_token
-from twitter_scraper import TwitterScraper
+from config import config, logger, update_auth_token, ensure_env_file, setup_logging
+from auth_guard import preflight_token, TOKEN_VALID, TOKEN_INVALID
+from twitter_scraper import TwitterScraper, EVENT_STARTED, EVENT_LINE, EVENT_PROGRESS, EVENT_RETRY, EVENT_FAILED
+from log_queue import LogQueue, LEVELS
+from job_journal import write_batch_summary, recent_errors
+from process_control import CancelToken
+from output_index import OutputIndex
+from storage import logical_name
+from search_index import SearchIndex
+from rollups import RollupStore
+from csv_preview import CsvPreview
+
+LOG_TICK_MS = 100
+MAX_LOG_LINES = 2000
+MAX_RESULT_ROWS = 1000
+CHART_DAYS = 90
+ALL_KEYWORDS = "All keywords"
+PREVIEW_PAGE_ROWS = 200
+PREVIEW_POLL_MS = 250
+PREVIEW_COLUMNS = ('created_at', 'username', 'full_text', 'favorite_count', 'retweet_count', 'lang')
 
 class ScrollableFrame(ttk.Frame):
     def __init__(self, container, *args, **kwargs):
@@ -72,6 +93,152 @@ class ScrollableFrame(ttk.Frame):
             elif event.num == 5:
                 self.canvas.yview_scroll(1, "units")
 
+class CsvPreviewWindow(tk.Toplevel):
+    """Pages through an output file in place; CsvPreview keeps it memory-mapped, so size does not matter"""
+
+    def __init__(self, parent, preview):
+        super().__init__(parent)
+        self.preview = preview
+        self.first_row = 0
+        self.title(f"Preview - {logical_name(preview.path)}")
+        self.geometry("1000x600")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        bar = ttk.Frame(self, padding=(10, 10, 10, 5))
+        bar.pack(fill='x')
+
+        columns_button = ttk.Menubutton(bar, text="Columns")
+        columns_menu = tk.Menu(columns_button, tearoff=0)
+        columns_button['menu'] = columns_menu
+        columns_button.pack(side='left')
+        defaults = [column for column in PREVIEW_COLUMNS if column in preview.header] or preview.header
+        self.column_vars = {}
+        for column in preview.header:
+            self.column_vars[column] = tk.BooleanVar(value=column in defaults)
+            columns_menu.add_checkbutton(label=column, variable=self.column_vars[column], command=self.show_page)
+
+        ttk.Button(bar, text="|<", width=3, command=lambda: self.go_to(0)).pack(side='left', padx=(15, 0))
+        ttk.Button(bar, text="<", width=3,
+                   command=lambda: self.go_to(self.first_row - PREVIEW_PAGE_ROWS)).pack(side='left')
+        ttk.Button(bar, text=">", width=3,
+                   command=lambda: self.go_to(self.first_row + PREVIEW_PAGE_ROWS)).pack(side='left')
+        self.last_button = ttk.Button(bar, text=">|", width=3, state='disabled',
+                                      command=lambda: self.go_to((preview.rows or 1) - 1))
+        self.last_button.pack(side='left')
+
+        ttk.Label(bar, text="Row:").pack(side='left', padx=(15, 5))
+        self.row_var = tk.StringVar()
+        row_entry = ttk.Entry(bar, textvariable=self.row_var, width=12)
+        row_entry.pack(side='left')
+        row_entry.bind("<Return>", lambda e: self.go_to_entered_row())
+        ttk.Button(bar, text="Go", command=self.go_to_entered_row).pack(side='left', padx=5)
+
+        self.status_var = tk.StringVar()
+        ttk.Label(bar, textvariable=self.status_var, foreground='gray').pack(side='right')
+
+        table_frame = ttk.Frame(self, padding=(10, 0))
+        table_frame.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(table_frame, show='headings')
+        y_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        x_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(yscroll=y_scrollbar.set, xscroll=x_scrollbar.set)
+        y_scrollbar.pack(side='right', fill='y')
+        x_scrollbar.pack(side='bottom', fill='x')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self.show_selected_row())
+        self.bind("<Next>", lambda e: self.go_to(self.first_row + PREVIEW_PAGE_ROWS))
+        self.bind("<Prior>", lambda e: self.go_to(self.first_row - PREVIEW_PAGE_ROWS))
+
+        self.detail_text = scrolledtext.ScrolledText(self, height=6, wrap=tk.WORD)
+        self.detail_text.pack(fill='x', padx=10, pady=10)
+        self.detail_text.config(state='disabled')
+
+        self.page_rows = {}
+        self.show_page()
+        self._poll_index()
+
+    def selected_columns(self):
+        return [column for column in self.preview.header if self.column_vars[column].get()]
+
+    def go_to(self, row):
+        if self.preview.rows is not None:
+            row = min(row, max(self.preview.rows - PREVIEW_PAGE_ROWS, 0))
+        self.first_row = max(row, 0)
+        self.show_page()
+
+    def go_to_entered_row(self):
+        try:
+            self.go_to(int(self.row_var.get().replace(',', '')) - 1)
+        except ValueError:
+            self.bell()
+
+    def show_page(self):
+        columns = self.selected_columns()
+        self.tree.delete(*self.tree.get_children())
+        self.tree.configure(columns=['row'] + columns)
+        self.tree.heading('row', text='#')
+        self.tree.column('row', width=70, stretch=False, anchor='e')
+        for column in columns:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=400 if column == 'full_text' else 120, stretch=column == 'full_text')
+        try:
+            rows = self.preview.page(self.first_row, PREVIEW_PAGE_ROWS)
+        except (OSError, csv.Error) as e:
+            self.status_var.set(f"Could not read: {e}")
+            return
+        if rows is None:
+            # Not indexed or read that far yet; the preview works on it in the background
+            self.status_var.set(f"Loading row {self.first_row + 1:,}...")
+            self.after(PREVIEW_POLL_MS, self._retry_page, self.first_row)
+            return
+        positions = [self.preview.header.index(column) for column in columns]
+        self.page_rows = {}
+        for number, row in enumerate(rows, start=self.first_row + 1):
+            values = [' '.join(row[position].split()) if position < len(row) else '' for position in positions]
+            item = self.tree.insert('', 'end', values=[f"{number:,}"] + values)
+            self.page_rows[item] = row
+        self.row_var.set(f"{self.first_row + 1:,}")
+        self._update_status(len(rows))
+
+    def _retry_page(self, first_row):
+        if self.winfo_exists() and first_row == self.first_row:
+            self.show_page()
+
+    def show_selected_row(self):
+        selection = self.tree.selection()
+        row = self.page_rows.get(selection[0]) if selection else None
+        self.detail_text.config(state='normal')
+        self.detail_text.delete('1.0', tk.END)
+        if row:
+            self.detail_text.insert(tk.END, '\n'.join(
+                f"{column}: {row[position] if position < len(row) else ''}"
+                for position, column in enumerate(self.preview.header)
+            ))
+        self.detail_text.config(state='disabled')
+
+    def _update_status(self, shown):
+        rows = self.preview.rows
+        total = f"{rows:,}" if rows is not None else "? (indexing...)"
+        if self.preview.error:
+            total = "? (index failed)"
+        if shown:
+            self.status_var.set(f"Rows {self.first_row + 1:,}-{self.first_row + shown:,} of {total}")
+        else:
+            self.status_var.set(f"No rows here, {total} in file")
+
+    def _poll_index(self):
+        if not self.winfo_exists():
+            return
+        if self.preview.indexed or self.preview.error:
+            self.last_button.configure(state='normal' if self.preview.indexed else 'disabled')
+            self._update_status(len(self.tree.get_children()))
+            return
+        self.after(PREVIEW_POLL_MS, self._poll_index)
+
+    def close(self):
+        self.destroy()
+        self.preview.close()
+
 class TwitterScraperApp:
     
     def __init__(self, root):
@@ -82,8 +249,13 @@ class TwitterScraperApp:
         self.root.resizable(True, True)
         
         self.scraper = TwitterScraper()
+        self.log_queue = LogQueue()
+        self.log_history = deque(maxlen=MAX_LOG_LINES)
+        # Latest parsed progress per running job, written by the scraping thread and drawn on the Tk tick
+        self.job_progress = {}
         self.setup_variables()
         self.create_ui()
+        self.root.after(LOG_TICK_MS, self._drain_log)
         self.check_node_install()
         self.check_auth_token()
     
@@ -113,14 +285,17 @@ class TwitterScraperApp:
         self.limit_var = tk.StringVar(value=str(config['default_limit']))
         self.lang_var = tk.StringVar(value=config['default_lang'])
         self.tab_var = tk.StringVar(value=config['default_tab'])
+        self.max_concurrent_var = tk.StringVar(value=str(config['max_concurrent_jobs']))
         
         self.status_var = tk.StringVar(value="Ready")
         self.progress_var = tk.DoubleVar(value=0.0)
         
         self.output_dir_var = tk.StringVar(value=config['output_dir'])
+        self.log_level_var = tk.StringVar(value="INFO")
         
         self.current_batch = None
         self.stop_requested = False
+        self.cancel_token = None
     
     def create_ui(self):
         self.style = ttk.Style()
@@ -399,6 +574,10 @@ class TwitterScraperApp:
                                    values=["LATEST", "TOP"], width=10)
         tab_combobox.grid(row=1, column=1, padx=10, pady=5, sticky='w')
         
+        ttk.Label(options_grid, text="Parallel jobs:").grid(row=2, column=0, padx=10, pady=5, sticky='w')
+        ttk.Spinbox(options_grid, from_=1, to=32, textvariable=self.max_concurrent_var, width=8).grid(
+            row=2, column=1, padx=10, pady=5, sticky='w')
+        
         ttk.Label(options_grid, text="Output Directory:").grid(row=1, column=2, padx=10, pady=5, sticky='w')
         output_frame = ttk.Frame(options_grid)
         output_frame.grid(row=1, column=3, padx=10, pady=5, sticky='w')
@@ -443,9 +622,35 @@ class TwitterScraperApp:
         
         ttk.Separator(main_frame).pack(fill='x', pady=5)
         
+        jobs_frame = ttk.LabelFrame(main_frame, text="Active Jobs", style='Emphasis.TLabelframe')
+        jobs_frame.pack(fill='x', pady=(0, 10))
+        
+        job_columns = ('job', 'keyword', 'date_range', 'tweets', 'rate')
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=job_columns, show='headings', height=4)
+        self.jobs_tree.heading('job', text='Job')
+        self.jobs_tree.heading('keyword', text='Keyword')
+        self.jobs_tree.heading('date_range', text='Date Range')
+        self.jobs_tree.heading('tweets', text='Tweets')
+        self.jobs_tree.heading('rate', text='Tweets/s')
+        self.jobs_tree.column('job', width=60)
+        self.jobs_tree.column('keyword', width=180)
+        self.jobs_tree.column('date_range', width=180)
+        self.jobs_tree.column('tweets', width=90)
+        self.jobs_tree.column('rate', width=80)
+        self.jobs_tree.pack(fill='x', padx=10, pady=5)
+        
         log_frame = ttk.LabelFrame(main_frame, text="Log", style='Emphasis.TLabelframe')
         log_frame.pack(fill='x', pady=(0, 10), ipady=5)
         
+        log_options = ttk.Frame(log_frame)
+        log_options.pack(fill='x', padx=10, pady=(5, 0))
+        
+        ttk.Label(log_options, text="Show:").pack(side='left')
+        log_level_combobox = ttk.Combobox(log_options, textvariable=self.log_level_var,
+                                          values=list(LEVELS), width=10, state='readonly')
+        log_level_combobox.pack(side='left', padx=5)
+        log_level_combobox.bind("<<ComboboxSelected>>", lambda e: self._render_log_history())
+        
         self.log_text = scrolledtext.ScrolledText(log_frame, height=8, wrap=tk.WORD)
         self.log_text.pack(fill='both', padx=10, pady=5)
         self.log_text.config(state='disabled')
@@ -496,15 +701,68 @@ class TwitterScraperApp:
         self.files_tree.configure(yscroll=scrollbar.set)
         
         self.files_tree_menu = tk.Menu(self.files_tree, tearoff=0)
+        self.files_tree_menu.add_command(label="Preview", command=self.preview_selected_file)
         self.files_tree_menu.add_command(label="Open File", command=self.open_selected_file)
         self.files_tree_menu.add_command(label="Open Folder", command=self.open_containing_folder)
         
         self.files_tree.bind("<Button-3>", self.show_files_tree_menu)
-        self.files_tree.bind("<Double-1>", lambda e: self.open_selected_file())
+        self.files_tree.bind("<Double-1>", lambda e: self.preview_selected_file())
         
         scrollbar.pack(side='right', fill='y')
         self.files_tree.pack(side='left', fill='both', expand=True)
-        
+
+        volume_frame = ttk.LabelFrame(paned_window, text="Daily Volume")
+        paned_window.add(volume_frame, weight=1)
+
+        volume_bar = ttk.Frame(volume_frame)
+        volume_bar.pack(fill='x', padx=10, pady=(10, 0))
+        ttk.Label(volume_bar, text="Keyword:").pack(side='left')
+        self.volume_keyword_var = tk.StringVar(value=ALL_KEYWORDS)
+        self.volume_keyword_combo = ttk.Combobox(volume_bar, textvariable=self.volume_keyword_var,
+                                                 values=[ALL_KEYWORDS], state='readonly', width=30)
+        self.volume_keyword_combo.pack(side='left', padx=5)
+        self.volume_keyword_combo.bind("<<ComboboxSelected>>", lambda e: self.draw_volume_chart())
+        self.volume_status_var = tk.StringVar()
+        ttk.Label(volume_bar, textvariable=self.volume_status_var, foreground='gray').pack(side='left', padx=5)
+
+        self.volume_canvas = tk.Canvas(volume_frame, height=140, background='white', highlightthickness=0)
+        self.volume_canvas.pack(fill='both', expand=True, padx=10, pady=10)
+        self.volume_canvas.bind("<Configure>", lambda e: self.draw_volume_chart())
+
+        search_frame = ttk.LabelFrame(paned_window, text="Search Tweets")
+        paned_window.add(search_frame, weight=2)
+
+        search_bar = ttk.Frame(search_frame)
+        search_bar.pack(fill='x', padx=10, pady=(10, 5))
+
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_bar, textvariable=self.search_var)
+        search_entry.pack(side='left', fill='x', expand=True)
+        search_entry.bind("<Return>", lambda e: self.search_tweets())
+        ttk.Button(search_bar, text="Search", command=self.search_tweets).pack(side='left', padx=(5, 0))
+
+        self.search_status_var = tk.StringVar(value='Words, "exact phrase", #hashtag, @mention, OR, NOT, prefix*')
+        ttk.Label(search_frame, textvariable=self.search_status_var, foreground='gray').pack(fill='x', padx=10)
+
+        search_columns = ('created_at', 'username', 'keyword', 'text')
+        self.search_tree = ttk.Treeview(search_frame, columns=search_columns, show='headings')
+        self.search_tree.heading('created_at', text='Date')
+        self.search_tree.heading('username', text='User')
+        self.search_tree.heading('keyword', text='Keyword')
+        self.search_tree.heading('text', text='Tweet')
+        self.search_tree.column('created_at', width=150)
+        self.search_tree.column('username', width=100)
+        self.search_tree.column('keyword', width=100)
+        self.search_tree.column('text', width=400)
+
+        search_scrollbar = ttk.Scrollbar(search_frame, orient=tk.VERTICAL, command=self.search_tree.yview)
+        self.search_tree.configure(yscroll=search_scrollbar.set)
+        self.search_tree.bind("<Double-1>", lambda e: self.open_selected_tweet())
+        self.search_urls = {}
+
+        search_scrollbar.pack(side='right', fill='y', pady=(0, 10))
+        self.search_tree.pack(side='left', fill='both', expand=True, padx=(10, 0), pady=(0, 10))
+
         action_frame = ttk.Frame(results_frame)
         action_frame.pack(fill='x', pady=10)
         
@@ -535,6 +793,8 @@ class TwitterScraperApp:
         
         ttk.Button(auth_frame, text="Save Token", command=self.save_auth_token).grid(
             row=0, column=2, padx=10, pady=10, sticky='w')
+        ttk.Button(auth_frame, text="Test Token", command=self.test_auth_token).grid(
+            row=0, column=3, padx=(0, 10), pady=10, sticky='w')
         
         ttk.Label(auth_frame, text="How to get your token:").grid(
             row=1, column=0, padx=10, pady=(0, 10), sticky='w')
@@ -581,7 +841,7 @@ class TwitterScraperApp:
         node_status_label = ttk.Label(node_frame, textvariable=self.node_status_var)
         node_status_label.pack(anchor='w', padx=10, pady=10)
         
-        ttk.Button(node_frame, text="Check Again", command=self.check_node_install).pack(
+        ttk.Button(node_frame, text="Check Again", command=lambda: self.check_node_install(refresh=True)).pack(
             anchor='w', padx=10, pady=(0, 10))
     
     def setup_help_tab(self):
@@ -662,12 +922,17 @@ class TwitterScraperApp:
 - Install Node.js from https://nodejs.org/
 - Restart the application after installation
 - Make sure Node.js is in your system PATH
+- The first scrape installs tweet-harvest into the tools folder (needs internet once); delete that folder to force a reinstall
 
 ### Authentication Issues
 - Twitter auth tokens expire periodically
 - Update your token in the Settings tab
 - Follow the instructions to get a new token
 
+### Jobs Timing Out
+- A job that prints nothing for IDLE_TIMEOUT seconds (default 300) or runs longer than JOB_TIMEOUT (default 1800) is stopped and marked as timed out
+- Adjust both values in the .env file; 0 disables a limit
+
 ### Rate Limiting
 - If you're getting rate limit errors, wait a while before trying again
 - Consider using longer intervals between requests
@@ -888,43 +1153,77 @@ This tool uses tweet-harvest for the actual scraping functionality.
         y = (cal_win.winfo_screenheight() // 2) - (height // 2)
         cal_win.geometry('{}x{}+{}+{}'.format(width, height, x, y))
     
-    def log(self, message):
-        # Check if we're in the main thread
-        if threading.current_thread() == threading.main_thread():
-            # We're in the main thread, safe to update UI directly
-            self._update_log(message)
-        else:
-            # We're in a background thread, use after to schedule update on main thread
-            self.root.after(0, lambda: self._update_log(message))
-            
-    def _update_log(self, message):
-        """Helper method to update the log text widget (must be called from main thread)"""
+    def log(self, message, level=logging.INFO):
+        # Safe from any thread: the message is only queued here and drawn by _drain_log
+        self.log_queue.put(message, level)
+        logger.log(level, message)
+    
+    def _format_log_record(self, record):
+        created, level, message = record
+        timestamp = datetime.fromtimestamp(created).strftime('%H:%M:%S')
+        if level >= logging.WARNING:
+            return f"[{timestamp}] {logging.getLevelName(level)}: {message}\n"
+        return f"[{timestamp}] {message}\n"
+    
+    def _drain_log(self):
+        """Move queued log messages into the widget in one batch (runs on the Tk tick)"""
+        try:
+            records, dropped = self.log_queue.drain()
+            if dropped:
+                records.insert(0, (time.time(), logging.WARNING, f"{dropped} log messages dropped"))
+            if records:
+                self.log_history.extend(records)
+                min_level = LEVELS.get(self.log_level_var.get(), logging.INFO)
+                text = ''.join(self._format_log_record(r) for r in records if r[1] >= min_level)
+                if text:
+                    self._write_log_text(text)
+            self._update_job_rows()
+        finally:
+            self.root.after(LOG_TICK_MS, self._drain_log)
+    
+    def _update_job_rows(self):
+        for job_number, output in list(self.job_progress.items()):
+            item = str(job_number)
+            if self.jobs_tree.exists(item):
+                limit = self.jobs_tree.set(item, 'tweets').split('/')[-1]
+                self.jobs_tree.set(item, 'tweets', f"{output.tweets}/{limit}")
+                self.jobs_tree.set(item, 'rate', f"{output.tweets_per_second:.1f}")
+    
+    def _write_log_text(self, text, replace=False):
         self.log_text.config(state='normal')
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+        if replace:
+            self.log_text.delete('1.0', tk.END)
+        self.log_text.insert(tk.END, text)
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > MAX_LOG_LINES:
+            self.log_text.delete('1.0', f"{line_count - MAX_LOG_LINES + 1}.0")
         self.log_text.see(tk.END)
         self.log_text.config(state='disabled')
-        logger.info(message)
     
-    def check_node_install(self):
+    def _render_log_history(self):
+        min_level = LEVELS.get(self.log_level_var.get(), logging.INFO)
+        text = ''.join(self._format_log_record(r) for r in self.log_history if r[1] >= min_level)
+        self._write_log_text(text, replace=True)
+    
+    def check_node_install(self, refresh=False):
         self.log("Checking Node.js installation...")
         self.node_status_var.set("Checking Node.js installation...")
         
         def check_thread():
-            result = self.scraper.check_node_installation()
+            result = self.scraper.check_node_installation(refresh=refresh)
             # Use root.after to update UI elements from the main thread
             def update_ui():
                 if result['success']:
                     self.node_status_var.set(
-                        f"✅ Node.js {result['node']} and npx {result['npx']} found and working properly."
+                        f"✅ Node.js {result['node']} and tweet-harvest {result['tweet_harvest']} found and working properly."
                     )
-                    self.log(f"Node.js {result['node']} and npx {result['npx']} found.")
+                    self.log(f"Node.js {result['node']} and tweet-harvest {result['tweet_harvest']} found.")
                 else:
                     self.node_status_var.set(
                         f"❌ Node.js installation issue: {result['error']}\n" +
                         "Please install Node.js from https://nodejs.org/"
                     )
-                    self.log(f"Node.js issue: {result['error']}")
+                    self.log(f"Node.js issue: {result['error']}", logging.ERROR)
             
             # Schedule the UI update to run on the main thread
             self.root.after(0, update_ui)
@@ -956,6 +1255,23 @@ This tool uses tweet-harvest for the actual scraping functionality.
         messagebox.showinfo("Success", "Auth token saved successfully!")
         self.log("Auth token updated")
     
+    def test_auth_token(self):
+        token = self.auth_token_var.get().strip()
+        
+        def check_thread():
+            status, detail = preflight_token(token)
+            def show_result():
+                self.log(f"Auth token check: {status} ({detail})")
+                if status == TOKEN_VALID:
+                    messagebox.showinfo("Token Check", "The auth token looks valid.")
+                elif status == TOKEN_INVALID:
+                    messagebox.showerror("Token Check", f"The auth token was rejected: {detail}")
+                else:
+                    messagebox.showwarning("Token Check", f"Could not verify the auth token: {detail}")
+            self.root.after(0, show_result)
+        
+        threading.Thread(target=check_thread, daemon=True).start()
+    
     def save_output_dir(self):
         output_dir = self.output_dir_var.get().strip()
         if not output_dir:
@@ -987,7 +1303,7 @@ This tool uses tweet-harvest for the actual scraping functionality.
                 
                 self.log(f"Updated OUTPUT_DIR in .env file to: {output_dir}")
         except Exception as e:
-            self.log(f"Warning: Could not update .env file: {e}")
+            self.log(f"Warning: Could not update .env file: {e}", logging.WARNING)
         
         messagebox.showinfo("Success", "Output directory saved successfully!")
         self.log(f"Output directory updated to: {output_dir}")
@@ -1232,6 +1548,7 @@ This tool uses tweet-harvest for the actual scraping functionality.
             limit = int(self.limit_var.get())
             lang = self.lang_var.get()
             tab = self.tab_var.get()
+            max_concurrent = int(self.max_concurrent_var.get())
             keywords_text = self.keywords_text.get('1.0', tk.END)
             keywords, use_quotes = self.parse_keywords_with_quotes(keywords_text)
             
@@ -1242,6 +1559,9 @@ This tool uses tweet-harvest for the actual scraping functionality.
             output_dir = self.output_dir_var.get()
             self.scraper.output_dir = output_dir
             self.stop_requested = False
+            self.cancel_token = CancelToken()
+            self.job_progress.clear()
+            self.jobs_tree.delete(*self.jobs_tree.get_children())
             self.stop_button.config(state='normal')
             self.status_var.set("Scraping in progress...")
             self.progress_var.set(0)
@@ -1257,50 +1577,16 @@ This tool uses tweet-harvest for the actual scraping functionality.
             import time
             threading.Thread(
                 target=self.run_scraping_job,
-                args=(keywords, use_quotes, start_date, end_date, interval, limit, lang, tab)
+                args=(keywords, use_quotes, start_date, end_date, interval, limit, lang, tab, max_concurrent)
             ).start()
             
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid input: {str(e)}")
     
-    def run_scraping_job(self, keywords, use_quotes, start_date, end_date, interval, limit, lang, tab):
-        import time
-        
+    def run_scraping_job(self, keywords, use_quotes, start_date, end_date, interval, limit, lang, tab,
+                         max_concurrent=1):
         try:
-            # Create a function to update the UI
-            def update_progress():
-                if self.current_batch['completed_jobs'] < total_jobs and not self.stop_requested:
-                    progress = (self.current_batch['completed_jobs'] / total_jobs) * 100
-                    # Update UI elements from the main thread
-                    self.progress_var.set(progress)
-                    self.status_var.set(f"Scraping: {self.current_batch['completed_jobs']}/{total_jobs} jobs")
-                    # Schedule the next update
-                    self.root.after(500, update_progress)
-                else:
-                    # Final update when complete
-                    if self.stop_requested:
-                        self.log("Scraping stopped by user")
-                        self.status_var.set("Scraping stopped")
-                    else:
-                        self.progress_var.set(100)
-                        self.status_var.set(f"Completed: {self.current_batch['successful_jobs']}/{total_jobs} successful")
-                        self.log(f"Scraping completed. {self.current_batch['successful_jobs']}/{total_jobs} jobs successful")
-                    
-                    # Schedule refresh_results and final message on main thread
-                    def finalize():
-                        self.refresh_results()
-                        if not self.stop_requested:
-                            messagebox.showinfo(
-                                "Scraping Complete",
-                                f"Completed {self.current_batch['successful_jobs']}/{total_jobs} jobs successfully.\n\n" +
-                                f"Files saved to: {self.scraper.output_dir}"
-                            )
-                            self.notebook.select(self.results_tab)
-                    
-                    self.root.after(0, finalize)
-
-            # Start the scraping operation
-            self.current_batch = self.scraper.batch_scrape(
+            results = self.scraper.batch_scrape(
                 keywords=keywords,
                 start_date=start_date,
                 end_date=end_date,
@@ -1308,60 +1594,108 @@ This tool uses tweet-harvest for the actual scraping functionality.
                 use_quotes=use_quotes,
                 limit=limit,
                 lang=lang,
-                tab=tab
+                tab=tab,
+                progress_callback=self.on_batch_event,
+                cancel_token=self.cancel_token,
+                max_concurrent=max_concurrent,
+                journal_path=os.path.join(
+                    self.scraper.output_dir, 'journals',
+                    f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+                )
             )
             
-            total_jobs = self.current_batch['total_jobs']
+            if 'total_jobs' not in results:
+                raise RuntimeError(results.get('reason', 'Batch could not be started'))
             
-            # Start the update process on the main thread
-            self.root.after(0, update_progress)
-            def update_progress():
-                if self.current_batch['completed_jobs'] < total_jobs and not self.stop_requested:
-                    progress = (self.current_batch['completed_jobs'] / total_jobs) * 100
-                    # Update UI elements from the main thread
-                    self.progress_var.set(progress)
-                    self.status_var.set(f"Scraping: {self.current_batch['completed_jobs']}/{total_jobs} jobs")
-                    # Schedule the next update
-                    self.root.after(500, update_progress)
+            def finalize():
+                self.current_batch = results
+                total_jobs = results['total_jobs']
+                if results.get('auth_halted'):
+                    self.log(f"Scraping halted after {results['completed_jobs']}/{total_jobs} jobs: {results['halt_reason']}",
+                             logging.ERROR)
+                    self.status_var.set(f"Halted: auth token rejected ({results['successful_jobs']}/{total_jobs} successful)")
+                    self.refresh_results()
+                    messagebox.showerror("Auth Token Rejected", results['halt_reason'])
+                    self.notebook.select(self.settings_tab)
+                    return
+                if self.stop_requested:
+                    self.log(f"Scraping stopped by user after {results['completed_jobs']}/{total_jobs} jobs")
+                    self.status_var.set(f"Scraping stopped: {results['successful_jobs']}/{total_jobs} successful")
                 else:
-                    # Final update when complete
-                    if self.stop_requested:
-                        self.log("Scraping stopped by user")
-                        self.status_var.set("Scraping stopped")
-                    else:
-                        self.progress_var.set(100)
-                        self.status_var.set(f"Completed: {self.current_batch['successful_jobs']}/{total_jobs} successful")
-                        self.log(f"Scraping completed. {self.current_batch['successful_jobs']}/{total_jobs} jobs successful")
-                    
-                    # Schedule refresh_results and final message on main thread
-                    def finalize():
-                        self.refresh_results()
-                        if not self.stop_requested:
-                            messagebox.showinfo(
-                                "Scraping Complete",
-                                f"Completed {self.current_batch['successful_jobs']}/{total_jobs} jobs successfully.\n\n" +
-                                f"Files saved to: {self.scraper.output_dir}"
-                            )
-                            self.notebook.select(self.results_tab)
-                    
-                    self.root.after(0, finalize)
+                    self.progress_var.set(100)
+                    self.status_var.set(f"Completed: {results['successful_jobs']}/{total_jobs} successful")
+                    self.log(f"Scraping completed. {results['successful_jobs']}/{total_jobs} jobs successful")
+                
+                self.refresh_results()
+                if not self.stop_requested:
+                    messagebox.showinfo(
+                        "Scraping Complete",
+                        f"Completed {results['successful_jobs']}/{total_jobs} jobs successfully.\n\n" +
+                        f"Files saved to: {self.scraper.output_dir}"
+                    )
+                    self.notebook.select(self.results_tab)
+            
+            self.root.after(0, finalize)
             
         except Exception as e:
             # Use the main thread to log and show errors
             error_msg = str(e)
             def show_error():
-                self.log(f"Error: {error_msg}")
+                self.log(f"Error: {error_msg}", logging.ERROR)
                 messagebox.showerror("Error", f"An error occurred during scraping: {error_msg}")
             self.root.after(0, show_error)
         
         finally:
-            self.stop_button.config(state='disabled')
+            self.root.after(0, lambda: self.stop_button.config(state='disabled'))
+    
+    def on_batch_event(self, event):
+        """Receives BatchEvents on the scraping thread"""
+        if event.kind == EVENT_LINE:
+            # Harvester output is already in the file log; only queue it for the widget
+            self.log_queue.put(event.line)
+            return
+        if event.kind == EVENT_PROGRESS:
+            # Only the newest reading per job matters, the Tk tick picks it up
+            self.job_progress[event.job_number] = event.output
+            return
+        self.root.after(0, lambda: self._apply_batch_event(event))
+    
+    def _apply_batch_event(self, event):
+        item = str(event.job_number)
+        if event.kind == EVENT_STARTED:
+            self.status_var.set(
+                f"Job {event.job_number}/{event.total_jobs}: {event.keyword} ({event.start_date} to {event.end_date})"
+            )
+            self.jobs_tree.insert('', 'end', iid=item, values=(
+                f"{event.job_number}/{event.total_jobs}", event.keyword,
+                f"{event.start_date} to {event.end_date}", f"0/{self.limit_var.get()}", "0.0"
+            ))
+            return
+        
+        self.job_progress.pop(event.job_number, None)
+        if self.jobs_tree.exists(item):
+            self.jobs_tree.delete(item)
+        self.progress_var.set((event.completed / event.total_jobs) * 100)
+        self.status_var.set(f"Scraping: {event.completed}/{event.total_jobs} jobs ({event.failed} failed)")
+        if event.kind == EVENT_RETRY:
+            self.log_queue.put(
+                f"Job {event.job_number} attempt {event.result['attempt']} failed: "
+                f"{event.result.get('reason', 'Unknown error')}, retrying in {event.result['retry_in']:.0f}s",
+                logging.WARNING
+            )
+        elif event.kind == EVENT_FAILED:
+            self.log_queue.put(
+                f"Job {event.job_number} failed: {event.result.get('reason', 'Unknown error')}", logging.WARNING
+            )
     
     def stop_scraping(self):
         if messagebox.askyesno("Stop Scraping", "Are you sure you want to stop the scraping process?"):
             self.stop_requested = True
             self.log("Requesting to stop scraping...")
             self.status_var.set("Stopping...")
+            if self.cancel_token is not None:
+                # Killing the harvester waits for it to exit, keep that off the Tk thread
+                threading.Thread(target=self.cancel_token.cancel, daemon=True).start()
     
     def clear_form(self):
         if messagebox.askyesno("Clear Form", "Are you sure you want to clear all inputs?"):
@@ -1392,10 +1726,11 @@ This tool uses tweet-harvest for the actual scraping functionality.
             self.limit_var.set(str(config['default_limit']))
             self.lang_var.set(config['default_lang'])
             self.tab_var.set(config['default_tab'])
+            self.max_concurrent_var.set(str(config['max_concurrent_jobs']))
             
-            self.log_text.config(state='normal')
-            self.log_text.delete('1.0', tk.END)
-            self.log_text.config(state='disabled')
+            self.log_queue.drain()
+            self.log_history.clear()
+            self._write_log_text('', replace=True)
             
             default_keywords = "#pilpres2024\ngibran\n\"Universitas Indonesia\""
             self.keywords_text.insert('1.0', default_keywords)
@@ -1422,7 +1757,8 @@ This tool uses tweet-harvest for the actual scraping functionality.
             
             self.summary_text.insert(tk.END, f"Total Jobs: {self.current_batch['total_jobs']}\n")
             self.summary_text.insert(tk.END, f"Successful: {self.current_batch['successful_jobs']}\n")
-            self.summary_text.insert(tk.END, f"Failed: {self.current_batch['failed_jobs']}\n\n")
+            self.summary_text.insert(tk.END, f"Failed: {self.current_batch['failed_jobs']}\n")
+            self.summary_text.insert(tk.END, f"Retried Attempts: {self.current_batch.get('retried_attempts', 0)}\n\n")
             
             start_time = self.current_batch['start_time'].strftime('%Y-%m-%d %H:%M:%S')
             self.summary_text.insert(tk.END, f"Start Time: {start_time}\n")
@@ -1441,71 +1777,63 @@ This tool uses tweet-harvest for the actual scraping functionality.
                 self.summary_text.insert(tk.END, f"End Time: {end_time}\n")
                 self.summary_text.insert(tk.END, f"Total Duration: {duration}\n")
             
+            if self.current_batch.get('journal'):
+                self.summary_text.insert(tk.END, f"Job Journal: {self.current_batch['journal']}\n")
+            
+            if self.current_batch['failed_jobs']:
+                errors = recent_errors(self.current_batch, limit=10)
+                self.summary_text.insert(tk.END, f"\nFirst {len(errors)} failed jobs:\n")
+                for error in errors:
+                    self.summary_text.insert(
+                        tk.END,
+                        f"  {error['keyword']} ({error['start_date']} to {error['end_date']}): {error['reason']}\n"
+                    )
+
+            timing_summary = self.current_batch.get('timing_summary')
+            if timing_summary:
+                self.summary_text.insert(tk.END, "\nTime per phase (p50 / p90 / max, total):\n")
+                for phase, stats in timing_summary.items():
+                    self.summary_text.insert(
+                        tk.END,
+                        f"  {phase}: {stats['p50']:.2f}s / {stats['p90']:.2f}s / {stats['max']:.2f}s, {stats['total']:.1f}s\n"
+                    )
+
         else:
             self.summary_text.insert(tk.END, "No batch scraping results available.\n\n")
         
         self.summary_text.insert(tk.END, "\nOUTPUT DIRECTORY SUMMARY\n\n")
         
         if output_dir.exists():
-            csv_files = list(output_dir.glob("*.csv"))
-            
-            tweets_data_dir = output_dir / 'tweets-data'
-            if tweets_data_dir.exists():
-                nested_csv_files = list(tweets_data_dir.glob("*.csv"))
-                if nested_csv_files:
-                    self.summary_text.insert(tk.END, "Note: Found legacy CSV files in nested tweets-data folder.\n")
-                    self.summary_text.insert(tk.END, "Moving them to the main directory...\n")
-                    
-                    moved_count = 0
-                    import shutil
-                    for nested_file in nested_csv_files:
-                        target_file = output_dir / nested_file.name
-                        try:
-                            if not target_file.exists():
-                                shutil.copy2(nested_file, target_file)
-                                try:
-                                    os.remove(nested_file)
-                                    moved_count += 1
-                                except Exception:
-                                    self.summary_text.insert(tk.END, f"Copied: {nested_file.name} to main directory (but couldn't delete source)\n")
-                            else:
-                                self.summary_text.insert(tk.END, f"Skipped: {nested_file.name} already exists in main directory\n")
-                        except Exception as e:
-                            self.summary_text.insert(tk.END, f"Error moving {nested_file.name}: {e}\n")
-                    
-                    if moved_count > 0:
-                        self.summary_text.insert(tk.END, f"Successfully moved {moved_count} files to main directory\n\n")
-                    
-                    csv_files = list(output_dir.glob("*.csv"))
-                    
-                    try:
-                        remaining_files = list(tweets_data_dir.glob("*"))
-                        if not remaining_files:
-                            import shutil
-                            shutil.rmtree(tweets_data_dir)
-                            self.summary_text.insert(tk.END, "Removed empty tweets-data directory\n\n")
-                    except Exception as e:
-                        self.summary_text.insert(tk.END, f"Note: Could not remove tweets-data directory: {e}\n\n")
+            index = OutputIndex(output_dir)
+            totals = index.totals()
+            # Files from before the sharded layout sit directly in the output folder and are not indexed
+            legacy_files = list(output_dir.glob("*.csv")) + list(output_dir.glob("*.csv.gz")) + list(output_dir.glob("*.csv.zst"))
             
             self.summary_text.insert(tk.END, f"Output Directory: {output_dir}\n")
-            self.summary_text.insert(tk.END, f"Total CSV Files: {len(csv_files)}\n")
+            self.summary_text.insert(tk.END, f"Indexed Files: {totals['files']} ({totals['tweets']} tweets)\n")
+            if legacy_files:
+                self.summary_text.insert(tk.END, f"Older Files (flat layout): {len(legacy_files)}\n")
             
-            total_size = sum(f.stat().st_size for f in csv_files)
+            total_size = totals['size'] + sum(f.stat().st_size for f in legacy_files)
+            self.summary_text.insert(tk.END, f"Total Size: {self._format_size(total_size)}\n")
+            if totals['files'] > MAX_RESULT_ROWS:
+                self.summary_text.insert(tk.END, f"Showing the {MAX_RESULT_ROWS} most recent files\n")
             
-            if total_size < 1024:
-                size_str = f"{total_size} bytes"
-            elif total_size < 1024 * 1024:
-                size_str = f"{total_size/1024:.1f} KB"
-            else:
-                size_str = f"{total_size/(1024*1024):.1f} MB"
-            
-            self.summary_text.insert(tk.END, f"Total Size: {size_str}\n")
+            for entry in index.iter_outputs(limit=MAX_RESULT_ROWS, newest_first=True):
+                keyword = f'"{entry["keyword"]}"' if entry['use_quotes'] else entry['keyword']
+                tweet_count = entry['tweet_count'] if entry['tweet_count'] is not None else "N/A"
+                self.files_tree.insert(
+                    '', 'end',
+                    values=(os.path.basename(entry['path']), f"{entry['start_date']} to {entry['end_date']}",
+                            keyword, self._format_size(entry['size'] or 0), tweet_count),
+                    tags=(entry['path'],)
+                )
             
-            for csv_file in csv_files:
+            for csv_file in legacy_files:
                 filename = csv_file.name
                 
                 try:
-                    parts = filename.replace('.csv', '').split('_')
+                    parts = logical_name(filename).replace('.csv', '').split('_')
                     
                     date_indices = []
                     for i, part in enumerate(parts):
@@ -1522,22 +1850,8 @@ This tool uses tweet-harvest for the actual scraping functionality.
                         keyword = ' '.join(parts[:-3] if len(parts) > 3 else parts)
                         date_str = '-'.join(parts[-3:]) if len(parts) > 3 else "Unknown"
                     
-                    size = csv_file.stat().st_size
-                    if size < 1024:
-                        size_str = f"{size} B"
-                    elif size < 1024 * 1024:
-                        size_str = f"{size/1024:.1f} KB"
-                    else:
-                        size_str = f"{size/(1024*1024):.1f} MB"
-                    
-                    try:
-                        df = pd.read_csv(csv_file)
-                        tweet_count = len(df)
-                    except:
-                        tweet_count = "N/A"
-                    
                     self.files_tree.insert(
-                        '', 'end', values=(filename, date_str, keyword, size_str, tweet_count),
+                        '', 'end', values=(filename, date_str, keyword, self._format_size(csv_file.stat().st_size), "N/A"),
                         tags=(str(csv_file),)
                     )
                     
@@ -1550,6 +1864,61 @@ This tool uses tweet-harvest for the actual scraping functionality.
             self.summary_text.insert(tk.END, f"Output directory {output_dir} does not exist.")
         
         self.summary_text.config(state='disabled')
+        self.draw_volume_chart(reload=True)
+
+    def draw_volume_chart(self, reload=False):
+        """Bar chart of tweets per day from the rollup store (the last CHART_DAYS days with data)"""
+        if reload or not hasattr(self, 'volume_series'):
+            self.volume_series = []
+            self.volume_summaries = {}
+            if not Path(self.scraper.output_dir).exists():
+                self.volume_status_var.set("No data yet")
+                return
+            try:
+                store = RollupStore(self.scraper.output_dir)
+                self.volume_series = store.series(granularity='day')
+                self.volume_keyword_combo['values'] = [ALL_KEYWORDS] + store.keywords()
+            except sqlite3.Error as e:
+                self.volume_series = []
+                self.volume_status_var.set(f"Rollups unavailable: {e}")
+                return
+
+        keyword = self.volume_keyword_var.get()
+        daily = {}
+        for entry in self.volume_series:
+            if keyword == ALL_KEYWORDS or entry['keyword'] == keyword:
+                daily[entry['period']] = daily.get(entry['period'], 0) + entry['tweets']
+        days = sorted(daily)[-CHART_DAYS:]
+
+        canvas = self.volume_canvas
+        canvas.delete('all')
+        if not days:
+            self.volume_status_var.set("No data yet")
+            return
+        peak = max(daily[day] for day in days)
+        if keyword not in self.volume_summaries:
+            self.volume_summaries[keyword] = self._volume_summary(keyword, days[0], days[-1])
+        self.volume_status_var.set(f"{days[0]} to {days[-1]}, peak {peak} tweets/day"
+                                   f"{self.volume_summaries[keyword]}")
+
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        margin = 20
+        bar_width = max(1, (width - 2 * margin) / len(days))
+        for position, day in enumerate(days):
+            bar_height = (height - 2 * margin) * daily[day] / peak if peak else 0
+            x = margin + position * bar_width
+            canvas.create_rectangle(x, height - margin - bar_height, x + max(1, bar_width - 1), height - margin,
+                                    fill='#1d9bf0', outline='')
+        canvas.create_text(margin, height - margin + 2, text=days[0], anchor='nw', font=('Segoe UI', 8))
+        canvas.create_text(width - margin, height - margin + 2, text=days[-1], anchor='ne', font=('Segoe UI', 8))
+        canvas.create_text(margin, margin - 2, text=str(peak), anchor='sw', font=('Segoe UI', 8))
+    
+    def _format_size(self, size):
+        if size < 1024:
+            return f"{size} B"
+        elif size < 1024 * 1024:
+            return f"{size/1024:.1f} KB"
+        return f"{size/(1024*1024):.1f} MB"
     
     def show_files_tree_menu(self, event):
         iid = self.files_tree.identify_row(event.y)
@@ -1557,6 +1926,17 @@ This tool uses tweet-harvest for the actual scraping functionality.
             self.files_tree.selection_set(iid)
             self.files_tree_menu.post(event.x_root, event.y_root)
     
+    def preview_selected_file(self):
+        """Show the selected file in a paged preview window instead of an external app"""
+        selection = self.files_tree.selection()
+        if not selection:
+            return
+        file_path = self.files_tree.item(selection[0], "tags")[0]
+        try:
+            CsvPreviewWindow(self.root, CsvPreview(file_path))
+        except (OSError, csv.Error) as e:
+            messagebox.showerror("Error", f"Could not preview file: {str(e)}")
+
     def open_selected_file(self):
         selection = self.files_tree.selection()
         if not selection:
@@ -1593,6 +1973,61 @@ This tool uses tweet-harvest for the actual scraping functionality.
         except Exception as e:
             messagebox.showerror("Error", f"Could not open folder: {str(e)}")
     
+    def _volume_summary(self, keyword, start_date, end_date):
+        """Approximate authors and top hashtag of the charted range, merged from the daily sketches"""
+        keywords = None if keyword == ALL_KEYWORDS else [keyword]
+        try:
+            store = RollupStore(self.scraper.output_dir)
+            summary = f", ~{store.approx_authors(keywords, start_date, end_date)} authors"
+            top = store.top_terms('hashtags', keywords, start_date, end_date, k=1)
+            if top:
+                summary += f", top {top[0][0]}"
+            return summary
+        except sqlite3.Error:
+            return ""
+
+    def search_tweets(self):
+        query = self.search_var.get().strip()
+        if not query:
+            return
+        output_dir = self.scraper.output_dir
+        self.search_status_var.set("Searching...")
+
+        def search_thread():
+            started = time.monotonic()
+            try:
+                index = SearchIndex(output_dir)
+                hits = index.search(query, limit=MAX_RESULT_ROWS)
+                total = index.count(query) if len(hits) >= MAX_RESULT_ROWS else len(hits)
+                error = None
+            except (ValueError, sqlite3.Error) as e:
+                hits, total, error = [], 0, str(e)
+            elapsed = (time.monotonic() - started) * 1000
+
+            def show_hits():
+                for item in self.search_tree.get_children():
+                    self.search_tree.delete(item)
+                self.search_urls = {}
+                if error:
+                    self.search_status_var.set(error)
+                    return
+                for hit in hits:
+                    text = ' '.join((hit['full_text'] or '').split())
+                    item = self.search_tree.insert('', 'end', values=(
+                        hit['created_at'], f"@{hit['username']}", hit['keyword'], text
+                    ))
+                    self.search_urls[item] = hit['tweet_url']
+                shown = f" (showing {len(hits)})" if total > len(hits) else ""
+                self.search_status_var.set(f"{total} tweets{shown} in {elapsed:.0f} ms")
+            self.root.after(0, show_hits)
+
+        threading.Thread(target=search_thread, daemon=True).start()
+
+    def open_selected_tweet(self):
+        selection = self.search_tree.selection()
+        if selection and self.search_urls.get(selection[0]):
+            webbrowser.open(self.search_urls[selection[0]])
+
     def open_output_folder(self):
         output_dir = self.output_dir_var.get()
         if not os.path.exists(output_dir):
@@ -1624,14 +2059,7 @@ This tool uses tweet-harvest for the actual scraping functionality.
             return
         
         try:
-            export_data = self.current_batch.copy()
-            export_data['start_time'] = self.current_batch['start_time'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            if self.current_batch['end_time']:
-                export_data['end_time'] = self.current_batch['end_time'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2)
+            write_batch_summary(self.current_batch, file_path)
             
             messagebox.showinfo("Success", f"Results summary exported to {file_path}")
             
@@ -1639,6 +2067,8 @@ This tool uses tweet-harvest for the actual scraping functionality.
             messagebox.showerror("Error", f"Could not export results: {str(e)}")
 
 def main():
+    ensure_env_file()
+    setup_logging()
     root = tk.Tk()
     app = TwitterScraperApp(root)
     root.mainloop()
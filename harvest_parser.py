@@ -0,0 +1,169 @@
+
+import re
+import time
+
+# Kinds of HarvestOutput the parser produces
+OUTPUT_TWEETS = 'tweets'
+OUTPUT_SCROLL = 'scroll'
+OUTPUT_RATE_LIMIT = 'rate_limited'
+OUTPUT_AUTH_ERROR = 'auth_error'
+OUTPUT_INVALID_QUERY = 'invalid_query'
+OUTPUT_NETWORK_ERROR = 'network_error'
+OUTPUT_NO_RESULTS = 'no_results'
+OUTPUT_ERROR = 'error'
+OUTPUT_SAVED = 'saved'
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+
+# tweet-harvest 2.6.x wording, kept loose on purpose: colours, emoji and small
+# rephrasings between releases should not break the parser.
+SAVED_PATTERN = re.compile(r'your tweets saved to:\s*(.+)$', re.IGNORECASE)
+TOTAL_PATTERN = re.compile(r'(?:total\s+)?tweets?\s+(?:saved|collected|fetched|scraped)\s*:\s*(\d+)', re.IGNORECASE)
+COUNT_PATTERN = re.compile(r'\b(\d+)\s+(new\s+)?tweets?\b', re.IGNORECASE)
+SCROLL_PATTERN = re.compile(r'\bscroll', re.IGNORECASE)
+# HTTP status codes only count next to a word that says they are one ("status code 401",
+# "HTTP 429"): a bare 401 is just as likely a tweet count.
+STATUS_CONTEXT = r'\b(?:https?(?:/[\d.]+)?|status(?:\s+code)?|code|response)\s*[:=]?\s*'
+RATE_LIMIT_PATTERN = re.compile(r'rate[\s_-]?limit|too many requests|' + STATUS_CONTEXT + r'429\b', re.IGNORECASE)
+AUTH_ERROR_PATTERN = re.compile(
+    r'invalid\s+(?:auth\s*)?token|auth(?:entication|_token)?\s+(?:failed|error|expired|invalid)'
+    r'|failed to log\s?in|login (?:failed|required)|not logged in|unauthori[sz]ed|' + STATUS_CONTEXT + r'401\b',
+    re.IGNORECASE
+)
+INVALID_QUERY_PATTERN = re.compile(
+    r'invalid\s+(?:search\s+)?query|query\s+(?:is\s+)?invalid|bad request|' + STATUS_CONTEXT + r'400\b',
+    re.IGNORECASE
+)
+NETWORK_ERROR_PATTERN = re.compile(
+    r'\be(?:connreset|connrefused|timedout|notfound|ai_again|pipe)\b|net::err_|socket hang up'
+    r'|network\s+(?:error|timeout)|navigation timeout|timeout of \d+\s*ms exceeded'
+    r'|bad gateway|service unavailable|gateway timeout|' + STATUS_CONTEXT + r'50[234]\b',
+    re.IGNORECASE
+)
+NO_RESULTS_PATTERN = re.compile(r'no (?:more )?tweets? (?:found|available)|no results', re.IGNORECASE)
+ERROR_PATTERN = re.compile(r'^(?:error\b|err!|npm err|\w*error:)', re.IGNORECASE)
+
+
+class HarvestOutput:
+    """One recognised harvester output line plus the job's progress at that point."""
+
+    __slots__ = ('kind', 'value', 'line', 'tweets', 'pages', 'tweets_per_second')
+
+    def __init__(self, kind, value, line, tweets, pages, tweets_per_second):
+        self.kind = kind
+        self.value = value
+        self.line = line
+        self.tweets = tweets
+        self.pages = pages
+        self.tweets_per_second = tweets_per_second
+
+    def __repr__(self):
+        return f"HarvestOutput({self.kind!r}, value={self.value!r}, tweets={self.tweets})"
+
+
+class HarvestOutputParser:
+    """Turns one job's tweet-harvest console output into typed progress events.
+
+    feed() takes a single stripped line and returns a HarvestOutput, or None
+    for chatter that carries no information. The parser also keeps running
+    totals (tweets fetched, pages scrolled, rate-limit hits, the auth error
+    and saved path if any) that scrape_tweets copies into the job result.
+    The search query is blanked out before matching, since the harvester
+    echoes it and a keyword like "unauthorized" must not look like an error.
+    """
+
+    def __init__(self, limit=None, query=None):
+        self.limit = limit
+        self.query = query
+        self.started_at = time.monotonic()
+        self.tweets = 0
+        self.pages = 0
+        self.rate_limited = 0
+        self.auth_error = None
+        self.invalid_query = None
+        self.network_errors = 0
+        self.no_results = False
+        self.errors = 0
+        self.saved_path = None
+
+    @property
+    def tweets_per_second(self):
+        elapsed = time.monotonic() - self.started_at
+        return self.tweets / elapsed if elapsed > 0 else 0.0
+
+    def _output(self, kind, value, line):
+        return HarvestOutput(kind, value, line, self.tweets, self.pages, self.tweets_per_second)
+
+    def feed(self, line):
+        line = ANSI_ESCAPE.sub('', line).strip()
+        if not line:
+            return None
+
+        match = SAVED_PATTERN.search(line)
+        if match:
+            self.saved_path = match.group(1).strip()
+            return self._output(OUTPUT_SAVED, self.saved_path, line)
+
+        text = line.replace(self.query, ' ') if self.query else line
+        return self._classify(text, line)
+
+    def _classify(self, text, line):
+        # Progress lines first: they are the bulk of the output and a count is never an error
+        match = TOTAL_PATTERN.search(text)
+        if match:
+            self.tweets = max(self.tweets, int(match.group(1)))
+            return self._output(OUTPUT_TWEETS, self.tweets, line)
+
+        match = COUNT_PATTERN.search(text)
+        if match:
+            count = int(match.group(1))
+            # "20 new tweets" is a page worth, anything else is a running total
+            self.tweets = self.tweets + count if match.group(2) else max(self.tweets, count)
+            if SCROLL_PATTERN.search(text):
+                self.pages += 1
+            return self._output(OUTPUT_TWEETS, self.tweets, line)
+
+        if AUTH_ERROR_PATTERN.search(text):
+            self.auth_error = line
+            return self._output(OUTPUT_AUTH_ERROR, line, line)
+
+        if INVALID_QUERY_PATTERN.search(text):
+            self.invalid_query = line
+            return self._output(OUTPUT_INVALID_QUERY, line, line)
+
+        if RATE_LIMIT_PATTERN.search(text):
+            self.rate_limited += 1
+            return self._output(OUTPUT_RATE_LIMIT, self.rate_limited, line)
+
+        if NETWORK_ERROR_PATTERN.search(text):
+            self.network_errors += 1
+            return self._output(OUTPUT_NETWORK_ERROR, line, line)
+
+        if SCROLL_PATTERN.search(text):
+            self.pages += 1
+            return self._output(OUTPUT_SCROLL, self.pages, line)
+
+        if NO_RESULTS_PATTERN.search(text):
+            if self.tweets == 0:
+                self.no_results = True
+            return self._output(OUTPUT_NO_RESULTS, self.tweets, line)
+
+        if ERROR_PATTERN.search(text):
+            self.errors += 1
+            return self._output(OUTPUT_ERROR, line, line)
+
+        return None
+
+    def stats(self):
+        return {
+            'tweets_reported': self.tweets,
+            'pages_scrolled': self.pages,
+            'rate_limited': self.rate_limited,
+            'auth_error': self.auth_error,
+            'invalid_query': self.invalid_query,
+            'network_errors': self.network_errors,
+            'no_results': self.no_results,
+            'error_lines': self.errors,
+            'saved_path': self.saved_path,
+            'tweets_per_second': round(self.tweets_per_second, 3),
+        }
@@ -0,0 +1,197 @@
+
+import os
+import queue
+import selectors
+import threading
+import time
+
+from config import logger
+from process_control import signal_process_tree
+
+READ_CHUNK = 65536
+# How long a job whose leader has exited may keep its pipe open (a child still holding stdout)
+EXIT_EOF_GRACE = 5.0
+
+
+class _SupervisedJob:
+    __slots__ = ('key', 'process', 'fd', 'on_line', 'on_exit', 'watchdog', 'buffer', 'eof', 'kill_at',
+                 'exited_at', 'orphans_killed')
+
+    def __init__(self, key, process, on_line, on_exit, watchdog):
+        self.key = key
+        self.process = process
+        self.fd = process.stdout.fileno()
+        self.on_line = on_line
+        self.on_exit = on_exit
+        self.watchdog = watchdog
+        self.buffer = b''
+        self.eof = False
+        self.kill_at = None
+        self.exited_at = None
+        self.orphans_killed = False
+
+
+class HarvestSupervisor:
+    """Reads the output of many running harvesters from a single thread.
+
+    On POSIX every stdout pipe is put in non-blocking mode and registered with
+    a selector (epoll/kqueue), so a hundred concurrent jobs cost one thread
+    and a wakeup only when some job actually printed. Windows cannot select()
+    on pipes; there one small reader thread per pipe forwards raw chunks to a
+    queue, and line splitting, callbacks and deadlines still all run on the
+    thread that calls poll().
+
+    Output is split into lines incrementally and handed to the job's on_line
+    callback. The job's Watchdog, if any, is enforced here without a thread of
+    its own. Once a job's pipe is closed and its process has exited,
+    on_exit(returncode) is called and the job is dropped. When the process
+    exits but a child it left behind (the browser) keeps the pipe open, the
+    child's group is killed after exit_grace seconds, and after twice that
+    the pipe is given up on so the job is reaped anyway.
+    """
+
+    def __init__(self, exit_grace=EXIT_EOF_GRACE):
+        self._jobs = {}
+        self.exit_grace = exit_grace
+        self._use_selector = os.name != 'nt'
+        if self._use_selector:
+            self._selector = selectors.DefaultSelector()
+        else:
+            self._chunks = queue.SimpleQueue()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def add(self, key, process, on_line, on_exit, watchdog=None):
+        """Start supervising a process spawned with stdout=PIPE in binary mode"""
+        job = _SupervisedJob(key, process, on_line, on_exit, watchdog)
+        self._jobs[key] = job
+        if watchdog is not None:
+            watchdog.watch(process)
+        if self._use_selector:
+            os.set_blocking(job.fd, False)
+            self._selector.register(job.fd, selectors.EVENT_READ, job)
+        else:
+            threading.Thread(target=self._pump, args=(job,), daemon=True).start()
+
+    def _pump(self, job):
+        stream = job.process.stdout
+        while True:
+            try:
+                chunk = stream.read1(READ_CHUNK)
+            except (OSError, ValueError):
+                chunk = b''
+            self._chunks.put((job, chunk))
+            if not chunk:
+                return
+
+    def poll(self, timeout=0.25):
+        """Dispatch output that arrives within timeout seconds, enforce deadlines and reap exited jobs"""
+        if self._use_selector:
+            if self._selector.get_map():
+                for selector_key, _ in self._selector.select(timeout):
+                    self._read(selector_key.data)
+            elif timeout > 0:
+                time.sleep(timeout)
+        else:
+            try:
+                job, chunk = self._chunks.get(timeout=timeout)
+                while True:
+                    self._feed(job, chunk)
+                    job, chunk = self._chunks.get_nowait()
+            except queue.Empty:
+                pass
+
+        self._enforce_deadlines()
+        self._reap()
+
+    def run(self, poll_interval=0.25):
+        while self._jobs:
+            self.poll(poll_interval)
+
+    def close(self):
+        if self._use_selector:
+            self._selector.close()
+
+    def _read(self, job):
+        try:
+            chunk = os.read(job.fd, READ_CHUNK)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b''
+        self._feed(job, chunk)
+
+    def _feed(self, job, chunk):
+        if job.eof:
+            # A Windows pump thread delivering after the pipe was given up on
+            return
+        if not chunk:
+            job.eof = True
+            if self._use_selector:
+                self._selector.unregister(job.fd)
+            if job.buffer:
+                self._dispatch(job, job.buffer)
+                job.buffer = b''
+            return
+
+        if job.watchdog is not None:
+            job.watchdog.touch()
+        # Harvester progress output redraws lines with bare carriage returns
+        pieces = (job.buffer + chunk).replace(b'\r', b'\n').split(b'\n')
+        job.buffer = pieces.pop()
+        for piece in pieces:
+            self._dispatch(job, piece)
+
+    def _dispatch(self, job, raw_line):
+        # Splitting on b'\n' never cuts a UTF-8 sequence, so decoding per line is safe
+        line = raw_line.decode('utf-8', errors='replace').strip()
+        if not line:
+            return
+        try:
+            job.on_line(line)
+        except Exception as e:
+            logger.warning(f"Output handler failed for {job.key}: {e}")
+
+    def _enforce_deadlines(self):
+        now = time.monotonic()
+        for job in list(self._jobs.values()):
+            if job.process.poll() is not None:
+                if not job.eof:
+                    self._close_orphaned(job, now)
+                continue
+            if job.watchdog is None:
+                continue
+            if job.kill_at is None:
+                reason = job.watchdog.check(now)
+                if reason:
+                    job.watchdog.expired_reason = reason
+                    logger.warning(f"Harvester {job.process.pid} {reason}, stopping it")
+                    signal_process_tree(job.process)
+                    job.kill_at = now + job.watchdog.kill_grace
+            elif now >= job.kill_at:
+                signal_process_tree(job.process, force=True)
+                job.kill_at = float('inf')
+
+    def _close_orphaned(self, job, now):
+        """The leader exited but something it started still holds stdout, so EOF never comes"""
+        if job.exited_at is None:
+            job.exited_at = now
+        elif not job.orphans_killed and now - job.exited_at >= self.exit_grace:
+            logger.warning(f"Harvester {job.process.pid} exited but its children keep the output open, killing them")
+            signal_process_tree(job.process, force=True)
+            job.orphans_killed = True
+        elif now - job.exited_at >= 2 * self.exit_grace:
+            logger.warning(f"Output of harvester {job.process.pid} never closed, reaping it anyway")
+            self._feed(job, b'')
+
+    def _reap(self):
+        for key, job in list(self._jobs.items()):
+            if not job.eof or job.process.poll() is None:
+                continue
+            del self._jobs[key]
+            job.process.stdout.close()
+            try:
+                job.on_exit(job.process.returncode)
+            except Exception as e:
+                logger.error(f"Exit handler failed for {key}: {e}")
@@ -0,0 +1,131 @@
+
+import csv
+import sqlite3
+
+from config import config, logger
+from dedup import DedupIndex
+from output_index import OutputIndex
+from rollups import RollupAccumulator, RollupStore
+from search_index import SearchIndex
+from storage import iter_rows
+from worker_pool import WorkerPool
+
+STORE_ERRORS = (sqlite3.Error, OSError, RuntimeError, csv.Error)
+
+
+def ingest_output(output_dir, path, keyword, query=None):
+    """Bring the derived stores up to date with one finished output file.
+
+    Called by the scraper (through an IngestPool) as each job lands, and by 'cli.py search
+    --reindex' for files scraped before the stores existed. The file is read
+    once: rows stream into the search index while the rollups are
+    aggregated and the ids and texts for near-duplicate clustering are
+    collected on the way through. Failures are logged and never fail the
+    job: the CSV itself is the source of truth and can be ingested again
+    later. query is the file's output index query hash.
+    """
+    search, rollups, dedup = config['search_index'], config['rollups'], config['dedup']
+    if not (search or rollups or dedup):
+        return None
+
+    def read():
+        rows = iter_rows(path)
+        if accumulator:
+            rows = accumulator.observe(rows)
+        if texts is not None:
+            rows = _collect_texts(rows, texts)
+        return rows
+
+    accumulator = RollupAccumulator() if rollups else None
+    texts = [] if dedup else None
+    rows = read()
+    indexed = None
+
+    if search:
+        try:
+            indexed = SearchIndex(output_dir).index_file(path, keyword, rows)
+            logger.debug(f"Indexed {indexed} tweets from {path}")
+        except STORE_ERRORS as e:
+            logger.warning(f"Could not index {path} for search: {e}")
+            # The failed pass may have stopped part way; the other stores start from a fresh read
+            accumulator = RollupAccumulator() if rollups else None
+            texts = [] if dedup else None
+            rows = read()
+
+    try:
+        for _ in rows:
+            pass
+    except STORE_ERRORS as e:
+        logger.warning(f"Could not read {path}: {e}")
+        return indexed
+
+    if accumulator:
+        try:
+            RollupStore(output_dir).replace_file(path, keyword, accumulator, query)
+            if accumulator.skipped:
+                logger.debug(f"{accumulator.skipped} rows of {path} had no usable created_at")
+        except STORE_ERRORS as e:
+            logger.warning(f"Could not update rollups for {path}: {e}")
+
+    if texts is not None:
+        try:
+            duplicates = DedupIndex(output_dir).add_file(path, texts)
+            if duplicates:
+                logger.info(f"{duplicates} of {len(texts)} tweets in {path} are near-duplicates of earlier tweets")
+        except STORE_ERRORS as e:
+            logger.warning(f"Could not cluster near-duplicates for {path}: {e}")
+
+    return indexed
+
+
+def _collect_texts(rows, texts):
+    for row in rows:
+        try:
+            texts.append((int(row.get('id_str') or ''), row.get('full_text') or ''))
+        except ValueError:
+            pass
+        yield row
+
+
+def forget_output(output_dir, path):
+    """Drop a deleted or replaced file from the derived stores"""
+    for store in (SearchIndex(output_dir), RollupStore(output_dir), DedupIndex(output_dir)):
+        try:
+            store.remove_file(path)
+        except STORE_ERRORS as e:
+            logger.warning(f"Could not remove {path} from {store.path.name}: {e}")
+
+
+def reingest_all(output_dir, on_file=None):
+    """Ingest every file in the output index again; returns the number of files"""
+    index = OutputIndex(output_dir)
+    for path in index.prune_missing():
+        forget_output(output_dir, path)
+    files = 0
+    for entry in index.iter_outputs():
+        ingest_output(output_dir, entry['path'], entry['keyword'], entry['query_hash'])
+        files += 1
+        if on_file:
+            on_file(entry)
+    if files and config['search_index']:
+        SearchIndex(output_dir).optimize()
+    return files
+
+
+class IngestPool(WorkerPool):
+    """Runs ingest_output and forget_output for the scraper in one worker process.
+
+    A single worker keeps the store writes in submission order, so a file
+    replaced by a recompressed copy is forgotten before the copy is ingested.
+    """
+
+    action = 'ingest'
+
+    def __init__(self):
+        super().__init__(max_workers=1)
+
+    def ingest(self, output_dir, path, keyword, query=None):
+        return self.submit(path, ingest_output, output_dir, path, keyword, query)
+
+    def forget(self, output_dir, path):
+        return self.submit(path, forget_output, output_dir, path)
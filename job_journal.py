@@ -0,0 +1,101 @@
+
+import json
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+
+class JobJournal:
+    """Append-only JSON-lines record of finished batch jobs.
+
+    batch_scrape writes one line per job here instead of keeping every job
+    result in memory, so a 50k-job backfill costs the same RAM as a 5-job one.
+    The file is opened per append, so everything written so far survives a
+    crash or a killed process.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def append(self, entry):
+        with open(self.path, 'a', encoding='utf-8') as journal_file:
+            journal_file.write(json.dumps(entry, default=str) + '\n')
+
+    def __iter__(self):
+        return iter_journal(self.path)
+
+
+def iter_journal(path):
+    with open(path, 'r', encoding='utf-8') as journal_file:
+        for line in journal_file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_details(results):
+    """Job details of a batch, whether they were kept in memory or journaled"""
+    if results.get('journal'):
+        return iter_journal(results['journal'])
+    return iter(results.get('details', []))
+
+
+def iter_errors(results):
+    if results.get('journal'):
+        return (
+            {
+                'keyword': entry['keyword'],
+                'start_date': entry['start_date'],
+                'end_date': entry['end_date'],
+                'reason': entry['result'].get('reason', 'Unknown error')
+            }
+            for entry in iter_journal(results['journal']) if not entry['success']
+        )
+    return iter(results.get('errors', []))
+
+
+def iter_files_created(results):
+    if results.get('journal'):
+        return (entry['result']['path'] for entry in iter_journal(results['journal']) if entry['success'])
+    return iter(results.get('files_created', []))
+
+
+def recent_errors(results, limit=20):
+    return list(islice(iter_errors(results), limit))
+
+
+def _write_json_array(json_file, items, indent):
+    json_file.write('[')
+    first = True
+    for item in items:
+        json_file.write('\n' if first else ',\n')
+        json_file.write(json.dumps(item, default=str, indent=indent))
+        first = False
+    json_file.write('\n]' if not first else ']')
+
+
+def write_batch_summary(results, file_path, indent=2):
+    """Export a batch summary, streaming per-job sections from the journal when there is one"""
+    streamed = {
+        'files_created': iter_files_created(results),
+        'errors': iter_errors(results),
+        'details': iter_details(results),
+    }
+    summary = {}
+    for key, value in results.items():
+        if key in streamed:
+            continue
+        if isinstance(value, datetime):
+            value = value.strftime('%Y-%m-%d %H:%M:%S')
+        summary[key] = value
+
+    with open(file_path, 'w', encoding='utf-8') as json_file:
+        header = json.dumps(summary, default=str, indent=indent)
+        json_file.write(header[:-1].rstrip())
+        separator = ',' if summary else ''
+        for key, items in streamed.items():
+            json_file.write(f'{separator}\n{" " * indent}"{key}": ')
+            _write_json_array(json_file, items, None)
+            separator = ','
+        json_file.write('\n}\n')
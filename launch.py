@@ -2,9 +2,12 @@
 import os
 import sys
 import tkinter as tk
+from config import ensure_env_file, setup_logging
 from gui import TwitterScraperApp
 
 def main():
+    ensure_env_file()
+    setup_logging()
     root = tk.Tk()
     root.title("Twitter Scraper Agent")
     app = TwitterScraperApp(root)
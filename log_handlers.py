@@ -0,0 +1,60 @@
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record, for grepping or shipping logs elsewhere"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket that lets through at most rate records per second (with a burst allowance).
+
+    Records over the limit are dropped and counted; the next record that gets
+    through says how many were skipped. Attached to the harvester logger so a
+    chatty harvester cannot flood the log or slow down the output readers.
+    A rate of 0 or less disables the limit.
+    """
+
+    def __init__(self, rate, burst=None):
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                self._suppressed += 1
+                return False
+            self._tokens -= 1
+            suppressed, self._suppressed = self._suppressed, 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} earlier lines not logged)"
+            record.args = None
+        return True
@@ -0,0 +1,46 @@
+
+import logging
+import threading
+import time
+from collections import deque
+
+LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+}
+
+
+class LogQueue:
+    """Thread-safe ring buffer of log messages waiting to be shown in the UI.
+
+    Producers (scraper threads, harvester output) only append to a bounded
+    deque; the UI thread drains everything that arrived since the last tick
+    in one go. When producers outrun the UI the oldest messages are dropped
+    and counted instead of growing memory without limit.
+    """
+
+    def __init__(self, capacity=5000):
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._dropped = 0
+
+    def put(self, message, level=logging.INFO):
+        record = (time.time(), level, message)
+        with self._lock:
+            if len(self._records) == self._records.maxlen:
+                self._dropped += 1
+            self._records.append(record)
+
+    def drain(self):
+        with self._lock:
+            records = list(self._records)
+            self._records.clear()
+            dropped = self._dropped
+            self._dropped = 0
+        return records, dropped
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
@@ -0,0 +1,97 @@
+
+import os
+
+from config import logger
+from storage import SUFFIXES, read_dataframe
+from tweet_fields import CREATED_AT_FORMAT, HASHTAG_PATTERN, MENTION_PATTERN
+from worker_pool import WorkerPool
+
+ID_COLUMNS = ('id_str', 'conversation_id_str', 'user_id_str')
+COUNT_COLUMNS = ('favorite_count', 'quote_count', 'reply_count', 'retweet_count')
+CATEGORY_COLUMNS = ('lang', 'username', 'in_reply_to_screen_name', 'location')
+URL_PATTERN = r'(https?://\S+)'
+
+
+def typed_path(path):
+    """Where the typed table of an output CSV goes: next to it, as .parquet"""
+    path = str(path)
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+            break
+    if path.endswith('.csv'):
+        path = path[:-len('.csv')]
+    return path + '.parquet'
+
+
+def normalize_frame(df):
+    """Typed copy of a raw tweet-harvest frame (all columns read as str).
+
+    created_at becomes a UTC datetime64, ids int64 (nullable Int64 when
+    some are missing), engagement counts the smallest unsigned integer type
+    that fits, repetitive text columns categorical, and hashtags, mentions
+    and urls lower-cased lists extracted with vectorised string operations.
+    """
+    import pandas as pd
+    typed = pd.DataFrame(index=df.index)
+    for column in df.columns:
+        values = df[column]
+        if column == 'created_at':
+            typed[column] = pd.to_datetime(values, format=CREATED_AT_FORMAT, errors='coerce', utc=True)
+        elif column in ID_COLUMNS:
+            numbers = pd.to_numeric(values.replace('', None), errors='coerce')
+            typed[column] = numbers.astype('int64') if numbers.notna().all() else numbers.astype('Int64')
+        elif column in COUNT_COLUMNS:
+            typed[column] = pd.to_numeric(pd.to_numeric(values, errors='coerce').fillna(0), downcast='unsigned')
+        elif column in CATEGORY_COLUMNS:
+            typed[column] = values.astype('category')
+        else:
+            typed[column] = values
+
+    if 'full_text' in df.columns:
+        text = df['full_text'].str.lower()
+        typed['hashtags'] = text.str.findall(HASHTAG_PATTERN)
+        typed['mentions'] = text.str.findall(MENTION_PATTERN)
+        typed['urls'] = df['full_text'].str.findall(URL_PATTERN)
+    return typed
+
+
+def read_typed(path, columns=None):
+    """Typed table of an output CSV, or None when it has none yet or the CSV was rewritten since"""
+    import pandas as pd
+    target = typed_path(path)
+    try:
+        if os.path.getmtime(target) < os.path.getmtime(path):
+            return None
+    except OSError:
+        return None
+    return pd.read_parquet(target, columns=columns)
+
+
+def normalize_file(path):
+    """Write the typed table for one output file; returns (typed path, rows, raw bytes, typed bytes).
+
+    Runs in a worker process. Memory sizes are the in-memory footprint of
+    the raw and typed frames, for the log line.
+    """
+    raw = read_dataframe(path, dtype=str, keep_default_na=False)
+    typed = normalize_frame(raw)
+    target = typed_path(path)
+    partial = f"{target}.part"
+    typed.to_parquet(partial, index=False)
+    os.replace(partial, target)
+    return target, len(typed), int(raw.memory_usage(deep=True).sum()), int(typed.memory_usage(deep=True).sum())
+
+
+class NormalizePool(WorkerPool):
+    """Runs normalize_file for finished jobs in worker processes"""
+
+    action = 'normalize'
+
+    def submit(self, path):
+        return super().submit(path, normalize_file, path)
+
+    def report(self, path, result):
+        target, rows, raw_bytes, typed_bytes = result
+        ratio = f", {raw_bytes / typed_bytes:.1f}x smaller in memory" if typed_bytes else ""
+        logger.info(f"Typed table for {rows} tweets written to {target}{ratio}")
@@ -0,0 +1,175 @@
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from sqlite_store import SqliteStore
+from storage import SUFFIXES, logical_name
+
+INDEX_FILE = 'index.sqlite'
+MAX_SLUG_LENGTH = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    path TEXT PRIMARY KEY,
+    query_hash TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    use_quotes INTEGER NOT NULL,
+    lang TEXT,
+    tab TEXT,
+    search_query TEXT,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    size INTEGER,
+    tweet_count INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_query ON outputs (query_hash, start_date, end_date);
+CREATE INDEX IF NOT EXISTS outputs_created ON outputs (created_at);
+"""
+
+
+def query_slug(keyword):
+    slug = re.sub(r'\W+', '_', keyword).strip('_').lower()
+    return slug[:MAX_SLUG_LENGTH].rstrip('_') or 'query'
+
+
+def query_hash(keyword, use_quotes, lang, tab):
+    """Stable id of a query: differs whenever the text, quoting, language or tab differ"""
+    canonical = json.dumps([keyword, bool(use_quotes), lang, tab], ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:10]
+
+
+def output_location(output_dir, keyword, use_quotes, lang, tab, start_date, end_date):
+    """(file name, final path) of a job's CSV.
+
+    Files are sharded as <slug>-<hash>/<year>/<month>/ so no directory grows
+    without bound, and the name repeats slug and hash so "#pilpres2024" and
+    "pilpres2024", or a quoted and an unquoted phrase, never share a file.
+    The same name is used for the harvester's own output, which keeps
+    concurrent jobs apart in tweets-data/ too.
+    """
+    query_dir = f"{query_slug(keyword)}-{query_hash(keyword, use_quotes, lang, tab)}"
+    filename = f'{query_dir}_{start_date.replace("-", "_")}_to_{end_date.replace("-", "_")}.csv'
+    year, month = start_date[:4], start_date[5:7]
+    return filename, os.path.join(output_dir, query_dir, year, month, filename)
+
+
+class OutputIndex(SqliteStore):
+    """sqlite index of finished job outputs under output_dir/.harvest/.
+
+    Maps a query (keyword, quotes, lang, tab) and date range to its file, so
+    lookups and the Results tab never have to list or parse the sharded
+    tree. Paths are stored relative to output_dir so the folder can be moved.
+    A connection is opened per call, which keeps it safe to use from the
+    scraping thread and the UI thread at the same time.
+    """
+
+    FILENAME = INDEX_FILE
+    SCHEMA = SCHEMA
+
+    def _absolute(self, row):
+        entry = dict(row)
+        entry['use_quotes'] = bool(entry['use_quotes'])
+        entry['path'] = str(self.output_dir / entry['path'])
+        return entry
+
+    def _siblings(self, relative):
+        """Other names the same output can have: the file with a different compression suffix"""
+        base = relative[:len(relative) - len(os.path.basename(relative))] + logical_name(relative)
+        return [name for name in [base] + [base + suffix for suffix in SUFFIXES.values()] if name != relative]
+
+    def record(self, path, keyword, use_quotes, lang, tab, search_query, start_date, end_date,
+               size=None, tweet_count=None):
+        """Add or replace the entry of a job's file; returns the paths of sibling entries it replaced.
+
+        A re-scrape after switching OUTPUT_COMPRESSION writes foo.csv.gz
+        where foo.csv was (or the other way round). The older sibling entry is
+        dropped so the same job is never counted twice; the caller removes
+        the stale file and its derived data.
+        """
+        relative = self._relative(path)
+        siblings = self._siblings(relative)
+        connection = self._connect()
+        try:
+            with connection:
+                replaced = [row['path'] for row in connection.execute(
+                    f"SELECT path FROM outputs WHERE path IN ({', '.join('?' for _ in siblings)})", siblings
+                )]
+                connection.executemany('DELETE FROM outputs WHERE path = ?', [(name,) for name in replaced])
+                connection.execute(
+                    'INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (relative, query_hash(keyword, use_quotes, lang, tab), keyword,
+                     int(bool(use_quotes)), lang, tab, search_query, start_date, end_date,
+                     size, tweet_count, datetime.now().isoformat(timespec='seconds'))
+                )
+            return [str(self.output_dir / name) for name in replaced]
+        finally:
+            connection.close()
+
+    def update(self, path, **fields):
+        if not fields:
+            return
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(f'UPDATE outputs SET {assignments} WHERE path = ?',
+                                   list(fields.values()) + [self._relative(path)])
+        finally:
+            connection.close()
+
+    def lookup(self, keyword, use_quotes, lang, tab, start_date=None, end_date=None):
+        """Entries for a query, optionally only the one covering exactly start_date..end_date"""
+        sql = 'SELECT * FROM outputs WHERE query_hash = ?'
+        params = [query_hash(keyword, use_quotes, lang, tab)]
+        if start_date is not None:
+            sql += ' AND start_date = ? AND end_date = ?'
+            params += [start_date, end_date]
+        connection = self._connect()
+        try:
+            return [self._absolute(row) for row in connection.execute(sql + ' ORDER BY start_date', params)]
+        finally:
+            connection.close()
+
+    def iter_outputs(self, keyword=None, limit=None, newest_first=False):
+        sql = 'SELECT * FROM outputs'
+        params = []
+        if keyword is not None:
+            sql += ' WHERE keyword = ?'
+            params.append(keyword)
+        sql += ' ORDER BY created_at DESC' if newest_first else ' ORDER BY keyword, start_date'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        connection = self._connect()
+        try:
+            for row in connection.execute(sql, params):
+                yield self._absolute(row)
+        finally:
+            connection.close()
+
+    def totals(self):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT COUNT(*) AS files, COALESCE(SUM(size), 0) AS size, '
+                'COALESCE(SUM(tweet_count), 0) AS tweets FROM outputs'
+            ).fetchone()
+            return dict(row)
+        finally:
+            connection.close()
+
+    def prune_missing(self):
+        """Drop entries whose file was deleted by hand; returns their paths"""
+        connection = self._connect()
+        try:
+            missing = [row['path'] for row in connection.execute('SELECT path FROM outputs')
+                       if not (self.output_dir / row['path']).exists()]
+            with connection:
+                connection.executemany('DELETE FROM outputs WHERE path = ?', [(path,) for path in missing])
+            return [str(self.output_dir / path) for path in missing]
+        finally:
+            connection.close()
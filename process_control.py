@@ -0,0 +1,156 @@
+
+import os
+import signal
+import subprocess
+import threading
+import time
+
+from config import logger
+
+DEFAULT_KILL_GRACE = 0.5
+
+
+def popen_group_kwargs():
+    """Popen arguments that start the harvester in its own process group.
+
+    node (or npx when there is no local install) and the browser it drives
+    then share one group we can signal as a whole instead of only killing
+    the outermost process.
+    """
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def signal_process_tree(process, force=False):
+    """Ask a harvester and its children to stop (SIGTERM), or kill them outright when force is set.
+
+    Does not wait, so it is safe to call from the supervisor loop.
+    """
+    if os.name == 'nt':
+        # taskkill /T walks node -> browser; console apps ignore anything softer than /F.
+        # Started, not waited for: it can take a second and the supervisor loop must not stall.
+        try:
+            subprocess.Popen(['taskkill', '/PID', str(process.pid), '/T', '/F'],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            logger.warning(f"Could not run taskkill for {process.pid}: {e}")
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def terminate_process_trees(processes, grace=DEFAULT_KILL_GRACE):
+    """Stop every process with its children, escalating from SIGTERM to SIGKILL after grace seconds"""
+    running = [p for p in processes if p.poll() is None]
+    if not running:
+        return
+
+    for process in running:
+        signal_process_tree(process)
+
+    if os.name != 'nt':
+        deadline = time.monotonic() + grace
+        for process in running:
+            try:
+                process.wait(timeout=max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                pass
+
+        for process in running:
+            if process.poll() is None:
+                logger.warning(f"Process {process.pid} ignored SIGTERM, sending SIGKILL")
+            # The group may outlive its leader, so always finish it off
+            signal_process_tree(process, force=True)
+
+    for process in running:
+        try:
+            process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            logger.error(f"Process {process.pid} is still running after kill")
+
+
+def terminate_process_tree(process, grace=DEFAULT_KILL_GRACE):
+    terminate_process_trees([process], grace)
+
+
+class CancelToken:
+    """Shared stop flag for a batch that also knows which harvesters are running.
+
+    cancel() can be called from any thread (e.g. the GUI's Stop button). It
+    stops new jobs from being scheduled, wakes up the inter-job sleep and kills
+    every registered process group.
+    """
+
+    def __init__(self, kill_grace=DEFAULT_KILL_GRACE):
+        self.kill_grace = kill_grace
+        self.cancelled_at = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        if self.cancelled_at is None:
+            self.cancelled_at = time.monotonic()
+        self._event.set()
+        with self._lock:
+            processes = list(self._processes)
+        if processes:
+            logger.info(f"Cancelling {len(processes)} running harvester(s)")
+            terminate_process_trees(processes, self.kill_grace)
+
+    def register(self, process):
+        with self._lock:
+            self._processes.add(process)
+        # Covers a cancel() that happened between the check and the spawn
+        if self.cancelled:
+            terminate_process_tree(process, self.kill_grace)
+
+    def unregister(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+    def wait(self, timeout):
+        """Sleep for timeout seconds unless cancelled first; returns True when cancelled"""
+        return self._event.wait(timeout)
+
+
+class Watchdog:
+    """Idle-output and total-runtime deadlines for one harvester.
+
+    The HarvestSupervisor calls touch() whenever the job prints and check()
+    on every poll. When no output arrives for idle_timeout seconds, or the
+    job runs longer than total_timeout, the supervisor stops the process tree
+    and expired_reason records why. A timeout of None or 0 disables that limit.
+    """
+
+    def __init__(self, idle_timeout=None, total_timeout=None, kill_grace=DEFAULT_KILL_GRACE):
+        self.idle_timeout = idle_timeout or None
+        self.total_timeout = total_timeout or None
+        self.kill_grace = kill_grace
+        self.expired_reason = None
+        self.started_at = None
+        self.last_activity = None
+
+    def watch(self, process):
+        self.started_at = self.last_activity = time.monotonic()
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def check(self, now=None):
+        """Return why the job is overdue, or None while it is within its limits"""
+        if self.started_at is None:
+            return None
+        now = now if now is not None else time.monotonic()
+        if self.total_timeout and now - self.started_at > self.total_timeout:
+            return f"exceeded total timeout of {self.total_timeout:g}s"
+        if self.idle_timeout and now - self.last_activity > self.idle_timeout:
+            return f"no output for {self.idle_timeout:g}s"
+        return None
@@ -0,0 +1,70 @@
+
+import random
+
+FAILURE_TRANSIENT = 'transient'
+FAILURE_PERMANENT = 'permanent'
+FAILURE_CANCELLED = 'cancelled'
+
+# A harvester that exited without output or without saying why may hit the same wall again: one retry only
+UNCERTAIN_CAUSES = ('no_output', 'unknown')
+UNCERTAIN_MAX_ATTEMPTS = 2
+
+
+def classify_failure(result):
+    """Return (category, cause) for a failed job result, or (None, None) if it succeeded.
+
+    Transient failures (timeouts, rate limits, network trouble, a harvester
+    that died without saying why) are worth another attempt; permanent ones
+    (rejected token, invalid query, a range that genuinely has no tweets, a
+    harvester that cannot be started) will fail the same way every time.
+    The causes in UNCERTAIN_CAUSES count as transient but are retried once.
+    """
+    if result.get('success'):
+        return None, None
+    if result.get('cancelled'):
+        return FAILURE_CANCELLED, 'cancelled'
+
+    harvest = result.get('harvest') or {}
+    if result.get('auth_error') or harvest.get('auth_error'):
+        return FAILURE_PERMANENT, 'auth'
+    if harvest.get('invalid_query'):
+        return FAILURE_PERMANENT, 'invalid_query'
+    if result.get('start_failed'):
+        return FAILURE_PERMANENT, 'start_failed'
+    if result.get('timed_out'):
+        return FAILURE_TRANSIENT, 'timeout'
+    if harvest.get('rate_limited'):
+        return FAILURE_TRANSIENT, 'rate_limited'
+    if harvest.get('network_errors'):
+        return FAILURE_TRANSIENT, 'network'
+    if result.get('no_results') or result.get('reason') == 'Empty file':
+        return FAILURE_PERMANENT, 'no_results'
+    if result.get('reason') == 'File not created':
+        return FAILURE_TRANSIENT, 'no_output'
+    return FAILURE_TRANSIENT, 'unknown'
+
+
+class RetryPolicy:
+    """How often and how late batch_scrape retries a transient failure.
+
+    A job gets at most max_attempts runs. Before attempt n+1 it waits a
+    random time between half and all of base_delay * 2**(n-1), capped at
+    max_delay, so jobs that failed together (one rate-limit wave) do not all
+    come back at the same moment. max_attempts of 1 disables retries, and
+    failures of an uncertain cause get at most UNCERTAIN_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=30, max_delay=600):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = max(0.0, float(base_delay))
+        self.max_delay = max(0.0, float(max_delay))
+
+    def should_retry(self, result, attempt):
+        category, cause = classify_failure(result)
+        limit = min(self.max_attempts, UNCERTAIN_MAX_ATTEMPTS) if cause in UNCERTAIN_CAUSES else self.max_attempts
+        return category == FAILURE_TRANSIENT and attempt < limit
+
+    def delay(self, attempt):
+        """Seconds to wait after the given (1-based) failed attempt"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(ceiling / 2, ceiling)
@@ -0,0 +1,267 @@
+
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sketches import DaySketches, HyperLogLog, TermSketch, TERM_KINDS
+from sqlite_store import SqliteStore
+from tweet_fields import CREATED_AT_FORMAT
+
+ROLLUP_FILE = 'rollups.sqlite'
+ENGAGEMENT_COLUMNS = (
+    ('favorites', 'favorite_count'),
+    ('retweets', 'retweet_count'),
+    ('replies', 'reply_count'),
+    ('quotes', 'quote_count'),
+)
+GRANULARITIES = {'hour': 13, 'day': 10}
+HOURLY_COLUMNS = 'path, keyword, query, hour, tweets, favorites, retweets, replies, quotes, authors, ingested_at'
+
+# Partitions are (source file, UTC hour). Re-ingesting a file replaces only
+# its own partitions, so a re-scrape or compaction never touches the rest.
+# Distinct counts cannot be summed across hours or files, so each partition
+# keeps a HyperLogLog of its authors, merged at query time. The sketches are
+# kept per (file, day) and merged the same way for authors and top terms
+# over any range. When files of one query overlap (a range scraped again),
+# only the most recently ingested file counts for an hour or day it shares;
+# query is the output index's query hash, so the language, tab and quoting
+# variants of a keyword are separate queries that never hide each other.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hourly (
+    path TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    query TEXT NOT NULL DEFAULT '',
+    hour TEXT NOT NULL,
+    tweets INTEGER NOT NULL,
+    favorites INTEGER NOT NULL,
+    retweets INTEGER NOT NULL,
+    replies INTEGER NOT NULL,
+    quotes INTEGER NOT NULL,
+    authors BLOB,
+    ingested_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (path, hour)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hourly_keyword ON hourly (keyword, hour);
+CREATE TABLE IF NOT EXISTS daily_sketches (
+    path TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    query TEXT NOT NULL DEFAULT '',
+    day TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data BLOB NOT NULL,
+    ingested_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (path, day, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_sketches_keyword ON daily_sketches (keyword, kind, day);
+"""
+
+
+def _latest(table, *columns):
+    """Condition keeping a row of h only if no later ingested file of its query has the same columns"""
+    same = ' AND '.join(f'newer.{column} = h.{column}' for column in ('query',) + columns)
+    return (f'NOT EXISTS (SELECT 1 FROM {table} AS newer WHERE {same} '
+            f'AND (newer.ingested_at, newer.path) > (h.ingested_at, h.path))')
+
+
+def tweet_hour(created_at):
+    """'Thu Dec 28 21:59:59 +0000 2023' -> '2023-12-28 21' (UTC), or None"""
+    try:
+        moment = datetime.strptime(created_at, CREATED_AT_FORMAT)
+    except (TypeError, ValueError):
+        return None
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%d %H')
+
+
+def _as_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+class RollupAccumulator:
+    """Aggregates one file's rows by hour while they stream past to other consumers"""
+
+    def __init__(self):
+        self.hours = defaultdict(lambda: [0, 0, 0, 0, 0])
+        self.authors = defaultdict(HyperLogLog)
+        self.sketches = defaultdict(DaySketches)
+        self.skipped = 0
+
+    def add(self, row):
+        hour = tweet_hour(row.get('created_at'))
+        if hour is None:
+            self.skipped += 1
+            return
+        totals = self.hours[hour]
+        totals[0] += 1
+        for position, (_, column) in enumerate(ENGAGEMENT_COLUMNS, start=1):
+            totals[position] += _as_int(row.get(column))
+        username = row.get('username')
+        if username:
+            self.authors[hour].add(username.lower())
+        self.sketches[hour[:10]].add(username, row.get('full_text'))
+
+    def observe(self, rows):
+        for row in rows:
+            self.add(row)
+            yield row
+
+
+class RollupStore(SqliteStore):
+    """Tweet volume, unique authors and engagement per keyword and hour/day.
+
+    Lives in output_dir/.harvest/rollups.sqlite next to the output index and
+    is filled by ingest.ingest_output as each job lands, so charts and
+    exports read a few hundred rows instead of every CSV.
+    """
+
+    FILENAME = ROLLUP_FILE
+    SCHEMA = SCHEMA
+    VERSION = 2
+
+    def _upgrade(self, connection):
+        """Bring a store from before the author sketches or query hashes up to date"""
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(hourly)')}
+        if 'authors' not in columns:
+            connection.execute('ALTER TABLE hourly ADD COLUMN authors BLOB')
+            connection.execute('ALTER TABLE hourly ADD COLUMN ingested_at REAL NOT NULL DEFAULT 0')
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(daily_sketches)')}
+        if 'ingested_at' not in columns:
+            connection.execute('ALTER TABLE daily_sketches ADD COLUMN ingested_at REAL NOT NULL DEFAULT 0')
+        for table in ('hourly', 'daily_sketches'):
+            columns = {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+            if 'query' not in columns:
+                # The hash is not known here; files keep superseding by keyword until they are ingested again
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN query TEXT NOT NULL DEFAULT ''")
+                connection.execute(f'UPDATE {table} SET query = keyword')
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'hourly_authors'").fetchone():
+            sketches = defaultdict(HyperLogLog)
+            for path, hour, username in connection.execute('SELECT path, hour, username FROM hourly_authors'):
+                sketches[path, hour].add(username)
+            connection.executemany('UPDATE hourly SET authors = ? WHERE path = ? AND hour = ?',
+                                   [(sketch.to_bytes(), path, hour) for (path, hour), sketch in sketches.items()])
+            connection.execute('DROP TABLE hourly_authors')
+
+    def replace_file(self, path, keyword, accumulator, query=None):
+        """Store one file's rollups; query is its output index query hash (the keyword if unknown)"""
+        relative = self._relative(path)
+        query = query or keyword
+        ingested_at = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute('DELETE FROM hourly WHERE path = ?', (relative,))
+                connection.execute('DELETE FROM daily_sketches WHERE path = ?', (relative,))
+                connection.executemany(
+                    f'INSERT INTO hourly ({HOURLY_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(relative, keyword, query, hour, *totals,
+                      accumulator.authors[hour].to_bytes() if hour in accumulator.authors else None, ingested_at)
+                     for hour, totals in accumulator.hours.items()]
+                )
+                connection.executemany(
+                    'INSERT INTO daily_sketches (path, keyword, query, day, kind, data, ingested_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(relative, keyword, query, day, kind, data, ingested_at)
+                     for day, sketches in accumulator.sketches.items() for kind, data in sketches.serialized()]
+                )
+        finally:
+            connection.close()
+
+    def remove_file(self, path):
+        relative = self._relative(path)
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute('DELETE FROM hourly WHERE path = ?', (relative,))
+                connection.execute('DELETE FROM daily_sketches WHERE path = ?', (relative,))
+        finally:
+            connection.close()
+
+    def keywords(self):
+        connection = self._connect()
+        try:
+            return [row[0] for row in connection.execute('SELECT DISTINCT keyword FROM hourly ORDER BY keyword')]
+        finally:
+            connection.close()
+
+    def series(self, keywords=None, start_date=None, end_date=None, granularity='day'):
+        """Rows of keyword, period, tweets, authors, favorites, retweets, replies, quotes.
+
+        With keywords=None every keyword is reported separately; start_date
+        and end_date are inclusive UTC dates.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        width = GRANULARITIES[granularity]
+        where, params = [], []
+        if keywords:
+            where.append(f"keyword IN ({', '.join('?' for _ in keywords)})")
+            params += list(keywords)
+        if start_date:
+            where.append('hour >= ?')
+            params.append(start_date)
+        if end_date:
+            where.append('hour < ?')
+            params.append(f'{end_date} 24')
+        where.append(_latest('hourly', 'hour'))
+        clause = f"WHERE {' AND '.join(where)}"
+        sums = ', '.join(f'SUM({name}) AS {name}' for name, _ in ENGAGEMENT_COLUMNS)
+
+        connection = self._connect()
+        try:
+            totals = connection.execute(
+                f'SELECT keyword, substr(hour, 1, {width}) AS period, SUM(tweets) AS tweets, {sums} '
+                f'FROM hourly AS h {clause} GROUP BY keyword, period ORDER BY keyword, period', params
+            ).fetchall()
+            authors = defaultdict(HyperLogLog)
+            for row in connection.execute(
+                f'SELECT keyword, substr(hour, 1, {width}) AS period, authors FROM hourly AS h {clause} '
+                f'AND authors IS NOT NULL', params
+            ):
+                authors[row['keyword'], row['period']].merge(HyperLogLog.from_bytes(row['authors']))
+        finally:
+            connection.close()
+
+        series = []
+        for row in totals:
+            entry = dict(row)
+            sketch = authors.get((row['keyword'], row['period']))
+            entry['authors'] = sketch.estimate() if sketch is not None else 0
+            series.append(entry)
+        return series
+
+    def _sketch_rows(self, kind, keywords, start_date, end_date):
+        sql = f"SELECT data FROM daily_sketches AS h WHERE kind = ? AND {_latest('daily_sketches', 'day', 'kind')}"
+        params = [kind]
+        if keywords:
+            sql += f" AND keyword IN ({', '.join('?' for _ in keywords)})"
+            params += list(keywords)
+        if start_date:
+            sql += ' AND day >= ?'
+            params.append(start_date)
+        if end_date:
+            sql += ' AND day <= ?'
+            params.append(end_date)
+        connection = self._connect()
+        try:
+            for row in connection.execute(sql, params):
+                yield row['data']
+        finally:
+            connection.close()
+
+    def approx_authors(self, keywords=None, start_date=None, end_date=None):
+        """Distinct authors over any keywords and date range, merged from per-day HyperLogLogs"""
+        merged = HyperLogLog()
+        for data in self._sketch_rows('authors', keywords, start_date, end_date):
+            merged.merge(HyperLogLog.from_bytes(data))
+        return merged.estimate()
+
+    def top_terms(self, kind, keywords=None, start_date=None, end_date=None, k=20):
+        """Most frequent hashtags, mentions or domains as (term, approximate count) pairs"""
+        if kind not in TERM_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(TERM_KINDS)}")
+        merged = TermSketch()
+        for data in self._sketch_rows(kind, keywords, start_date, end_date):
+            merged.merge(TermSketch.from_bytes(data))
+        return merged.top(k)
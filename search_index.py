@@ -0,0 +1,235 @@
+
+import re
+import sqlite3
+
+from sqlite_store import SqliteStore
+
+SEARCH_FILE = 'search.sqlite'
+BATCH_ROWS = 5000
+
+# Tweets live in a plain table keyed by tweet id; tweets_fts is an external
+# content FTS5 index over their text (the posting lists are tweet ids, the
+# text is not stored twice). '#', '@' and '_' are token characters so
+# hashtags and mentions are searchable as whole tokens. The triggers keep
+# the index in step with every insert, replace and delete. tweet_paths links
+# each tweet to every file (and keyword) it was scraped into; tweets.path is
+# just one of them, for display.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    created_at TEXT,
+    username TEXT,
+    full_text TEXT,
+    tweet_url TEXT
+);
+CREATE INDEX IF NOT EXISTS tweets_path ON tweets (path);
+CREATE TABLE IF NOT EXISTS tweet_paths (
+    tweet_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    PRIMARY KEY (tweet_id, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tweet_paths_path ON tweet_paths (path);
+CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5(
+    full_text, content='tweets', content_rowid='id', tokenize="unicode61 tokenchars '#@_'"
+);
+CREATE TRIGGER IF NOT EXISTS tweets_ai AFTER INSERT ON tweets BEGIN
+    INSERT INTO tweets_fts (rowid, full_text) VALUES (new.id, new.full_text);
+END;
+CREATE TRIGGER IF NOT EXISTS tweets_ad AFTER DELETE ON tweets BEGIN
+    INSERT INTO tweets_fts (tweets_fts, rowid, full_text) VALUES ('delete', old.id, old.full_text);
+END;
+"""
+# Moving a tweet to another of its files does not touch the text index
+UPDATE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS tweets_au AFTER UPDATE OF full_text ON tweets BEGIN
+    INSERT INTO tweets_fts (tweets_fts, rowid, full_text) VALUES ('delete', old.id, old.full_text);
+    INSERT INTO tweets_fts (rowid, full_text) VALUES (new.id, new.full_text);
+END;
+"""
+
+QUERY_TOKEN = re.compile(r'"[^"]*"|\(|\)|[^\s()"]+')
+OPERATORS = ('AND', 'OR', 'NOT')
+
+
+def to_match_expression(query):
+    """Turn a search box query into an FTS5 MATCH expression.
+
+    Words are ANDed, "quoted words" match as a phrase, AND / OR / NOT and
+    parentheses work as usual and a trailing * searches by prefix. Every
+    term is quoted for FTS5, so hashtags, mentions and punctuation never
+    become syntax errors.
+    """
+    parts = []
+    for token in QUERY_TOKEN.findall(query):
+        if token in ('(', ')') or token in OPERATORS:
+            parts.append(token)
+            continue
+        prefix = token.endswith('*') and not token.startswith('"')
+        term = token.strip('"').rstrip('*') if not token.startswith('"') else token[1:-1]
+        if not term.strip():
+            continue
+        quoted = '"' + term.replace('"', '""') + '"'
+        parts.append(quoted + '*' if prefix else quoted)
+    return ' '.join(parts)
+
+
+class SearchIndex(SqliteStore):
+    """Full-text index of every scraped tweet, under output_dir/.harvest/search.sqlite.
+
+    Files are (re)indexed as a whole: index_file first drops the links of
+    that path, so re-scraping a range replaces its tweets instead of
+    duplicating them. A tweet seen by several keywords is stored once,
+    linked to every file it came from, and only deleted when the last of
+    those files is removed.
+    """
+
+    FILENAME = SEARCH_FILE
+    SCHEMA = SCHEMA + UPDATE_TRIGGER
+    # INSERT OR REPLACE only fires the delete trigger with recursive triggers on
+    PRAGMAS = ('journal_mode=WAL', 'synchronous=NORMAL', 'recursive_triggers=ON')
+    VERSION = 1
+
+    def _upgrade(self, connection):
+        # Indexes from before tweet_paths linked each tweet to its latest file only
+        connection.execute('INSERT OR IGNORE INTO tweet_paths SELECT id, path, keyword FROM tweets')
+        connection.execute('DROP TRIGGER tweets_au')
+        connection.execute(UPDATE_TRIGGER)
+
+    def index_file(self, path, keyword, rows):
+        """Replace the tweets of one output file; rows are dicts as read from its CSV"""
+        relative = self._relative(path)
+        indexed = 0
+        connection = self._connect()
+        try:
+            with connection:
+                self._unlink(connection, relative)
+                batch = []
+                for row in rows:
+                    try:
+                        tweet_id = int(row.get('id_str') or '')
+                    except ValueError:
+                        continue
+                    batch.append((tweet_id, relative, keyword, row.get('created_at'), row.get('username'),
+                                  row.get('full_text'), row.get('tweet_url')))
+                    if len(batch) >= BATCH_ROWS:
+                        indexed += self._insert(connection, batch)
+                        batch = []
+                if batch:
+                    indexed += self._insert(connection, batch)
+            return indexed
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _insert(connection, batch):
+        connection.executemany('INSERT OR REPLACE INTO tweets VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+        connection.executemany('INSERT OR IGNORE INTO tweet_paths VALUES (?, ?, ?)',
+                               [(tweet[0], tweet[1], tweet[2]) for tweet in batch])
+        return len(batch)
+
+    @staticmethod
+    def _unlink(connection, relative):
+        """Drop the links of one file; returns how many of its tweets no other file has"""
+        connection.execute('CREATE TEMP TABLE IF NOT EXISTS unlinked (tweet_id INTEGER PRIMARY KEY)')
+        connection.execute('DELETE FROM unlinked')
+        connection.execute('INSERT INTO unlinked SELECT tweet_id FROM tweet_paths WHERE path = ?', (relative,))
+        connection.execute('DELETE FROM tweet_paths WHERE path = ?', (relative,))
+        deleted = connection.execute(
+            'DELETE FROM tweets WHERE id IN (SELECT tweet_id FROM unlinked) '
+            'AND NOT EXISTS (SELECT 1 FROM tweet_paths WHERE tweet_paths.tweet_id = tweets.id)'
+        ).rowcount
+        # Tweets the file shared with others are attributed to one of those instead
+        connection.execute(
+            'UPDATE tweets SET (path, keyword) = (SELECT path, keyword FROM tweet_paths '
+            'WHERE tweet_paths.tweet_id = tweets.id LIMIT 1) WHERE path = ?', (relative,)
+        )
+        return deleted
+
+    def remove_file(self, path):
+        connection = self._connect()
+        try:
+            with connection:
+                return self._unlink(connection, self._relative(path))
+        finally:
+            connection.close()
+
+    def search(self, query, limit=100, keyword=None):
+        """Newest matching tweets first; raises ValueError for a query FTS5 cannot parse.
+
+        Tweet ids are time ordered, so walking the posting lists by
+        descending rowid returns the newest hits without ranking or sorting
+        every match, which keeps broad queries fast on a large index.
+        """
+        expression = to_match_expression(query)
+        if not expression:
+            return []
+        sql = ('SELECT tweets.id, tweets.keyword, tweets.created_at, tweets.username, tweets.full_text, '
+               'tweets.tweet_url, tweets.path FROM tweets_fts JOIN tweets ON tweets.id = tweets_fts.rowid '
+               'WHERE tweets_fts MATCH ?')
+        params = [expression]
+        if keyword is not None:
+            sql += (' AND EXISTS (SELECT 1 FROM tweet_paths WHERE tweet_paths.tweet_id = tweets.id '
+                    'AND tweet_paths.keyword = ?)')
+            params.append(keyword)
+        sql += ' ORDER BY tweets_fts.rowid DESC LIMIT ?'
+        params.append(int(limit))
+        connection = self._connect()
+        try:
+            try:
+                rows = connection.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search query: {e}")
+            return [dict(row) for row in rows]
+        finally:
+            connection.close()
+
+    def fetch(self, tweet_ids):
+        """{id: tweet} for the given tweet ids that are indexed"""
+        tweet_ids = list(tweet_ids)
+        tweets = {}
+        connection = self._connect()
+        try:
+            for start in range(0, len(tweet_ids), 500):
+                batch = tweet_ids[start:start + 500]
+                for row in connection.execute(
+                    f"SELECT * FROM tweets WHERE id IN ({', '.join('?' for _ in batch)})", batch
+                ):
+                    tweets[row['id']] = dict(row)
+            return tweets
+        finally:
+            connection.close()
+
+    def count(self, query):
+        expression = to_match_expression(query)
+        if not expression:
+            return 0
+        connection = self._connect()
+        try:
+            try:
+                return connection.execute('SELECT COUNT(*) FROM tweets_fts WHERE tweets_fts MATCH ?',
+                                          (expression,)).fetchone()[0]
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search query: {e}")
+        finally:
+            connection.close()
+
+    def optimize(self):
+        """Merge the index segments; worth running after a large backfill"""
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("INSERT INTO tweets_fts (tweets_fts) VALUES ('optimize')")
+        finally:
+            connection.close()
+
+    def stats(self):
+        connection = self._connect()
+        try:
+            tweets = connection.execute('SELECT COUNT(*) FROM tweets').fetchone()[0]
+            files = connection.execute('SELECT COUNT(DISTINCT path) FROM tweet_paths').fetchone()[0]
+            return {'tweets': tweets, 'files': files}
+        finally:
+            connection.close()
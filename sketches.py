@@ -0,0 +1,163 @@
+
+import hashlib
+import heapq
+import json
+import math
+import re
+import zlib
+from array import array
+from collections import Counter
+
+from tweet_fields import HASHTAG_PATTERN, MENTION_PATTERN
+
+HLL_PRECISION = 12
+CMS_WIDTH = 1024
+CMS_DEPTH = 4
+TOP_K = 50
+
+DOMAIN_PATTERN = re.compile(r'https?://(?:www\.)?([^/\s?#]+)', re.IGNORECASE)
+
+TERM_KINDS = ('hashtags', 'mentions', 'domains')
+
+
+def _hash64(value):
+    # Python's hash() is salted per process; sketches are merged across runs
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def extract_terms(text):
+    """{'hashtags': [...], 'mentions': [...], 'domains': [...]} of one tweet, lower-cased"""
+    text = text or ''
+    return {
+        'hashtags': [f'#{tag.lower()}' for tag in HASHTAG_PATTERN.findall(text)],
+        'mentions': [f'@{name.lower()}' for name in MENTION_PATTERN.findall(text)],
+        'domains': [domain.lower().rstrip('.') for domain in DOMAIN_PATTERN.findall(text)],
+    }
+
+
+class HyperLogLog:
+    """Distinct count estimate in 2**precision bytes (about 1.6% error at precision 12)"""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+
+    def add(self, value):
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        import numpy as np
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        np.maximum(registers, np.frombuffer(other.registers, dtype=np.uint8), out=registers)
+        return self
+
+    def estimate(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        raw = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * size and zeros:
+            return round(size * math.log(size / zeros))
+        return round(raw)
+
+    def to_bytes(self):
+        return zlib.compress(bytes([self.precision]) + bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = zlib.decompress(data)
+        return cls(data[0], data[1:])
+
+
+class TermSketch:
+    """Count-Min sketch of term frequencies plus a short list of heavy-hitter candidates.
+
+    Counts never underestimate; with the default size the overestimate is
+    at most about 0.3% of the total count with 98% probability. Merging adds
+    the counters and pools the candidates, and top() re-ranks the pooled
+    candidates by the merged counts, so heavy hitters of a long range are
+    found from per-day sketches in constant memory.
+    """
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, counters=None, candidates=None, total=0):
+        self.width = width
+        self.depth = depth
+        self.counters = counters if counters is not None else array('Q', bytes(8 * width * depth))
+        self.candidates = set(candidates or ())
+        self.total = total
+
+    def _cells(self, term):
+        hashed = _hash64(term)
+        low, high = hashed & 0xFFFFFFFF, hashed >> 32
+        # Kirsch-Mitzenmacher: depth hash functions from one 64-bit hash
+        return [row * self.width + (low + row * high) % self.width for row in range(self.depth)]
+
+    def add(self, term, count=1):
+        for cell in self._cells(term):
+            self.counters[cell] += count
+        self.total += count
+
+    def add_counts(self, counts, keep=TOP_K):
+        """Add exact counts of a batch and keep its most common terms as candidates"""
+        for term, count in counts.items():
+            self.add(term, count)
+        self.candidates.update(term for term, _ in counts.most_common(keep))
+
+    def count(self, term):
+        return min(self.counters[cell] for cell in self._cells(term))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different size")
+        for position, value in enumerate(other.counters):
+            if value:
+                self.counters[position] += value
+        self.candidates.update(other.candidates)
+        self.total += other.total
+        return self
+
+    def top(self, k=20):
+        return heapq.nlargest(k, ((term, self.count(term)) for term in self.candidates), key=lambda item: item[1])
+
+    def to_bytes(self):
+        header = json.dumps({'width': self.width, 'depth': self.depth, 'total': self.total,
+                             'candidates': sorted(self.candidates)}, ensure_ascii=False).encode('utf-8')
+        return zlib.compress(len(header).to_bytes(4, 'big') + header + self.counters.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = zlib.decompress(data)
+        length = int.from_bytes(data[:4], 'big')
+        header = json.loads(data[4:4 + length].decode('utf-8'))
+        counters = array('Q')
+        counters.frombytes(data[4 + length:])
+        return cls(header['width'], header['depth'], counters, header['candidates'], header['total'])
+
+
+class DaySketches:
+    """Sketches of one file's tweets on one day: distinct authors and term frequencies"""
+
+    def __init__(self):
+        self.authors = HyperLogLog()
+        self.term_counts = {kind: Counter() for kind in TERM_KINDS}
+
+    def add(self, username, text):
+        if username:
+            self.authors.add(username.lower())
+        for kind, terms in extract_terms(text).items():
+            self.term_counts[kind].update(terms)
+
+    def serialized(self):
+        """(kind, blob) pairs to store; the exact per-file counts are folded into Count-Min here"""
+        yield 'authors', self.authors.to_bytes()
+        for kind, counts in self.term_counts.items():
+            sketch = TermSketch()
+            sketch.add_counts(counts)
+            yield kind, sketch.to_bytes()
@@ -0,0 +1,47 @@
+
+import sqlite3
+from pathlib import Path
+
+INDEX_DIR = '.harvest'
+
+
+class SqliteStore:
+    """Base of the sqlite files kept under output_dir/.harvest.
+
+    Subclasses set FILENAME and SCHEMA, plus VERSION and _upgrade() when
+    older files need migrating. A connection is opened per call, which keeps
+    a store safe to use from the scraping thread, the UI thread and worker
+    processes at the same time. Paths are stored relative to output_dir so
+    the folder can be moved.
+    """
+
+    FILENAME = None
+    SCHEMA = ''
+    PRAGMAS = ('journal_mode=WAL',)
+    VERSION = 0
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / INDEX_DIR / self.FILENAME
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            connection.execute(f'PRAGMA {pragma}')
+        connection.executescript(self.SCHEMA)
+        if self.VERSION and connection.execute('PRAGMA user_version').fetchone()[0] < self.VERSION:
+            with connection:
+                self._upgrade(connection)
+                connection.execute(f'PRAGMA user_version = {self.VERSION}')
+        return connection
+
+    def _upgrade(self, connection):
+        pass
+
+    def _relative(self, path):
+        try:
+            return Path(path).resolve().relative_to(self.output_dir.resolve()).as_posix()
+        except ValueError:
+            return str(path)
@@ -0,0 +1,156 @@
+
+import csv
+import gzip
+import io
+import os
+import threading
+from contextlib import contextmanager
+
+from config import logger
+
+COMPRESSION_NONE = 'none'
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+
+SUFFIXES = {COMPRESSION_GZIP: '.gz', COMPRESSION_ZSTD: '.zst'}
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_LEVELS = {COMPRESSION_GZIP: 6, COMPRESSION_ZSTD: 10}
+
+# Tweet text can be long; the csv module's 128 KB default field limit is too tight
+FIELD_SIZE_LIMIT = 16 * 1024 * 1024
+
+_long_field_readers = 0
+_saved_field_limit = None
+_field_limit_lock = threading.Lock()
+
+
+def _zstd_module():
+    """The zstandard package, or None when it is not installed (it is optional)"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def resolve_compression(method):
+    """Normalise a COMPRESSION setting, falling back to gzip when zstd is unavailable"""
+    method = (method or COMPRESSION_NONE).strip().lower()
+    if method in ('', 'off', 'no', 'false', '0'):
+        return COMPRESSION_NONE
+    if method in ('gz',):
+        method = COMPRESSION_GZIP
+    if method in ('zst', 'zstandard'):
+        method = COMPRESSION_ZSTD
+    if method == COMPRESSION_ZSTD and _zstd_module() is None:
+        logger.warning("zstd compression needs the zstandard package (pip install zstandard), using gzip")
+        return COMPRESSION_GZIP
+    if method not in (COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_ZSTD):
+        logger.warning(f"Unknown output compression '{method}', storing files uncompressed")
+        return COMPRESSION_NONE
+    return method
+
+
+def compression_of(path):
+    path = str(path)
+    for method, suffix in SUFFIXES.items():
+        if path.endswith(suffix):
+            return method
+    return COMPRESSION_NONE
+
+
+def logical_name(path):
+    """File name without the compression suffix: foo.csv.gz -> foo.csv"""
+    name = os.path.basename(str(path))
+    suffix = SUFFIXES.get(compression_of(name))
+    return name[:-len(suffix)] if suffix else name
+
+
+def open_binary(path):
+    """Readable binary stream of a possibly compressed file, decompressed on the fly"""
+    method = compression_of(path)
+    if method == COMPRESSION_GZIP:
+        return gzip.open(path, 'rb')
+    if method == COMPRESSION_ZSTD:
+        zstandard = _zstd_module()
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package (pip install zstandard)")
+        raw = open(path, 'rb')
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return open(path, 'rb')
+
+
+def open_text(path, encoding='utf-8'):
+    """Text stream suitable for csv.reader; the file is never fully loaded or decompressed to disk"""
+    return io.TextIOWrapper(io.BufferedReader(open_binary(path), CHUNK_SIZE), encoding=encoding,
+                            errors='replace', newline='')
+
+
+def compress_file(path, method, level=None):
+    """Compress path in place (streaming), remove the original and return the new path"""
+    method = resolve_compression(method)
+    if method == COMPRESSION_NONE:
+        return str(path)
+    level = level if level is not None else DEFAULT_LEVELS[method]
+    target = f"{path}{SUFFIXES[method]}"
+    partial = f"{target}.part"
+
+    with open(path, 'rb') as source:
+        if method == COMPRESSION_GZIP:
+            with gzip.open(partial, 'wb', compresslevel=level) as destination:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    destination.write(chunk)
+        else:
+            compressor = _zstd_module().ZstdCompressor(level=level)
+            with open(partial, 'wb') as destination:
+                compressor.copy_stream(source, destination, read_size=CHUNK_SIZE)
+
+    os.replace(partial, target)
+    os.remove(path)
+    return target
+
+
+@contextmanager
+def long_fields():
+    """Raise the csv module's field size limit to FIELD_SIZE_LIMIT while tweet CSVs are parsed.
+
+    The limit is process-wide: it is raised when the first reader starts and
+    put back when the last one is done, instead of being changed on import.
+    """
+    global _long_field_readers, _saved_field_limit
+    with _field_limit_lock:
+        if not _long_field_readers:
+            _saved_field_limit = csv.field_size_limit()
+            csv.field_size_limit(max(FIELD_SIZE_LIMIT, _saved_field_limit))
+        _long_field_readers += 1
+    try:
+        yield
+    finally:
+        with _field_limit_lock:
+            _long_field_readers -= 1
+            if not _long_field_readers:
+                csv.field_size_limit(_saved_field_limit)
+
+
+def iter_rows(path):
+    """Stream a (possibly compressed) CSV as dicts"""
+    with open_text(path) as text, long_fields():
+        yield from csv.DictReader(text)
+
+
+def count_rows(path):
+    """Data rows in a CSV, header excluded; quoted newlines in tweet text are handled"""
+    with open_text(path) as text, long_fields():
+        reader = csv.reader(text)
+        if next(reader, None) is None:
+            return 0
+        return sum(1 for _ in reader)
+
+
+def read_dataframe(path, **kwargs):
+    import pandas as pd
+    with open_text(path) as text:
+        return pd.read_csv(text, **kwargs)
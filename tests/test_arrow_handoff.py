@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from arrow_handoff import make_handoff_dir, read_frame, remove_handoff_dir, write_frame
+
+pa = pytest.importorskip('pyarrow')
+
+
+def test_frames_come_back_over_the_mapped_file():
+    import pandas as pd
+    directory = make_handoff_dir()
+    try:
+        frame = pd.DataFrame({'full_text': ['satu', None, 'tiga'], 'cluster_id': [1, 2, 3]})
+        reference = write_frame(frame, directory)
+        assert reference['rows'] == 3
+        result = read_frame(reference)
+        assert not os.path.exists(reference['arrow_path'])
+        assert result['full_text'].dtype.storage == 'pyarrow'
+        assert result['full_text'].isna().tolist() == [False, True, False]
+        assert result['cluster_id'].tolist() == [1, 2, 3]
+    finally:
+        remove_handoff_dir(directory)
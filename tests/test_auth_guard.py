@@ -0,0 +1,74 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from auth_guard import AuthCircuitBreaker, TOKEN_INVALID, TOKEN_UNKNOWN, preflight_token
+from twitter_scraper import TwitterScraper
+
+GOOD = 'a' * 40
+BACKUP = 'b' * 40
+
+
+def auth_failure(tweets=0):
+    return {'success': False, 'auth_error': True, 'harvest': {'tweets_reported': tweets}}
+
+
+def test_breaker_fails_over_after_consecutive_auth_failures():
+    breaker = AuthCircuitBreaker([GOOD, BACKUP], threshold=2)
+    breaker.record(GOOD, auth_failure())
+    assert breaker.current_token == GOOD
+    breaker.record(GOOD, auth_failure())
+    assert breaker.current_token == BACKUP and breaker.retired == [GOOD]
+    breaker.record(BACKUP, auth_failure())
+    breaker.record(BACKUP, auth_failure())
+    assert breaker.tripped
+
+
+def test_success_resets_and_stale_tokens_are_ignored():
+    breaker = AuthCircuitBreaker([GOOD, BACKUP], threshold=2)
+    breaker.record(GOOD, auth_failure())
+    breaker.record(GOOD, {'success': True})
+    breaker.record(GOOD, auth_failure())
+    assert breaker.current_token == GOOD
+    breaker.record(BACKUP, auth_failure())
+    breaker.record(BACKUP, auth_failure())
+    assert breaker.current_token == GOOD
+
+
+def test_jobs_that_fetched_tweets_do_not_count_as_auth_failures():
+    breaker = AuthCircuitBreaker([GOOD], threshold=1)
+    breaker.record(GOOD, auth_failure(tweets=401))
+    assert not breaker.tripped
+
+
+def test_unusual_token_format_is_checked_not_refused(monkeypatch):
+    requested = []
+
+    class Offline:
+        def open(self, request, timeout=None):
+            requested.append(request.get_header('Cookie'))
+            raise urllib.error.URLError('offline')
+
+    monkeypatch.setattr(urllib.request, 'build_opener', lambda *handlers: Offline())
+    status, _ = preflight_token('not-hex-but-maybe-valid')
+    assert status == TOKEN_UNKNOWN
+    assert requested == ['auth_token=not-hex-but-maybe-valid']
+    assert preflight_token('  ')[0] == TOKEN_INVALID
+
+
+def test_batch_without_any_token_starts_no_job(tmp_path, monkeypatch):
+    scraper = TwitterScraper(auth_token='token', output_dir=str(tmp_path))
+    scraper.auth_token, scraper.backup_tokens = 'your_auth_token_here', []
+    monkeypatch.setattr(scraper, '_ensure_toolchain', lambda: pytest.fail('the batch went on'))
+    result = scraper.batch_scrape(['pilpres'], '2024-01-01', '2024-01-31', preflight=False)
+    assert result == {'success': False, 'reason': 'No valid auth token provided'}
+
+
+def test_batch_uses_a_backup_when_the_main_token_is_missing(tmp_path, monkeypatch):
+    scraper = TwitterScraper(auth_token='token', output_dir=str(tmp_path))
+    scraper.auth_token, scraper.backup_tokens = '', [BACKUP]
+    monkeypatch.setattr(scraper, '_ensure_toolchain', lambda: None)
+    monkeypatch.setattr(scraper, 'generate_date_ranges', lambda *args: [])
+    result = scraper.batch_scrape(['pilpres'], '2024-01-01', '2024-01-31', preflight=False)
+    assert result['reason'] == 'Could not generate valid date ranges'
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import cli
+import config
+
+
+def test_cli_creates_env_file_on_first_run(tmp_path, monkeypatch):
+    (tmp_path / '.env.example').write_text('OUTPUT_DIR=somewhere\n')
+    monkeypatch.setattr(config, 'BASE_DIR', tmp_path)
+    monkeypatch.setattr(config, 'ENV_FILE', tmp_path / '.env')
+    monkeypatch.setattr(cli, 'setup_logging', lambda: None)
+    assert cli.main(['dupes', '--output-dir', str(tmp_path / 'out')]) == 0
+    assert (tmp_path / '.env').read_text() == 'OUTPUT_DIR=somewhere\n'
+
+
+def test_startup_does_not_import_pandas():
+    # pandas and numpy load on first use, so the gui and cli start quickly
+    probe = "import sys, cli, twitter_scraper; print(sorted({'pandas', 'numpy'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, '-c', probe], cwd=Path(cli.__file__).parent,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,123 @@
+import os
+import threading
+from concurrent.futures import Future
+from itertools import islice
+
+import pytest
+
+import corpus_query
+from corpus_query import CorpusQuery
+from output_index import OutputIndex, output_location
+
+
+class InlineExecutor:
+    """Runs tasks on submit, recording how many were handed over"""
+    submitted = []
+
+    def __init__(self, max_workers, initializer=None):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, function, *args):
+        InlineExecutor.submitted.append(args[0][0])
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+
+def test_run_keeps_a_bounded_window_of_tasks(tmp_path, monkeypatch):
+    InlineExecutor.submitted = []
+    monkeypatch.setattr(corpus_query, 'ProcessPoolExecutor', InlineExecutor)
+    monkeypatch.setattr(corpus_query, 'arrow_available', lambda: False)
+    monkeypatch.setattr(corpus_query, '_scan_file_task', lambda task, handoff_dir=None: task[0].upper())
+    tasks = [(f'file{number}', None, None, False) for number in range(10)]
+    results = CorpusQuery(tmp_path, max_workers=2)._run(tasks)
+
+    assert next(results) == ('file0', 'FILE0')
+    assert len(InlineExecutor.submitted) == 4
+    assert [path for path, _ in results] == [f'file{number}' for number in range(1, 10)]
+    assert InlineExecutor.submitted == [task[0] for task in tasks]
+
+
+def test_iter_typed_types_files_without_a_table(tmp_path):
+    _, path = output_location(str(tmp_path), 'pilpres', False, 'id', 'LATEST', '2024-01-01', '2024-01-31')
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'w', encoding='utf-8') as output:
+        output.write('created_at,id_str,full_text,lang,favorite_count\n'
+                     'Mon Jan 01 10:00:00 +0000 2024,1742000000000000001,#Pilpres2024 @KPU,id,3\n'
+                     'Fri Jan 05 10:00:00 +0000 2024,1742000000000000002,tanpa tagar,id,0\n')
+    OutputIndex(tmp_path).record(path, 'pilpres', False, 'id', 'LATEST', 'q', '2024-01-01', '2024-01-31')
+
+    [frame] = CorpusQuery(tmp_path).iter_typed(end_date='2024-01-02', columns=['created_at', 'hashtags'])
+    assert list(frame.columns) == ['keyword', 'created_at', 'hashtags']
+    assert len(frame) == 1 and frame['hashtags'][0] == ['pilpres2024']
+    assert str(frame['created_at'].dtype).startswith('datetime64')
+
+
+def test_scan_result_is_pickled_when_the_handoff_fails(tmp_path, monkeypatch):
+    path = tmp_path / 'a.csv'
+    path.write_text('created_at,full_text\nMon Jan 01 10:00:00 +0000 2024,halo\n', encoding='utf-8')
+
+    def full(frame, handoff_dir):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(corpus_query, 'write_frame', full)
+    result = corpus_query._scan_file_task((str(path), 'pilpres', corpus_query.CorpusFilter(), False), str(tmp_path))
+    assert list(result['full_text']) == ['halo']
+
+
+def write_month(output_dir, month, count):
+    start, end = f'2024-{month:02d}-01', f'2024-{month:02d}-28'
+    _, path = output_location(str(output_dir), 'pilpres', False, 'id', 'LATEST', start, end)
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'w', encoding='utf-8') as output:
+        output.write('created_at,id_str,full_text\n')
+        for number in range(count):
+            output.write(f'Mon Jan 01 10:00:00 +0000 2024,{month * 100 + number},tweet {number}\n')
+    OutputIndex(output_dir).record(path, 'pilpres', False, 'id', 'LATEST', 'q', start, end)
+
+
+def readahead_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'corpus-readahead']
+
+
+def test_iter_chunks_regroups_files_into_fixed_size_chunks(tmp_path):
+    for month, count in ((1, 7), (2, 5), (3, 9)):
+        write_month(tmp_path, month, count)
+    chunks = list(CorpusQuery(tmp_path).iter_chunks(columns=['id_str'], chunk_rows=4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 4, 4, 4, 1]
+    ids = sorted(int(value) for chunk in chunks for value in chunk['id_str'])
+    assert ids == [month * 100 + number for month, count in ((1, 7), (2, 5), (3, 9)) for number in range(count)]
+    assert list(chunks[0].columns) == ['id_str']
+    assert not readahead_threads()
+
+
+def test_closing_iter_chunks_early_stops_the_reader(tmp_path):
+    for month in range(1, 7):
+        write_month(tmp_path, month, 20)
+    chunks = CorpusQuery(tmp_path).iter_chunks(chunk_rows=2, readahead=1)
+    assert len(next(chunks)) == 2
+    assert readahead_threads()
+    chunks.close()
+    assert not readahead_threads()
+
+
+def test_readahead_errors_reach_the_consumer(tmp_path, monkeypatch):
+    write_month(tmp_path, 1, 10)
+    rebatch = corpus_query._rebatch
+
+    def failing(frames, chunk_rows):
+        yield from islice(rebatch(frames, chunk_rows), 1)
+        raise RuntimeError('disk went away')
+
+    monkeypatch.setattr(corpus_query, '_rebatch', failing)
+    chunks = CorpusQuery(tmp_path).iter_chunks(chunk_rows=3)
+    assert len(next(chunks)) == 3
+    with pytest.raises(RuntimeError, match='disk went away'):
+        next(chunks)
+    assert not readahead_threads()
@@ -0,0 +1,123 @@
+import csv
+import gzip
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import csv_preview
+from csv_preview import CsvPreview
+
+
+def make_rows(count):
+    rows = []
+    for number in range(count):
+        text = f'tweet {number}'
+        if number % 3 == 0:
+            text += '\nsecond line with "quotes"'
+        if number % 5 == 0:
+            text += ', and a comma\r\n"quoted" last line'
+        rows.append([str(number), text, f'user{number}'])
+    return rows
+
+
+def render(rows, line_terminator='\n', trailing=True):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator=line_terminator)
+    writer.writerow(['id_str', 'full_text', 'username'])
+    writer.writerows(rows)
+    content = buffer.getvalue()
+    return content if trailing else content[:-len(line_terminator)]
+
+
+def open_preview(path):
+    preview = CsvPreview(path)
+    preview._thread.join()
+    assert preview.error is None
+    return preview
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Tiny blocks and stride so checkpoints and quoted fields straddle block boundaries
+    monkeypatch.setattr(csv_preview, 'SCAN_BLOCK', 37)
+    monkeypatch.setattr(csv_preview, 'INDEX_STRIDE', 7)
+
+
+@pytest.mark.parametrize('line_terminator', ['\n', '\r\n'])
+@pytest.mark.parametrize('trailing', [True, False])
+def test_pages_match_a_full_parse(tmp_path, line_terminator, trailing):
+    rows = make_rows(100)
+    path = tmp_path / 'out.csv'
+    path.write_bytes(render(rows, line_terminator, trailing).encode('utf-8'))
+    preview = open_preview(path)
+    try:
+        assert preview.rows == 100
+        assert len(preview.offsets) == 15
+        for first in (0, 6, 7, 50, 95):
+            assert preview.page(first, 10) == rows[first:first + 10]
+        assert preview.page(20, 3, columns=['username', 'id_str']) == [['user20', '20'], ['user21', '21'],
+                                                                      ['user22', '22']]
+    finally:
+        preview.close()
+
+
+def wait_page(preview, first, count):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        rows = preview.page(first, count)
+        if rows is not None:
+            return rows
+        time.sleep(0.01)
+    raise AssertionError('page never arrived')
+
+
+def test_compressed_file_is_streamed_without_a_temporary_copy(tmp_path):
+    rows = make_rows(40)
+    path = tmp_path / 'out.csv.gz'
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as output:
+        output.write(render(rows))
+    preview = open_preview(path)
+    try:
+        assert preview.rows == 40
+        assert preview.page(0, 5) == rows[:5]
+        assert wait_page(preview, 33, 10) == rows[33:]
+        assert wait_page(preview, 10, 3) == rows[10:13]
+        assert wait_page(preview, 45, 3) == []
+    finally:
+        preview.close()
+    assert os.listdir(tmp_path) == ['out.csv.gz']
+
+
+def test_rows_past_the_index_are_not_parsed_on_the_caller_thread(tmp_path, monkeypatch):
+    rows = make_rows(100)
+    path = tmp_path / 'out.csv'
+    path.write_bytes(render(rows).encode('utf-8'))
+    release = threading.Event()
+    build_index = CsvPreview._build_index
+
+    def slow_index(preview):
+        release.wait(10)
+        build_index(preview)
+
+    monkeypatch.setattr(CsvPreview, '_build_index', slow_index)
+    preview = CsvPreview(path)
+    try:
+        assert preview.page(2, 5) == rows[2:7]
+        assert preview.page(50, 10) is None
+        release.set()
+        preview._thread.join()
+        assert preview.page(50, 10) == rows[50:60]
+    finally:
+        release.set()
+        preview.close()
+
+
+def test_header_only_file(tmp_path):
+    header_only = tmp_path / 'header.csv'
+    header_only.write_text('id_str,full_text\n', encoding='utf-8')
+    preview = open_preview(header_only)
+    assert (preview.rows, preview.page(0, 5)) == (0, [])
+    preview.close()
@@ -0,0 +1,106 @@
+import csv
+import sqlite3
+import threading
+
+import numpy as np
+
+import dedup
+from dedup import EMPTY_HASH, HASH_PRIME, DedupIndex, compute_signatures, minhash_signatures, shingles
+from ingest import IngestPool
+
+BASE = ('Debat capres malam ini membahas ekonomi digital pendidikan dan kesehatan untuk seluruh rakyat '
+        'Indonesia dari Sabang sampai Merauke #pilpres2024')
+
+
+def jaccard(first, second):
+    first, second = shingles(first), shingles(second)
+    return len(first & second) / len(first | second)
+
+
+def test_signatures_estimate_jaccard_similarity():
+    variants = [BASE, BASE.replace('malam ini', 'tadi malam'), BASE + ' @kpu_ri https://t.co/abc',
+                'Harga beras naik lagi di pasar induk pagi ini', '']
+    signatures = minhash_signatures(variants)
+    assert signatures.dtype == np.uint32
+    assert (signatures[:4] < HASH_PRIME).all() and (signatures[4] == EMPTY_HASH).all()
+    for other in range(1, 4):
+        estimate = float((signatures[0] == signatures[other]).mean())
+        assert abs(estimate - jaccard(BASE, variants[other])) <= 0.2
+
+
+def test_batched_signatures_match_row_by_row():
+    texts = [f'{BASE} versi {number}' if number % 7 else '' for number in range(dedup.MINHASH_BLOCK_ROWS + 50)]
+    batched = minhash_signatures(texts)
+    assert all((batched[row] == minhash_signatures([text])[0]).all() for row, text in enumerate(texts[:60]))
+    assert (batched[-1] == minhash_signatures(texts[-1:])[0]).all()
+
+
+def test_parallel_signatures_reuse_one_pool(monkeypatch):
+    monkeypatch.setattr(dedup, 'PARALLEL_MIN_ROWS', 4)
+    monkeypatch.setattr(dedup, 'PARALLEL_CHUNK_ROWS', 3)
+    texts = [f'{BASE} {number}' for number in range(10)]
+    first = compute_signatures(texts, max_workers=2)
+    pool = dedup._pool
+    assert (compute_signatures(texts, max_workers=2) == first).all()
+    assert dedup._pool is pool
+    assert (first == minhash_signatures(texts)).all()
+
+
+def test_near_duplicates_cluster_across_files_and_survive_removal(tmp_path):
+    index = DedupIndex(tmp_path)
+    assert index.add_file(tmp_path / 'a.csv', [(10, BASE), (11, 'Harga beras naik lagi di pasar induk')]) == 0
+    assert index.add_file(tmp_path / 'b.csv', [(20, BASE + ' https://t.co/x'), (21, BASE + ' setuju')]) == 2
+    assert index.cluster_ids([10, 11, 20, 21]) == {10: 10, 11: 11, 20: 10, 21: 10}
+
+    index.remove_file(tmp_path / 'a.csv')
+    assert index.cluster_ids([10, 20, 21]) == {20: 20, 21: 20}
+    assert index.stats() == {'tweets': 2, 'clusters': 1, 'duplicates': 1}
+
+
+def test_tweet_in_two_files_is_dropped_with_the_last_one(tmp_path):
+    index = DedupIndex(tmp_path)
+    index.add_file(tmp_path / 'a.csv', [(10, BASE), (11, 'Harga beras naik lagi di pasar induk')])
+    assert index.add_file(tmp_path / 'b.csv', [(10, BASE), (20, BASE + ' setuju')]) == 1
+    assert index.cluster_ids([10, 11, 20]) == {10: 10, 11: 11, 20: 10}
+
+    index.remove_file(tmp_path / 'a.csv')
+    assert index.cluster_ids([10, 11, 20]) == {10: 10, 20: 10}
+    index.add_file(tmp_path / 'b.csv', [(10, BASE), (20, BASE + ' setuju')])
+    assert index.stats() == {'tweets': 2, 'clusters': 1, 'duplicates': 1}
+    index.remove_file(tmp_path / 'b.csv')
+    assert index.stats() == {'tweets': 0, 'clusters': 0, 'duplicates': 0}
+
+
+def test_store_from_before_path_links_is_backfilled(tmp_path):
+    index = DedupIndex(tmp_path)
+    index.add_file(tmp_path / 'a.csv', [(10, BASE), (11, BASE + ' setuju')])
+    connection = sqlite3.connect(index.path)
+    with connection:
+        connection.execute('DELETE FROM signature_paths')
+        connection.execute('PRAGMA user_version = 1')
+    connection.close()
+
+    assert index.stats() == {'tweets': 2, 'clusters': 1, 'duplicates': 1}
+    index.remove_file(tmp_path / 'a.csv')
+    assert index.stats()['tweets'] == 0
+
+
+def test_ingest_worker_computes_signatures_inline_and_shuts_down(tmp_path, monkeypatch):
+    monkeypatch.setattr(dedup, 'PARALLEL_MIN_ROWS', 4)
+    monkeypatch.setattr(dedup, 'PARALLEL_CHUNK_ROWS', 3)
+    monkeypatch.setattr(dedup.os, 'cpu_count', lambda: 2)
+    path = tmp_path / 'a.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id_str', 'created_at', 'username', 'full_text'])
+        for number in range(10):
+            writer.writerow([100 + number, 'Mon Jan 01 10:30:00 +0000 2024', f'user{number}', f'{BASE} {number}'])
+
+    pool = IngestPool()
+    pool.ingest(tmp_path, path, 'pilpres')
+    assert pool.wait(timeout=60)
+    stopper = threading.Thread(target=pool.shutdown, daemon=True)
+    stopper.start()
+    stopper.join(timeout=30)
+    assert not stopper.is_alive()
+    assert DedupIndex(tmp_path).stats()['tweets'] == 10
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+
+import graph_builder
+from graph_builder import WindowGraphs, _window_end, build_graphs
+from output_index import OutputIndex, output_location
+
+
+def write_output(output_dir, keyword, start_date, end_date, tweets):
+    _, path = output_location(str(output_dir), keyword, False, 'id', 'LATEST', start_date, end_date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        output.write('created_at,id_str,username,full_text\n')
+        for created_at, tweet_id, username, text in tweets:
+            output.write(f'{created_at},{tweet_id},{username},{text}\n')
+    OutputIndex(output_dir).record(path, keyword, False, 'id', 'LATEST', 'q', start_date, end_date)
+
+
+def test_window_end():
+    assert str(_window_end('2024-01-31', 'day')) == '2024-02-01 00:00:00'
+    assert str(_window_end('2024-W01', 'week')) == '2024-01-08 00:00:00'
+    assert str(_window_end('2023-12', 'month')) == '2024-01-01 00:00:00'
+
+
+def test_duplicate_ids_count_once_per_window():
+    graphs = WindowGraphs('2024-01')
+    graphs.add_chunk(np.array([5, 6, 0], dtype=np.uint64), ['a', 'b', 'c'], [['b'], [], []], [[], [], []])
+    graphs.add_chunk(np.array([5, 7, 0], dtype=np.uint64), ['a', 'a', 'c'], [['b'], ['c'], []], [[], [], []])
+    # 5 is seen twice; rows without an id always count
+    assert graphs.tweets == 5
+
+
+def test_seen_ids_stay_in_few_shards():
+    graphs = WindowGraphs('2024-01')
+    generator = np.random.default_rng(7)
+    seen = set()
+    for _ in range(50):
+        ids = generator.integers(0, 5000, size=200).astype(np.uint64)
+        fresh = graphs._unseen(ids)
+        expected = set()
+        for position, tweet_id in enumerate(ids.tolist()):
+            assert fresh[position] == (tweet_id == 0 or (tweet_id not in seen and tweet_id not in expected))
+            expected.add(tweet_id)
+        seen |= expected
+    assert len(graphs.seen) <= 7
+    assert sorted(np.concatenate(graphs.seen).tolist()) == sorted(seen - {0})
+
+
+def test_chunk_edges():
+    graphs = WindowGraphs('2024-01')
+    graphs.add_chunk(np.array([1, 2, 3], dtype=np.uint64), ['ani', '', 'budi'],
+                     [['budi', 'budi', 'ani'], ['ani'], []], [['#b', '#a', '#b'], [], ['#c', '#a']])
+    graphs.mentions._compact()
+    graphs.cooccurrence._compact()
+    assert graphs.users == {'ani': 0, 'budi': 1}
+    assert graphs.mentions.keys.tolist() == [1] and graphs.mentions.counts.tolist() == [1]
+    assert graphs.hashtags == {'#a': 0, '#b': 1, '#c': 2}
+    assert graphs.cooccurrence.keys.tolist() == [1, 2]
+
+
+def test_windows_are_flushed_once_no_later_file_can_reach_them(tmp_path, monkeypatch):
+    write_output(tmp_path, 'pilpres', '2024-01-01', '2024-01-31', [
+        ('Mon Jan 01 10:00:00 +0000 2024', 1, 'ani', '@budi #a #b'),
+        ('Wed Jan 31 23:00:00 +0000 2024', 2, 'budi', '@ani #b'),
+    ])
+    write_output(tmp_path, 'pilpres', '2024-02-01', '2024-02-29', [
+        ('Thu Feb 01 01:00:00 +0000 2024', 3, 'ani', '@cici #a #c'),
+    ])
+    write_output(tmp_path, 'pilpres', '2024-04-01', '2024-04-30', [
+        # Lands in January, which was written when this file started
+        ('Tue Jan 02 10:00:00 +0000 2024', 4, 'dodi', '@ani'),
+        ('Mon Apr 01 10:00:00 +0000 2024', 5, 'dodi', '@ani'),
+    ])
+    events = []
+    read_chunks, write = graph_builder._iter_chunks, WindowGraphs.write
+
+    def recording_chunks(path, *args):
+        events.append(('read', os.path.basename(path).split('_', 1)[1][:7]))
+        return read_chunks(path, *args)
+
+    def recording_write(graphs, target_dir):
+        events.append(('write', graphs.period))
+        return write(graphs, target_dir)
+
+    monkeypatch.setattr(graph_builder, '_iter_chunks', recording_chunks)
+    monkeypatch.setattr(WindowGraphs, 'write', recording_write)
+    written = build_graphs(tmp_path, window='month', target_dir=tmp_path / 'graphs')
+
+    # January stays open while the February file (within LATE_MARGIN) may still reach it;
+    # both are written before the April file is read, and its January straggler is skipped
+    assert events == [('read', '2024_01'), ('read', '2024_02'), ('write', '2024-01'), ('write', '2024-02'),
+                      ('read', '2024_04'), ('write', '2024-04')]
+    assert written['2024-01'] == {'mentions': {'nodes': 2, 'edges': 2}, 'hashtags': {'nodes': 2, 'edges': 1},
+                                  'tweets': 2}
+    assert written['2024-04']['tweets'] == 1
+
+    matrix = np.load(tmp_path / 'graphs' / 'month' / '2024-02' / 'hashtags.npz')
+    assert list(matrix['shape']) == [2, 2] and matrix['data'].tolist() == [1]
+    nodes = (tmp_path / 'graphs' / 'month' / '2024-01' / 'mentions.nodes.txt').read_text().split()
+    assert nodes == ['ani', 'budi']
@@ -0,0 +1,66 @@
+import pytest
+
+from harvest_parser import (
+    HarvestOutputParser, OUTPUT_AUTH_ERROR, OUTPUT_ERROR, OUTPUT_INVALID_QUERY, OUTPUT_NETWORK_ERROR,
+    OUTPUT_NO_RESULTS, OUTPUT_RATE_LIMIT, OUTPUT_SAVED, OUTPUT_SCROLL, OUTPUT_TWEETS
+)
+
+
+@pytest.mark.parametrize('line, tweets', [
+    ('Total tweets saved: 401', 401),
+    ('Got 400 new tweets', 400),
+    ('Fetched 503 tweets', 503),
+    ('429 tweets so far', 429),
+    ('Tweets collected: 502', 502),
+])
+def test_counts_that_look_like_status_codes_are_progress(line, tweets):
+    parser = HarvestOutputParser()
+    output = parser.feed(line)
+    assert output.kind == OUTPUT_TWEETS
+    assert parser.tweets == tweets
+    assert parser.auth_error is None and parser.invalid_query is None
+    assert parser.rate_limited == 0 and parser.network_errors == 0
+
+
+@pytest.mark.parametrize('line, kind', [
+    ('Error: Request failed with status code 401', OUTPUT_AUTH_ERROR),
+    ('Unauthorized, please check your auth token', OUTPUT_AUTH_ERROR),
+    ('HTTP/1.1 429', OUTPUT_RATE_LIMIT),
+    ('Rate limit exceeded, waiting 60 seconds', OUTPUT_RATE_LIMIT),
+    ('status: 400', OUTPUT_INVALID_QUERY),
+    ('response 503 from x.com', OUTPUT_NETWORK_ERROR),
+    ('Error: 502 Bad Gateway', OUTPUT_NETWORK_ERROR),
+    ('Error: net::ERR_CONNECTION_RESET', OUTPUT_NETWORK_ERROR),
+    ('No more tweets found', OUTPUT_NO_RESULTS),
+    ('Error: something odd happened', OUTPUT_ERROR),
+])
+def test_problem_lines(line, kind):
+    assert HarvestOutputParser().feed(line).kind == kind
+
+
+def test_bare_status_numbers_are_not_errors():
+    parser = HarvestOutputParser()
+    for line in ('401', '503 total', 'Processing 503', 'waited 429 ms'):
+        output = parser.feed(line)
+        assert output is None or output.kind not in (OUTPUT_AUTH_ERROR, OUTPUT_RATE_LIMIT, OUTPUT_NETWORK_ERROR)
+    assert parser.auth_error is None
+
+
+def test_new_tweets_accumulate_and_totals_do_not():
+    parser = HarvestOutputParser()
+    parser.feed('Got 20 new tweets')
+    parser.feed('Scrolling... got 20 new tweets')
+    assert parser.tweets == 40
+    assert parser.pages == 1
+    parser.feed('Total tweets saved: 35')
+    assert parser.tweets == 40
+    assert parser.feed('scrolling down').kind == OUTPUT_SCROLL
+    assert parser.pages == 2
+
+
+def test_query_echo_is_ignored_and_saved_path_kept():
+    parser = HarvestOutputParser(query='unauthorized since:2024-01-01')
+    assert parser.feed('Searching for unauthorized since:2024-01-01') is None
+    output = parser.feed('\x1b[32mYour tweets saved to: /tmp/out.csv\x1b[0m')
+    assert output.kind == OUTPUT_SAVED
+    assert parser.stats()['saved_path'] == '/tmp/out.csv'
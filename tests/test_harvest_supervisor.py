@@ -0,0 +1,43 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from harvest_supervisor import HarvestSupervisor
+from process_control import popen_group_kwargs
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason='uses a POSIX shell to leave a child behind')
+
+
+def spawn(script):
+    return subprocess.Popen(['sh', '-c', script], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            **popen_group_kwargs())
+
+
+def run_until_done(supervisor, limit):
+    deadline = time.monotonic() + limit
+    while len(supervisor) and time.monotonic() < deadline:
+        supervisor.poll(0.05)
+
+
+def test_lines_and_exit_code_are_delivered():
+    supervisor = HarvestSupervisor()
+    lines, exits = [], []
+    supervisor.add('job', spawn('printf "one\\rtwo\\nthree"; exit 3'), lines.append, exits.append)
+    run_until_done(supervisor, 5)
+    assert lines == ['one', 'two', 'three']
+    assert exits == [3]
+
+
+def test_job_is_reaped_when_a_child_keeps_the_pipe_open():
+    # The leader exits at once; the backgrounded sleep inherits stdout and would hold it for a minute
+    supervisor = HarvestSupervisor(exit_grace=0.2)
+    lines, exits = [], []
+    process = spawn('sleep 60 & echo started')
+    supervisor.add('job', process, lines.append, exits.append)
+    started = time.monotonic()
+    run_until_done(supervisor, 10)
+    assert exits == [0]
+    assert lines == ['started']
+    assert time.monotonic() - started < 5
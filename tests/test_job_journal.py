@@ -0,0 +1,56 @@
+import json
+from datetime import datetime
+
+from job_journal import (JobJournal, iter_details, iter_errors, iter_files_created, recent_errors,
+                         write_batch_summary)
+
+
+def job(number, success):
+    result = {'success': True, 'path': f'out/{number}.csv'} if success else {'success': False, 'reason': f'boom {number}'}
+    return {'job_number': number, 'keyword': 'pilpres', 'start_date': '2024-01-01', 'end_date': '2024-01-31',
+            'success': success, 'result': result}
+
+
+def test_journal_appends_survive_reopening(tmp_path):
+    path = tmp_path / 'nested' / 'journal.jsonl'
+    JobJournal(path).append(job(1, True))
+    JobJournal(path).append(job(2, False))
+    assert [entry['job_number'] for entry in JobJournal(path)] == [1, 2]
+
+
+def test_journaled_results_read_like_in_memory_ones(tmp_path):
+    entries = [job(number, number % 3 != 0) for number in range(1, 8)]
+    journal = JobJournal(tmp_path / 'journal.jsonl')
+    for entry in entries:
+        journal.append(entry)
+    in_memory = {
+        'details': entries,
+        'files_created': [entry['result']['path'] for entry in entries if entry['success']],
+        'errors': [{'keyword': 'pilpres', 'start_date': '2024-01-01', 'end_date': '2024-01-31',
+                    'reason': entry['result']['reason']} for entry in entries if not entry['success']],
+    }
+    journaled = {'journal': str(journal.path)}
+    for reader in (iter_details, iter_errors, iter_files_created):
+        assert list(reader(journaled)) == list(reader(in_memory))
+    assert recent_errors(journaled, limit=1) == in_memory['errors'][:1]
+
+
+def test_summary_streams_the_journal_into_valid_json(tmp_path):
+    journal = JobJournal(tmp_path / 'journal.jsonl')
+    for number in range(1, 4):
+        journal.append(job(number, number != 2))
+    results = {'success': True, 'total_jobs': 3, 'start_time': datetime(2024, 1, 1, 12), 'journal': str(journal.path)}
+    summary_path = tmp_path / 'summary.json'
+    write_batch_summary(results, summary_path)
+
+    summary = json.loads(summary_path.read_text(encoding='utf-8'))
+    assert summary['start_time'] == '2024-01-01 12:00:00'
+    assert summary['files_created'] == ['out/1.csv', 'out/3.csv']
+    assert [error['reason'] for error in summary['errors']] == ['boom 2']
+    assert [detail['job_number'] for detail in summary['details']] == [1, 2, 3]
+
+
+def test_summary_of_an_empty_batch(tmp_path):
+    summary_path = tmp_path / 'summary.json'
+    write_batch_summary({}, summary_path)
+    assert json.loads(summary_path.read_text(encoding='utf-8')) == {'files_created': [], 'errors': [], 'details': []}
@@ -0,0 +1,47 @@
+import logging
+import threading
+
+from log_queue import LogQueue
+
+
+def test_drain_returns_messages_in_order_and_empties_the_queue():
+    queue = LogQueue()
+    queue.put('first')
+    queue.put('second', logging.ERROR)
+    assert len(queue) == 2
+    records, dropped = queue.drain()
+    assert [(level, message) for _, level, message in records] == [(logging.INFO, 'first'), (logging.ERROR, 'second')]
+    assert dropped == 0
+    assert len(queue) == 0
+    assert queue.drain() == ([], 0)
+
+
+def test_oldest_messages_are_dropped_and_counted_until_the_next_drain():
+    queue = LogQueue(capacity=3)
+    for number in range(10):
+        queue.put(str(number))
+    records, dropped = queue.drain()
+    assert [message for _, _, message in records] == ['7', '8', '9']
+    assert dropped == 7
+    queue.put('after')
+    assert queue.drain()[1] == 0
+
+
+def test_concurrent_producers_lose_nothing_but_what_is_counted():
+    queue = LogQueue(capacity=100)
+
+    def produce():
+        for number in range(1000):
+            queue.put(str(number))
+
+    producers = [threading.Thread(target=produce) for _ in range(4)]
+    for producer in producers:
+        producer.start()
+    seen = 0
+    while any(producer.is_alive() for producer in producers):
+        records, dropped = queue.drain()
+        seen += len(records) + dropped
+    for producer in producers:
+        producer.join()
+    records, dropped = queue.drain()
+    assert seen + len(records) + dropped == 4000
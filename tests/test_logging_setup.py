@@ -0,0 +1,30 @@
+import logging
+import logging.handlers
+import os
+import queue
+
+import config
+
+
+def test_worker_logging_replaces_the_inherited_queue_handler(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'BASE_DIR', tmp_path)
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    # What a forked pool worker inherits from a parent that called setup_logging()
+    root.addHandler(logging.handlers.QueueHandler(queue.SimpleQueue()))
+    try:
+        config.setup_worker_logging()
+        assert not any(isinstance(handler, logging.handlers.QueueHandler) for handler in root.handlers)
+        assert not (tmp_path / 'logs' / f'twitter_agent_{os.getpid()}.log').exists()
+        config.logger.warning('from a worker')
+        for handler in root.handlers:
+            handler.flush()
+        log_file = tmp_path / 'logs' / f'twitter_agent_{os.getpid()}.log'
+        assert 'from a worker' in log_file.read_text()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
@@ -0,0 +1,23 @@
+from output_index import OutputIndex, output_location
+
+
+def record(index, path):
+    return index.record(path, '#pilpres2024', False, 'id', 'LATEST', 'q', '2024-01-01', '2024-01-31')
+
+
+def test_output_location_shards_by_query_and_month(tmp_path):
+    name, path = output_location(str(tmp_path), '#pilpres2024', False, 'id', 'LATEST', '2024-01-01', '2024-01-31')
+    quoted, _ = output_location(str(tmp_path), '#pilpres2024', True, 'id', 'LATEST', '2024-01-01', '2024-01-31')
+    assert name != quoted
+    assert path.endswith(f'2024/01/{name}') and name.startswith('pilpres2024-')
+
+
+def test_recompressed_output_replaces_its_sibling(tmp_path):
+    index = OutputIndex(tmp_path)
+    _, path = output_location(str(tmp_path), '#pilpres2024', False, 'id', 'LATEST', '2024-01-01', '2024-01-31')
+    assert record(index, path) == []
+    assert record(index, path + '.gz') == [path]
+    assert [entry['path'] for entry in index.iter_outputs()] == [path + '.gz']
+    assert record(index, path + '.gz') == []
+    assert record(index, path) == [path + '.gz']
+    assert index.totals()['files'] == 1
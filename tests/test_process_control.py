@@ -0,0 +1,70 @@
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+from process_control import CancelToken, Watchdog, popen_group_kwargs
+
+posix_only = pytest.mark.skipif(os.name == 'nt', reason='uses a POSIX shell to leave a child behind')
+
+
+def spawn(script):
+    return subprocess.Popen(['sh', '-c', script], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            **popen_group_kwargs())
+
+
+def test_wait_returns_early_once_cancelled():
+    token = CancelToken()
+    assert token.wait(0.01) is False
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+    assert token.wait(30) is True
+    assert time.monotonic() - started < 10
+    assert token.cancelled and token.cancelled_at is not None
+
+
+@posix_only
+def test_cancel_kills_registered_process_groups():
+    token = CancelToken(kill_grace=0.2)
+    # The trap makes the leader ignore SIGTERM, the backgrounded sleep is a child it leaves behind
+    process = spawn('trap "" TERM; sleep 60 & echo $!; wait')
+    child = int(process.stdout.readline())
+    token.register(process)
+    token.cancel()
+    assert process.poll() is not None
+    with pytest.raises(ProcessLookupError):
+        for _ in range(50):
+            os.kill(child, 0)
+            time.sleep(0.1)
+    process.stdout.close()
+
+
+@posix_only
+def test_processes_registered_after_a_cancel_are_killed_at_once():
+    token = CancelToken(kill_grace=0.2)
+    token.cancel()
+    process = spawn('sleep 60')
+    token.register(process)
+    assert process.poll() is not None
+    token.unregister(process)
+    process.stdout.close()
+
+
+def test_watchdog_reports_idle_and_total_timeouts():
+    watchdog = Watchdog(idle_timeout=10, total_timeout=60)
+    assert watchdog.check() is None
+    watchdog.watch(None)
+    start = watchdog.started_at
+    assert watchdog.check(start + 9) is None
+    assert watchdog.check(start + 11) == 'no output for 10s'
+    watchdog.last_activity = start + 55
+    assert watchdog.check(start + 59) is None
+    assert watchdog.check(start + 61) == 'exceeded total timeout of 60s'
+
+
+def test_a_zero_timeout_disables_that_limit():
+    watchdog = Watchdog(idle_timeout=0, total_timeout=None)
+    watchdog.watch(None)
+    assert watchdog.check(watchdog.started_at + 10 ** 6) is None
@@ -0,0 +1,41 @@
+import pytest
+
+import retry_policy
+from retry_policy import RetryPolicy, classify_failure
+
+
+@pytest.mark.parametrize('result, expected', [
+    ({'success': True}, (None, None)),
+    ({'success': False, 'cancelled': True, 'timed_out': True}, ('cancelled', 'cancelled')),
+    ({'success': False, 'harvest': {'auth_error': 'HTTP 401', 'network_errors': 2}}, ('permanent', 'auth')),
+    ({'success': False, 'harvest': {'invalid_query': 'bad operator'}}, ('permanent', 'invalid_query')),
+    ({'success': False, 'start_failed': True}, ('permanent', 'start_failed')),
+    ({'success': False, 'timed_out': True}, ('transient', 'timeout')),
+    ({'success': False, 'harvest': {'rate_limited': True}}, ('transient', 'rate_limited')),
+    ({'success': False, 'harvest': {'network_errors': 1}}, ('transient', 'network')),
+    ({'success': False, 'reason': 'Empty file'}, ('permanent', 'no_results')),
+    ({'success': False, 'no_results': True}, ('permanent', 'no_results')),
+    ({'success': False, 'reason': 'File not created'}, ('transient', 'no_output')),
+    ({'success': False, 'reason': 'something else'}, ('transient', 'unknown')),
+])
+def test_classify_failure(result, expected):
+    assert classify_failure(result) == expected
+
+
+def test_uncertain_failures_are_retried_once():
+    policy = RetryPolicy(max_attempts=5, base_delay=0)
+    timeout = {'success': False, 'timed_out': True}
+    assert [policy.should_retry(timeout, attempt) for attempt in range(1, 6)] == [True] * 4 + [False]
+    for reason in ('File not created', 'Harvester crashed'):
+        failed = {'success': False, 'reason': reason}
+        assert policy.should_retry(failed, 1)
+        assert not policy.should_retry(failed, retry_policy.UNCERTAIN_MAX_ATTEMPTS)
+    assert not policy.should_retry({'success': False, 'reason': 'Empty file'}, 1)
+    assert not RetryPolicy(max_attempts=1).should_retry({'success': False, 'reason': 'File not created'}, 1)
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=10, max_delay=60)
+    for attempt, ceiling in ((1, 10), (2, 20), (3, 40), (6, 60)):
+        delays = [policy.delay(attempt) for _ in range(50)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
@@ -0,0 +1,80 @@
+import sqlite3
+
+from output_index import query_hash
+from rollups import RollupAccumulator, RollupStore
+
+
+def tweet(day, hour, username, text='#pilpres2024', favorites=1):
+    return {'created_at': f'Mon Jan {day:02d} {hour:02d}:30:00 +0000 2024', 'username': username,
+            'full_text': text, 'favorite_count': str(favorites)}
+
+
+def ingest(store, path, keyword, rows, query=None):
+    accumulator = RollupAccumulator()
+    for _ in accumulator.observe(rows):
+        pass
+    store.replace_file(path, keyword, accumulator, query)
+
+
+def test_authors_are_distinct_across_hours_and_files(tmp_path):
+    store = RollupStore(tmp_path)
+    ingest(store, tmp_path / 'a.csv', 'pilpres', [tweet(1, 1, f'user{n}') for n in range(300)])
+    ingest(store, tmp_path / 'b.csv', 'pilpres', [tweet(1, 2, f'user{n}') for n in range(100, 400)])
+    [day] = store.series(granularity='day')
+    assert day['tweets'] == 600
+    assert abs(day['authors'] - 400) <= 10
+    assert all(abs(entry['authors'] - 300) <= 9 for entry in store.series(granularity='hour'))
+
+
+def test_rescraped_range_is_not_counted_twice(tmp_path):
+    store = RollupStore(tmp_path)
+    january = [tweet(day, 12, 'a', favorites=1) for day in range(1, 21)]
+    ingest(store, tmp_path / 'january.csv', 'pilpres', january)
+    # Days 15-20 again, with newer engagement, plus days 21-25
+    again = [tweet(day, 12, 'a', favorites=5) for day in range(15, 26)]
+    ingest(store, tmp_path / 'rescrape.csv', 'pilpres', again)
+    ingest(store, tmp_path / 'other.csv', 'gibran', january)
+
+    series = {entry['period']: entry for entry in store.series(['pilpres'])}
+    assert sum(entry['tweets'] for entry in series.values()) == 25
+    assert series['2024-01-14']['favorites'] == 1
+    assert series['2024-01-15']['favorites'] == 5
+    assert store.top_terms('hashtags', ['pilpres']) == [('#pilpres2024', 25)]
+    assert sum(entry['tweets'] for entry in store.series(['gibran'])) == 20
+
+    store.remove_file(tmp_path / 'rescrape.csv')
+    assert sum(entry['tweets'] for entry in store.series(['pilpres'])) == 20
+
+
+def test_language_variants_of_a_keyword_are_both_counted(tmp_path):
+    store = RollupStore(tmp_path)
+    january = [tweet(day, 12, f'user{day}') for day in range(1, 11)]
+    ingest(store, tmp_path / 'id.csv', 'pilpres', january, query=query_hash('pilpres', False, 'id', 'LATEST'))
+    ingest(store, tmp_path / 'en.csv', 'pilpres', january[:5], query=query_hash('pilpres', False, 'en', 'LATEST'))
+
+    series = {entry['period']: entry['tweets'] for entry in store.series(['pilpres'])}
+    assert sum(series.values()) == 15
+    assert series['2024-01-01'] == 2 and series['2024-01-10'] == 1
+    assert store.top_terms('hashtags', ['pilpres']) == [('#pilpres2024', 15)]
+
+
+def test_older_store_is_upgraded(tmp_path):
+    store_path = tmp_path / '.harvest' / 'rollups.sqlite'
+    store_path.parent.mkdir()
+    connection = sqlite3.connect(store_path)
+    connection.executescript("""
+        CREATE TABLE hourly (path TEXT NOT NULL, keyword TEXT NOT NULL, hour TEXT NOT NULL, tweets INTEGER NOT NULL,
+            favorites INTEGER NOT NULL, retweets INTEGER NOT NULL, replies INTEGER NOT NULL, quotes INTEGER NOT NULL,
+            PRIMARY KEY (path, hour)) WITHOUT ROWID;
+        CREATE TABLE hourly_authors (path TEXT NOT NULL, keyword TEXT NOT NULL, hour TEXT NOT NULL,
+            username TEXT NOT NULL, PRIMARY KEY (path, hour, username)) WITHOUT ROWID;
+        CREATE TABLE daily_sketches (path TEXT NOT NULL, keyword TEXT NOT NULL, day TEXT NOT NULL, kind TEXT NOT NULL,
+            data BLOB NOT NULL, PRIMARY KEY (path, day, kind)) WITHOUT ROWID;
+        INSERT INTO hourly VALUES ('a.csv', 'pilpres', '2024-01-01 01', 3, 0, 0, 0, 0);
+        INSERT INTO hourly_authors VALUES ('a.csv', 'pilpres', '2024-01-01 01', 'x'),
+                                          ('a.csv', 'pilpres', '2024-01-01 01', 'y');
+    """)
+    connection.close()
+
+    [day] = RollupStore(tmp_path).series()
+    assert (day['period'], day['tweets'], day['authors']) == ('2024-01-01', 3, 2)
@@ -0,0 +1,41 @@
+import sqlite3
+
+from search_index import SearchIndex
+
+
+def rows(*tweet_ids):
+    return [{'id_str': str(tweet_id), 'full_text': f'tweet {tweet_id} #pilpres2024'} for tweet_id in tweet_ids]
+
+
+def test_tweet_shared_by_two_files_survives_removing_one(tmp_path):
+    index = SearchIndex(tmp_path)
+    first, second = str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')
+    index.index_file(first, 'pilpres', rows(1, 2))
+    index.index_file(second, 'gibran', rows(2, 3))
+    assert index.stats() == {'tweets': 3, 'files': 2}
+    assert {hit['id'] for hit in index.search('#pilpres2024', keyword='pilpres')} == {1, 2}
+
+    assert index.remove_file(second) == 1
+    assert sorted(index.fetch([1, 2, 3])) == [1, 2]
+    assert index.fetch([2])[2]['path'] == 'a.csv'
+    assert index.count('#pilpres2024') == 2
+
+    # Re-indexing a file with fewer tweets drops only what no other file has
+    index.index_file(second, 'gibran', rows(2, 3))
+    index.index_file(first, 'pilpres', rows(1))
+    assert sorted(index.fetch([1, 2, 3])) == [1, 2, 3]
+    assert {hit['id'] for hit in index.search('tweet', keyword='gibran')} == {2, 3}
+
+
+def test_older_index_is_linked_on_open(tmp_path):
+    index = SearchIndex(tmp_path)
+    index.index_file(str(tmp_path / 'a.csv'), 'pilpres', rows(7))
+    connection = sqlite3.connect(index.path)
+    connection.execute('DROP TABLE tweet_paths')
+    connection.execute('PRAGMA user_version = 0')
+    connection.commit()
+    connection.close()
+
+    assert index.stats() == {'tweets': 1, 'files': 1}
+    assert index.remove_file(tmp_path / 'a.csv') == 1
+    assert index.count('tweet') == 0
@@ -0,0 +1,58 @@
+import random
+from collections import Counter
+
+from sketches import HyperLogLog, TermSketch, extract_terms
+
+
+def test_hyperloglog_error_is_within_bounds():
+    for distinct in (100, 10000, 200000):
+        sketch = HyperLogLog()
+        for number in range(distinct):
+            sketch.add(f'user{number}')
+        # Standard error at precision 12 is about 1.6%; allow three of them
+        assert abs(sketch.estimate() - distinct) <= 0.05 * distinct
+
+
+def test_hyperloglog_merge_is_a_union_and_survives_serialization():
+    first, second, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for number in range(30000):
+        (first if number < 20000 else second).add(f'user{number}')
+        both.add(f'user{number}')
+    second.add('user0')
+    merged = HyperLogLog.from_bytes(first.to_bytes()).merge(HyperLogLog.from_bytes(second.to_bytes()))
+    assert merged.registers == both.registers
+    assert abs(merged.estimate() - 30000) <= 1500
+
+
+def test_count_min_never_underestimates_and_stays_within_bound():
+    generator = random.Random(7)
+    counts = Counter(f'#tag{int(generator.paretovariate(1.2))}' for _ in range(50000))
+    sketch = TermSketch()
+    sketch.add_counts(counts)
+    total = sum(counts.values())
+    errors = [sketch.count(term) - count for term, count in counts.items()]
+    assert min(errors) >= 0
+    # e / width of the total with probability 1 - e ** -depth per term
+    bound = 2.72 / sketch.width * total
+    assert sum(error > bound for error in errors) <= 0.02 * len(errors) + 1
+
+
+def test_merged_sketches_find_the_heavy_hitters_of_the_range():
+    days = []
+    for day in range(10):
+        counts = Counter({f'#daily{day}': 50, '#steady': 30})
+        counts.update(f'#noise{day}-{number}' for number in range(200))
+        sketch = TermSketch()
+        sketch.add_counts(counts)
+        days.append(TermSketch.from_bytes(sketch.to_bytes()))
+    merged = TermSketch()
+    for sketch in days:
+        merged.merge(sketch)
+    top = merged.top(3)
+    assert top[0][0] == '#steady' and top[0][1] >= 300
+    assert {term for term, _ in top[1:]} <= {f'#daily{day}' for day in range(10)}
+
+
+def test_extract_terms():
+    terms = extract_terms('Vote #Pilpres2024 with @Gibran_R https://www.example.com/x?a=1')
+    assert terms == {'hashtags': ['#pilpres2024'], 'mentions': ['@gibran_r'], 'domains': ['example.com']}
@@ -0,0 +1,23 @@
+import csv
+
+import storage
+from storage import FIELD_SIZE_LIMIT, count_rows, iter_rows, long_fields
+
+
+def test_long_fields_are_read_without_changing_the_limit_for_everyone(tmp_path):
+    default = csv.field_size_limit()
+    assert default < FIELD_SIZE_LIMIT
+    path = tmp_path / 'long.csv'
+    text = 'x' * (default + 1)
+    path.write_text(f'id_str,full_text\n1,{text}\n2,short\n', encoding='utf-8')
+
+    rows = iter_rows(path)
+    assert next(rows)['full_text'] == text
+    with long_fields():
+        assert csv.field_size_limit() == FIELD_SIZE_LIMIT
+    # Still raised while the first reader is open, back to the default once it is done
+    assert csv.field_size_limit() == FIELD_SIZE_LIMIT
+    assert [row['id_str'] for row in rows] == ['2']
+    assert csv.field_size_limit() == default
+    assert count_rows(path) == 2
+    assert csv.field_size_limit() == default and storage._long_field_readers == 0
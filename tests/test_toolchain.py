@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+import toolchain
+import twitter_scraper
+from toolchain import HARVEST_PACKAGE, HARVEST_VERSION, ToolchainError, resolve_toolchain
+from twitter_scraper import TwitterScraper
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch):
+    monkeypatch.setattr(toolchain, '_resolved', {})
+    monkeypatch.setattr(toolchain, '_failed', {})
+
+
+def fake_install(tools_dir):
+    package = tools_dir / 'node_modules' / HARVEST_PACKAGE
+    (package / 'dist').mkdir(parents=True)
+    (package / 'dist' / 'bin.js').write_text('')
+    (package / 'package.json').write_text(json.dumps({'version': HARVEST_VERSION, 'bin': 'dist/bin.js'}))
+
+
+def test_resolved_toolchain_is_cached_on_disk(tmp_path, monkeypatch):
+    node = tmp_path / 'node'
+    node.write_text('')
+    monkeypatch.setattr(toolchain, '_find_node', lambda: (str(node), 'v20.0.0'))
+    tools_dir = tmp_path / 'tools'
+    fake_install(tools_dir)
+
+    first = resolve_toolchain(tools_dir)
+    assert first.command(['-o', 'x.csv']) == [str(node), first.entry, '-o', 'x.csv']
+
+    def no_spawning():
+        raise AssertionError('node was looked up again')
+
+    monkeypatch.setattr(toolchain, '_find_node', no_spawning)
+    monkeypatch.setattr(toolchain, '_resolved', {})
+    assert resolve_toolchain(tools_dir).as_dict() == first.as_dict()
+
+
+def missing_node():
+    raise ToolchainError('Node.js not found')
+
+
+def test_failed_install_is_not_retried_until_refresh(tmp_path, monkeypatch):
+    attempts = []
+
+    def counted():
+        attempts.append(1)
+        missing_node()
+
+    monkeypatch.setattr(toolchain, '_find_node', counted)
+    for _ in range(3):
+        with pytest.raises(ToolchainError, match='Node.js not found'):
+            resolve_toolchain(tmp_path)
+    assert len(attempts) == 1
+    with pytest.raises(ToolchainError):
+        resolve_toolchain(tmp_path, refresh=True)
+    assert len(attempts) == 2
+
+
+def test_jobs_fall_back_to_the_npx_on_path(tmp_path, monkeypatch):
+    monkeypatch.setitem(toolchain.config, 'tools_dir', str(tmp_path / 'tools'))
+    monkeypatch.setattr(toolchain, '_find_node', missing_node)
+    monkeypatch.setattr(twitter_scraper.shutil, 'which', lambda name: f'C:\\node\\{name}.CMD')
+    scraper = TwitterScraper(auth_token='token', output_dir=str(tmp_path))
+    assert scraper._ensure_toolchain() is None
+    spec = scraper._prepare_job('pilpres', '2024-01-01', '2024-01-31', False, 10, 'id', 'LATEST')
+    assert spec['command'][:2] == ['C:\\node\\npx.CMD', f'{HARVEST_PACKAGE}@{HARVEST_VERSION}']
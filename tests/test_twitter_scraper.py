@@ -0,0 +1,141 @@
+import sys
+import textwrap
+import time
+
+import pytest
+
+from config import config
+from job_journal import iter_details
+from process_control import CancelToken
+from retry_policy import RetryPolicy
+from twitter_scraper import JobTimer, TimingStats, TwitterScraper
+
+# Stands in for tweet-harvest: prints like it and writes its CSV into tweets-data/ under the job's file name
+HARVESTER = textwrap.dedent('''
+    import os, sys, time
+    name = sys.argv[1]
+    print('Got 2 new tweets', flush=True)
+    time.sleep(float(os.environ.get('FAKE_HARVEST_SLEEP', '0')))
+    os.makedirs('tweets-data', exist_ok=True)
+    with open(os.path.join('tweets-data', name), 'w') as output:
+        output.write('created_at,id_str,full_text\\n'
+                     'Mon Jan 01 10:00:00 +0000 2024,1,a\\nMon Jan 01 10:00:00 +0000 2024,2,b\\n')
+''')
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.setitem(config, 'normalize', False)
+    monkeypatch.setitem(config, 'output_compression', 'none')
+    scraper = TwitterScraper(auth_token='a' * 40, output_dir=str(tmp_path))
+    scraper.job_delay = 0
+    scraper.backup_tokens = []
+    scraper.retry_policy = RetryPolicy(max_attempts=1)
+    prepare_job = scraper._prepare_job
+
+    def fake_job(*args, **kwargs):
+        spec = prepare_job(*args, **kwargs)
+        spec['command'] = [sys.executable, '-c', HARVESTER, spec['filename'], spec['command'][-1]]
+        return spec
+
+    monkeypatch.setattr(scraper, '_prepare_job', fake_job)
+    monkeypatch.setattr(scraper, '_ensure_toolchain', lambda: None)
+    monkeypatch.setattr(scraper, '_ingest_later', lambda *args: None)
+    return scraper
+
+
+def batch(scraper, **kwargs):
+    return scraper.batch_scrape(['pilpres', 'gibran'], '2024-01-01', '2024-02-29', preflight=False, **kwargs)
+
+
+def test_phases_are_measured_from_the_latest_earlier_mark():
+    timer = JobTimer(ready_at=10.0)
+    timer.marks.update(started=11.0, spawned=11.5, exited=20.0, moved=20.25)
+    # No output was ever seen: the harvester's run is measured from the spawn
+    assert timer.phases() == {'queue_wait': 1.0, 'spawn': 0.5, 'harvester_exit': 8.5, 'file_move': 0.25}
+    timer.mark('spawned')
+    assert timer.marks['spawned'] == 11.5
+
+
+def test_timing_percentiles_use_a_bounded_sample():
+    stats = TimingStats(max_samples=50)
+    for value in range(1, 101):
+        stats.add({'spawn': float(value), 'not_a_phase': 1.0})
+    summary = stats.summary()
+    assert set(summary) == {'spawn'}
+    spawn = summary['spawn']
+    assert (spawn['count'], spawn['total'], spawn['mean'], spawn['max']) == (100, 5050.0, 50.5, 100.0)
+    assert len(stats.samples['spawn']) == 50
+    assert spawn['p50'] <= spawn['p90'] <= spawn['p99'] <= 100.0
+    assert TimingStats._percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+
+
+def test_batch_reports_per_job_timings(scraper):
+    results = batch(scraper)
+    assert (results['total_jobs'], results['successful_jobs']) == (4, 4)
+    for detail in results['details']:
+        assert {'queue_wait', 'spawn', 'first_output', 'harvester_exit', 'file_move', 'row_count'} <= set(detail['timings'])
+    assert results['timing_summary']['harvester_exit']['count'] == 4
+
+
+def test_progress_events_follow_each_job(scraper):
+    events = list(scraper.iter_batch_scrape(['pilpres'], '2024-01-01', '2024-02-29', preflight=False))
+    assert [event.kind for event in events] == [
+        'started', 'line', 'progress', 'finished',
+        'started', 'line', 'progress', 'finished',
+        'done',
+    ]
+    progress = events[2]
+    assert (progress.job_number, progress.total_jobs, progress.output.tweets) == (1, 2, 2)
+    assert events[1].line == 'Got 2 new tweets'
+    assert [event.completed for event in events if event.kind == 'finished'] == [1, 2]
+    done = events[-1]
+    assert (done.successful, done.failed) == (2, 0)
+    assert done.result['successful_jobs'] == 2
+
+
+def test_a_failing_progress_callback_does_not_stop_the_batch(scraper):
+    seen = []
+
+    def callback(event):
+        seen.append(event.kind)
+        raise RuntimeError('subscriber bug')
+
+    results = batch(scraper, progress_callback=callback)
+    assert results['successful_jobs'] == 4
+    assert seen.count('finished') == 4
+
+
+def test_journaled_batch_keeps_no_details_in_memory(scraper, tmp_path):
+    results = batch(scraper, journal_path=tmp_path / 'journal.jsonl')
+    assert 'details' not in results and 'files_created' not in results
+    details = list(iter_details(results))
+    assert [detail['job_number'] for detail in details] == [1, 2, 3, 4]
+    assert all(detail['success'] for detail in details)
+
+
+def test_cancel_stops_the_running_harvester_and_the_rest_of_the_batch(scraper, monkeypatch):
+    monkeypatch.setenv('FAKE_HARVEST_SLEEP', '60')
+    token = CancelToken()
+
+    def cancel_on_first_output(event):
+        if event.kind == 'progress':
+            token.cancel()
+
+    started = time.monotonic()
+    results = batch(scraper, progress_callback=cancel_on_first_output, cancel_token=token)
+    assert time.monotonic() - started < 30
+    assert results['cancelled'] is True
+    assert (results['completed_jobs'], results['successful_jobs']) == (1, 0)
+    assert results['details'][0]['result']['cancelled'] is True
+
+
+def test_a_silent_harvester_is_stopped_by_the_idle_timeout(scraper, monkeypatch):
+    monkeypatch.setenv('FAKE_HARVEST_SLEEP', '60')
+    scraper.idle_timeout = 0.5
+    started = time.monotonic()
+    results = scraper.batch_scrape(['pilpres'], '2024-01-01', '2024-01-31', preflight=False)
+    assert time.monotonic() - started < 30
+    result = results['details'][0]['result']
+    assert result['timed_out'] is True
+    assert result['reason'] == 'Timed out (no output for 0.5s)'
@@ -0,0 +1,42 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from worker_pool import WorkerPool
+
+
+class RecordingPool(WorkerPool):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.reports = []
+
+    def report(self, path, result):
+        self.reports.append((path, result))
+
+
+def test_tasks_run_in_order_and_report():
+    pool = RecordingPool()
+    for number in range(3):
+        pool.submit(f'file{number}', abs, -number)
+    assert pool.wait(timeout=30)
+    assert pool.shutdown() == 0
+    assert pool.reports == [('file0', 0), ('file1', 1), ('file2', 2)]
+
+
+def test_cancelled_shutdown_drops_queued_tasks():
+    pool = RecordingPool()
+    for number in range(3):
+        pool.submit(f'file{number}', time.sleep, 2)
+    assert not pool.wait(timeout=0.1)
+    started = time.monotonic()
+    assert pool.shutdown(cancel=True) == 3
+    assert time.monotonic() - started < 1
+
+
+def test_cancelled_shutdown_does_not_need_cancel_futures(monkeypatch):
+    # Python 3.8's ProcessPoolExecutor.shutdown has no cancel_futures argument
+    shutdown = ProcessPoolExecutor.shutdown
+    monkeypatch.setattr(ProcessPoolExecutor, 'shutdown', lambda self, wait=True: shutdown(self, wait))
+    pool = RecordingPool()
+    futures = [pool.submit(f'file{number}', time.sleep, 1) for number in range(4)]
+    assert pool.shutdown(cancel=True) == 4
+    assert futures[-1].cancelled()
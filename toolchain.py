@@ -0,0 +1,197 @@
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+from config import config, logger
+
+HARVEST_PACKAGE = 'tweet-harvest'
+HARVEST_VERSION = '2.6.1'
+CACHE_FILE = 'toolchain.json'
+INSTALL_TIMEOUT = 600
+
+
+class ToolchainError(Exception):
+    pass
+
+
+class Toolchain:
+    """Absolute paths of node and the pinned tweet-harvest entry script"""
+
+    def __init__(self, node, node_version, entry, harvest_version):
+        self.node = node
+        self.node_version = node_version
+        self.entry = entry
+        self.harvest_version = harvest_version
+
+    def command(self, args):
+        return [self.node, self.entry] + list(args)
+
+    def as_dict(self):
+        return {
+            'node': self.node,
+            'node_version': self.node_version,
+            'entry': self.entry,
+            'harvest_version': self.harvest_version,
+        }
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _package_dir(tools_dir):
+    return Path(tools_dir) / 'node_modules' / HARVEST_PACKAGE
+
+
+def _read_cache(tools_dir):
+    try:
+        with open(Path(tools_dir) / CACHE_FILE, 'r', encoding='utf-8') as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(tools_dir, cached):
+    try:
+        Path(tools_dir).mkdir(parents=True, exist_ok=True)
+        with open(Path(tools_dir) / CACHE_FILE, 'w', encoding='utf-8') as cache_file:
+            json.dump(cached, cache_file, indent=2)
+    except OSError as e:
+        logger.warning(f"Could not write toolchain cache: {e}")
+
+
+def _cache_is_fresh(cached):
+    """True while node, the entry script and its package.json are the files we resolved"""
+    try:
+        return (
+            cached['harvest_version'] == HARVEST_VERSION
+            and _fingerprint(cached['node']) == cached['node_fingerprint']
+            and _fingerprint(cached['package_json']) == cached['package_json_fingerprint']
+            and os.path.isfile(cached['entry'])
+        )
+    except (KeyError, TypeError, OSError):
+        return False
+
+
+def _find_node():
+    node = shutil.which('node')
+    if not node:
+        raise ToolchainError('Node.js not found')
+    result = subprocess.run([node, '--version'], capture_output=True, text=True, timeout=10)
+    if result.returncode != 0:
+        raise ToolchainError(f"node --version failed: {result.stderr.strip() or result.returncode}")
+    return os.path.abspath(node), result.stdout.strip()
+
+
+def _installed_entry(tools_dir):
+    """(entry script, package.json) of the installed pinned tweet-harvest, or None"""
+    package_json = _package_dir(tools_dir) / 'package.json'
+    try:
+        with open(package_json, 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != HARVEST_VERSION:
+        return None
+
+    bin_field = manifest.get('bin')
+    if isinstance(bin_field, dict):
+        bin_field = bin_field.get(HARVEST_PACKAGE) or next(iter(bin_field.values()), None)
+    if not bin_field:
+        return None
+    entry = (_package_dir(tools_dir) / bin_field).resolve()
+    if not entry.is_file():
+        return None
+    return str(entry), str(package_json.resolve())
+
+
+def _install(tools_dir):
+    npm = shutil.which('npm')
+    if not npm:
+        raise ToolchainError('npm not found, cannot install tweet-harvest')
+    Path(tools_dir).mkdir(parents=True, exist_ok=True)
+    logger.info(f"Installing {HARVEST_PACKAGE}@{HARVEST_VERSION} into {tools_dir} (first run only)")
+    result = subprocess.run(
+        [npm, 'install', '--prefix', str(tools_dir), '--no-audit', '--no-fund', '--no-save',
+         f'{HARVEST_PACKAGE}@{HARVEST_VERSION}'],
+        capture_output=True, text=True, timeout=INSTALL_TIMEOUT
+    )
+    if result.returncode != 0:
+        raise ToolchainError(f"npm install failed: {(result.stderr or result.stdout).strip()[-500:]}")
+
+
+_resolved = {}
+# Failures are remembered too, so a broken setup costs one npm install attempt per session, not one per batch
+_failed = {}
+_lock = threading.Lock()
+
+
+def resolve_toolchain(tools_dir=None, install=True, refresh=False):
+    """Locate node and a local tweet-harvest install, installing it once if needed.
+
+    The result is remembered for the process and cached in
+    tools/toolchain.json together with the size and mtime of node and the
+    package manifest, so later runs resolve without spawning anything and
+    work offline. Replacing node or reinstalling tweet-harvest invalidates
+    the cache. Raises ToolchainError when node is missing or the install
+    fails; that failure is raised again without retrying until
+    refresh=True.
+    """
+    tools_dir = Path(tools_dir or config['tools_dir'])
+    key = str(tools_dir)
+    with _lock:
+        if not refresh and key in _resolved and _cache_is_fresh(_resolved[key]):
+            return Toolchain(**_toolchain_fields(_resolved[key]))
+        if not refresh and install and key in _failed:
+            raise ToolchainError(_failed[key])
+        _failed.pop(key, None)
+        try:
+            return _resolve(tools_dir, key, install, refresh)
+        except (ToolchainError, OSError, subprocess.SubprocessError) as e:
+            if install:
+                _failed[key] = str(e)
+            raise
+
+
+def _resolve(tools_dir, key, install, refresh):
+    """Resolve from the cache file, or find node and install tweet-harvest; called under _lock"""
+    cached = None if refresh else _read_cache(tools_dir)
+    if not cached or not _cache_is_fresh(cached):
+        node, node_version = _find_node()
+        installed = _installed_entry(tools_dir)
+        if installed is None:
+            if not install:
+                raise ToolchainError(f"{HARVEST_PACKAGE}@{HARVEST_VERSION} is not installed in {tools_dir}")
+            _install(tools_dir)
+            installed = _installed_entry(tools_dir)
+            if installed is None:
+                raise ToolchainError(f"{HARVEST_PACKAGE}@{HARVEST_VERSION} installed but its entry script was not found")
+        entry, package_json = installed
+        cached = {
+            'node': node,
+            'node_version': node_version,
+            'node_fingerprint': _fingerprint(node),
+            'entry': entry,
+            'package_json': package_json,
+            'package_json_fingerprint': _fingerprint(package_json),
+            'harvest_version': HARVEST_VERSION,
+        }
+        _write_cache(tools_dir, cached)
+        logger.info(f"Resolved toolchain: node {node_version} at {node}, {HARVEST_PACKAGE} {HARVEST_VERSION} at {entry}")
+
+    _resolved[key] = cached
+    return Toolchain(**_toolchain_fields(cached))
+
+
+def _toolchain_fields(cached):
+    return {
+        'node': cached['node'],
+        'node_version': cached['node_version'],
+        'entry': cached['entry'],
+        'harvest_version': cached['harvest_version'],
+    }
@@ -0,0 +1,7 @@
+
+import re
+
+# Field formats of the CSVs tweet-harvest writes, shared by everything that parses them
+CREATED_AT_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+MENTION_PATTERN = re.compile(r'@(\w+)')
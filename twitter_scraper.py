@@ -3,18 +3,189 @@ import os
 import subprocess
 import time
 from datetime import datetime, timedelta
-import pandas as pd
 from pathlib import Path
 import calendar
-import re
+import heapq
+import math
+import queue
+import random
+import shutil
+import sqlite3
+import threading
+
+from config import config, logger, harvester_logger
+from job_journal import JobJournal
+from process_control import popen_group_kwargs, signal_process_tree, Watchdog
+from harvest_supervisor import HarvestSupervisor
+from harvest_parser import (
+    HarvestOutputParser, OUTPUT_SAVED, OUTPUT_AUTH_ERROR, OUTPUT_TWEETS, OUTPUT_SCROLL
+)
+from retry_policy import RetryPolicy, classify_failure
+from output_index import OutputIndex, output_location, query_hash
+from ingest import IngestPool
+from normalize import NormalizePool
+from arrow_handoff import arrow_available
+from storage import compress_file, count_rows, resolve_compression, COMPRESSION_NONE
+from toolchain import resolve_toolchain, ToolchainError, HARVEST_PACKAGE, HARVEST_VERSION
+from auth_guard import (
+    AuthCircuitBreaker, preflight_token, is_placeholder_token, mask_token, TOKEN_INVALID
+)
+
+# Seconds queued ingestion and typed tables get to finish after a cancel
+BACKGROUND_CANCEL_WAIT = 10.0
+
+# Phase name -> mark that closes it. Each phase runs from the latest earlier mark
+# that was recorded, so a job that never printed anything still gets a sane
+# harvester_exit duration measured from the spawn.
+TIMING_MARKS = ('ready', 'started', 'spawned', 'first_output', 'exited', 'moved', 'counted', 'slept')
+TIMING_PHASES = (
+    ('queue_wait', 'started'),
+    ('spawn', 'spawned'),
+    ('first_output', 'first_output'),
+    ('harvester_exit', 'exited'),
+    ('file_move', 'moved'),
+    ('row_count', 'counted'),
+    ('sleep', 'slept'),
+)
+
+
+class JobTimer:
+    """Monotonic timestamps for the phases of a single scraping job."""
+
+    def __init__(self, ready_at=None):
+        self.marks = {'ready': ready_at if ready_at is not None else time.monotonic()}
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = time.monotonic()
+
+    def phases(self):
+        durations = {}
+        for phase, end_mark in TIMING_PHASES:
+            if end_mark not in self.marks:
+                continue
+            end_index = TIMING_MARKS.index(end_mark)
+            for start_mark in reversed(TIMING_MARKS[:end_index]):
+                if start_mark in self.marks:
+                    durations[phase] = round(self.marks[end_mark] - self.marks[start_mark], 6)
+                    break
+        return durations
+
+    def as_dict(self):
+        return {
+            'marks': {name: round(value, 6) for name, value in self.marks.items()},
+            'phases': self.phases(),
+        }
+
+
+class TimingStats:
+    """Per-phase duration aggregates with a bounded sample for percentiles."""
+
+    def __init__(self, max_samples=4096):
+        self.max_samples = max_samples
+        self.samples = {phase: [] for phase, _ in TIMING_PHASES}
+        self.counts = {phase: 0 for phase, _ in TIMING_PHASES}
+        self.totals = {phase: 0.0 for phase, _ in TIMING_PHASES}
+        self.maxima = {phase: 0.0 for phase, _ in TIMING_PHASES}
+        self._rng = random.Random(0)
+
+    def add(self, phases):
+        for phase, value in phases.items():
+            if phase not in self.samples:
+                continue
+            self.counts[phase] += 1
+            self.totals[phase] += value
+            self.maxima[phase] = max(self.maxima[phase], value)
+            samples = self.samples[phase]
+            if len(samples) < self.max_samples:
+                samples.append(value)
+            else:
+                # Reservoir sampling keeps memory flat on very long batches
+                slot = self._rng.randrange(self.counts[phase])
+                if slot < self.max_samples:
+                    samples[slot] = value
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        if not ordered:
+            return None
+        index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+        return round(ordered[index], 6)
+
+    def summary(self):
+        summary = {}
+        for phase, _ in TIMING_PHASES:
+            count = self.counts[phase]
+            if not count:
+                continue
+            ordered = sorted(self.samples[phase])
+            summary[phase] = {
+                'count': count,
+                'total': round(self.totals[phase], 6),
+                'mean': round(self.totals[phase] / count, 6),
+                'p50': self._percentile(ordered, 50),
+                'p90': self._percentile(ordered, 90),
+                'p99': self._percentile(ordered, 99),
+                'max': round(self.maxima[phase], 6),
+            }
+        return summary
+
+
+# Event kinds emitted by batch_scrape. 'done' is only produced by iter_batch_scrape.
+EVENT_STARTED = 'started'
+EVENT_LINE = 'line'
+EVENT_PROGRESS = 'progress'
+EVENT_RETRY = 'retrying'
+EVENT_FINISHED = 'finished'
+EVENT_FAILED = 'failed'
+EVENT_DONE = 'done'
+
+
+class BatchEvent:
+    """A single progress notification from a running batch."""
+
+    __slots__ = ('kind', 'job_number', 'total_jobs', 'keyword', 'start_date', 'end_date',
+                 'line', 'output', 'result', 'completed', 'successful', 'failed')
+
+    def __init__(self, kind, job_number=None, total_jobs=None, keyword=None, start_date=None,
+                 end_date=None, line=None, output=None, result=None, completed=0, successful=0, failed=0):
+        self.kind = kind
+        self.job_number = job_number
+        self.total_jobs = total_jobs
+        self.keyword = keyword
+        self.start_date = start_date
+        self.end_date = end_date
+        self.line = line
+        self.output = output
+        self.result = result
+        self.completed = completed
+        self.successful = successful
+        self.failed = failed
+
+    def __repr__(self):
+        return f"BatchEvent({self.kind!r}, job={self.job_number}/{self.total_jobs}, keyword={self.keyword!r})"
 
-from config import config, logger
 
 class TwitterScraper:
     
     def __init__(self, auth_token=None, output_dir=None):
         self.auth_token = auth_token or config['auth_token']
+        self.backup_tokens = list(config['auth_tokens'])
+        self.auth_failure_threshold = config['auth_failure_threshold']
+        self.auth_preflight = config['auth_preflight']
         self.output_dir = output_dir or config['output_dir']
+        self.idle_timeout = config['idle_timeout']
+        self.job_timeout = config['job_timeout']
+        self.max_concurrent = config['max_concurrent_jobs']
+        self.retry_policy = RetryPolicy(
+            config['retry_max_attempts'], config['retry_base_delay'], config['retry_max_delay']
+        )
+        self.job_delay = 2
+        self.toolchain = None
+        self.compression = resolve_compression(config['output_compression'])
+        self.ingester = None
+        self.normalizer = None
+        self.normalize_skipped = False
         
         os.makedirs(self.output_dir, exist_ok=True)
         
@@ -25,214 +196,343 @@ class TwitterScraper:
         os.makedirs(self.output_dir, exist_ok=True)
         tweets_data_dir = os.path.join(self.output_dir, 'tweets-data')
         os.makedirs(tweets_data_dir, exist_ok=True)
-        try:
-            import shutil
-            files_moved = 0
-            for file in os.listdir(tweets_data_dir):
-                if file.endswith('.csv'):
-                    source = os.path.join(tweets_data_dir, file)
-                    destination = os.path.join(self.output_dir, file)
-                    if not os.path.exists(destination):
-                        shutil.copy2(source, destination)
-                        files_moved += 1
-                        try:
-                            os.remove(source)
-                        except:
-                            pass
-            
-            if files_moved > 0:
-                logger.info(f"Moved {files_moved} existing files from tweets-data to main directory")
-        except Exception as e:
-            logger.warning(f"Error when checking for existing files: {e}")
+        # Finished jobs move their file into its shard and the index right away. Anything still here is
+        # from a job that never finished; moving it into the top folder would put it outside both.
+        leftovers = [name for name in os.listdir(tweets_data_dir) if name.endswith('.csv')]
+        if leftovers:
+            logger.info(f"{len(leftovers)} unfinished harvester output(s) left in {tweets_data_dir}")
         
         logger.info(f"Output directory prepared: {self.output_dir}")
         
         return True
     
-    def check_node_installation(self):
+    def check_node_installation(self, refresh=False):
         try:
-            node_result = subprocess.run(['node', '--version'], 
-                                       capture_output=True, text=True, timeout=10, shell=True)
-            if node_result.returncode == 0:
-                node_version = node_result.stdout.strip()
-                logger.info(f"Node.js found: {node_version}")
-                
-                # Check npx
-                npx_result = subprocess.run(['cmd', '/c', 'npx', '--version'], 
-                                          capture_output=True, text=True, timeout=10)
-                if npx_result.returncode == 0:
-                    npx_version = npx_result.stdout.strip()
-                    logger.info(f"npx found: {npx_version}")
-                    return {'success': True, 'node': node_version, 'npx': npx_version}
-                else:
-                    logger.warning(f"npx check failed. Return code: {npx_result.returncode}")
-                    return {'success': False, 'error': 'npx not found or not working'}
-            else:
-                logger.error("Node.js not found")
-                return {'success': False, 'error': 'Node.js not found'}
-        except Exception as e:
+            self.toolchain = resolve_toolchain(refresh=refresh)
+        except (ToolchainError, OSError, subprocess.SubprocessError) as e:
             logger.error(f"Error checking Node.js installation: {e}")
             return {'success': False, 'error': str(e)}
+        
+        logger.info(f"Node.js found: {self.toolchain.node_version}")
+        logger.info(f"{HARVEST_PACKAGE} {self.toolchain.harvest_version} found: {self.toolchain.entry}")
+        return {'success': True, 'node': self.toolchain.node_version, 'tweet_harvest': self.toolchain.harvest_version}
+    
+    def _ensure_toolchain(self):
+        """Resolve node and tweet-harvest once; without them jobs fall back to npx"""
+        if self.toolchain is None:
+            try:
+                self.toolchain = resolve_toolchain()
+            except (ToolchainError, OSError, subprocess.SubprocessError) as e:
+                logger.warning(f"Could not set up a local {HARVEST_PACKAGE}, falling back to npx: {e}")
+        return self.toolchain
     
     def scrape_tweets(self, keyword, start_date, end_date, use_quotes=True, 
-                     limit=100, lang='id', tab='LATEST'):
+                     limit=100, lang='id', tab='LATEST', timer=None, on_line=None, cancel_token=None,
+                     idle_timeout=None, total_timeout=None, on_output=None):
+        timer = timer or JobTimer()
+        timer.mark('started')
+        
+        if cancel_token is not None and cancel_token.cancelled:
+            result = {'success': False, 'reason': 'Cancelled', 'cancelled': True, 'keyword': keyword}
+            result['timings'] = timer.as_dict()
+            return result
+        
         if not self.auth_token or self.auth_token == 'your_auth_token_here':
-            return {'success': False, 'reason': 'No valid auth token provided'}
+            result = {'success': False, 'reason': 'No valid auth token provided'}
+            result['timings'] = timer.as_dict()
+            return result
         
         self.setup_output_directory()
+        self._ensure_toolchain()
+        
+        spec = self._prepare_job(keyword, start_date, end_date, use_quotes, limit, lang, tab)
+        watchdog = self._make_watchdog(idle_timeout, total_timeout)
+        outcome = {}
+        try:
+            process = self._start_job(spec, timer, cancel_token)
+        except Exception as e:
+            return self._failed_start(spec, timer, e)
         
-        safe_keyword = re.sub(r'[^\w\s]', '_', keyword).strip()
-        safe_keyword = re.sub(r'\s+', '_', safe_keyword).lower()
-        filename = f'{safe_keyword}_{start_date.replace("-", "_")}_to_{end_date.replace("-", "_")}.csv'
+        supervisor = HarvestSupervisor()
+        try:
+            supervisor.add(
+                spec['filename'],
+                process,
+                on_line=lambda line: self._handle_output_line(spec, line, timer, on_line, on_output),
+                on_exit=lambda return_code: outcome.update(
+                    result=self._finish_job(spec, process, timer, watchdog, cancel_token)
+                ),
+                watchdog=watchdog
+            )
+            supervisor.run()
+        finally:
+            supervisor.close()
+            self.finish_background(cancelled=cancel_token is not None and cancel_token.cancelled)
+        
+        return outcome['result']
+    
+    def _make_watchdog(self, idle_timeout=None, total_timeout=None):
+        return Watchdog(
+            idle_timeout=self.idle_timeout if idle_timeout is None else idle_timeout,
+            total_timeout=self.job_timeout if total_timeout is None else total_timeout
+        )
+    
+    def _prepare_job(self, keyword, start_date, end_date, use_quotes, limit, lang, tab, token=None):
+        filename, output_path = output_location(self.output_dir, keyword, use_quotes, lang, tab, start_date, end_date)
         
         if use_quotes:
             search_keyword = f'"{keyword}" since:{start_date} until:{end_date} lang:{lang}'
         else:
             search_keyword = f'{keyword} since:{start_date} until:{end_date} lang:{lang}'
         
-        logger.info(f"Processing: {keyword} ({start_date} to {end_date})")
-        logger.info(f"Search query: {search_keyword}")
-        logger.info(f"Mode: {'Exact phrase' if use_quotes else 'Flexible search'}")
+        # An argument list instead of a shell string: no quoting of the query, no shell in between
+        harvest_args = ['-o', filename, '-s', search_keyword, '--tab', tab, '-l', str(limit),
+                        '--token', token or self.auth_token]
+        if self.toolchain is not None:
+            command = self.toolchain.command(harvest_args)
+        else:
+            command = [shutil.which('npx') or 'npx', f'{HARVEST_PACKAGE}@{HARVEST_VERSION}'] + harvest_args
         
-        original_cwd = os.getcwd()
+        return {
+            'keyword': keyword,
+            'start_date': start_date,
+            'end_date': end_date,
+            'use_quotes': use_quotes,
+            'limit': limit,
+            'lang': lang,
+            'tab': tab,
+            'filename': filename,
+            'output_path': output_path,
+            'search_query': search_keyword,
+            'command': command,
+            'parser': HarvestOutputParser(limit, query=search_keyword),
+            'process': None,
+        }
+    
+    def _start_job(self, spec, timer, cancel_token=None):
+        logger.info(f"Processing: {spec['keyword']} ({spec['start_date']} to {spec['end_date']})")
+        logger.info(f"Search query: {spec['search_query']}")
+        logger.info(f"Mode: {'Exact phrase' if spec['use_quotes'] else 'Flexible search'}")
+        shown = spec['command'][:-1] + ['[REDACTED]']
+        logger.info(f"Running: {subprocess.list2cmdline(shown)}")
         
-        os.chdir(self.output_dir)
+        # cwd instead of os.chdir: several harvesters may be starting at once
+        process = subprocess.Popen(
+            spec['command'],
+            cwd=self.output_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            **popen_group_kwargs()
+        )
+        timer.mark('spawned')
+        spec['process'] = process
+        if cancel_token is not None:
+            cancel_token.register(process)
+        return process
+    
+    def _failed_start(self, spec, timer, error):
+        logger.error(f"Error during scraping: {error}")
+        result = {'success': False, 'reason': str(error), 'start_failed': True, 'keyword': spec['keyword']}
+        result['failure'], result['failure_cause'] = classify_failure(result)
+        result['retryable'] = False
+        result['timings'] = timer.as_dict()
+        return result
+    
+    def _handle_output_line(self, spec, line, timer, on_line=None, on_output=None):
+        timer.mark('first_output')
+        output = spec['parser'].feed(line)
+        if output is None or output.kind in (OUTPUT_TWEETS, OUTPUT_SCROLL):
+            # Routine chatter and progress are sampled; anything the parser flags is always logged
+            harvester_logger.info(line)
+        elif output.kind == OUTPUT_SAVED:
+            logger.info(f"Tweet harvest save path: {output.value}")
+            logger.info(f"Final output location: {spec['output_path']}")
+        else:
+            logger.warning(line)
         
+        if (output is not None and output.kind == OUTPUT_AUTH_ERROR and not spec.get('stopping')
+                and spec['parser'].tweets == 0):
+            # Before any tweet the harvester would only wait and exit with an empty file; free the slot now
+            logger.error(f"Harvester reported an authentication problem, stopping job: {line}")
+            spec['stopping'] = True
+            signal_process_tree(spec['process'])
+        
+        if on_line is not None:
+            on_line(line)
+        if on_output is not None and output is not None:
+            on_output(output)
+    
+    def _finish_job(self, spec, process, timer, watchdog, cancel_token=None):
+        timer.mark('exited')
+        if cancel_token is not None:
+            cancel_token.unregister(process)
+        
+        parser = spec['parser']
         try:
-            full_output_path = os.path.abspath(filename)
-            if use_quotes:
-                escaped_search = search_keyword.replace('"', '\\"')
-                cmd_string = f'npx tweet-harvest@2.6.1 -o "{filename}" -s "{escaped_search}" --tab {tab} -l {limit} --token {self.auth_token}'
+            result = self._collect_output(spec, timer)
+        except Exception as e:
+            logger.error(f"Error during scraping: {e}")
+            result = {'success': False, 'reason': str(e), 'keyword': spec['keyword']}
+        
+        if not result['success']:
+            if parser.auth_error:
+                result['reason'] = f"Authentication failed: {parser.auth_error}"
+                result['auth_error'] = True
+            elif parser.invalid_query:
+                result['reason'] = f"Invalid query: {parser.invalid_query}"
+            elif parser.no_results:
+                result['reason'] = 'No tweets found'
+                result['no_results'] = True
+        
+        # Only a cancel that landed before the harvester exited interrupted this job
+        if (cancel_token is not None and cancel_token.cancelled_at is not None
+                and cancel_token.cancelled_at <= timer.marks['exited']):
+            result['cancelled'] = True
+            if result['success']:
+                result['partial'] = True
             else:
-                cmd_string = f'npx tweet-harvest@2.6.1 -o "{filename}" -s "{search_keyword}" --tab {tab} -l {limit} --token {self.auth_token}'
-            
-            logger.info(f"Running: npx tweet-harvest@2.6.1 -o \"{filename}\" -s \"{search_keyword}\" --tab {tab} -l {limit} --token [REDACTED]")
-            
-            process = subprocess.Popen(
-                cmd_string,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                shell=True
-            )
-            
-            output_lines = []
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    original_output = output.strip()
-                    
-                    if "Your tweets saved to:" in output:
-                        save_path = output.strip().split("Your tweets saved to:")[-1].strip()
-                        logger.info(f"Tweet harvest save path: {save_path}")
-                        
-                        final_path = os.path.join(self.output_dir, filename)
-                        logger.info(f"Final output location: {final_path}")
-                    else:
-                        logger.info(original_output)
-                    
-                    output_lines.append(original_output)
-            
-            return_code = process.wait()
-            full_output = '\n'.join(output_lines)
-            
-            expected_file = filename  # Direct in current directory
-            tweets_data_file = os.path.join("tweets-data", filename)  # In tweets-data subfolder
-            
-            if os.path.exists(tweets_data_file):
-                logger.info(f"File found in tweets-data subfolder, moving to main directory")
-                import shutil
-                shutil.copy2(tweets_data_file, filename)
-                
-                try:
-                    os.remove(tweets_data_file)
-                    logger.info("Removed file from tweets-data after copying")
-                except Exception as e:
-                    logger.warning(f"Could not remove file from tweets-data: {e}")
-            
-            if os.path.exists(expected_file):
+                result['reason'] = 'Cancelled'
+        elif watchdog.expired_reason:
+            # Whatever the harvester wrote before it hung is incomplete; keep it but retry the job
+            result = {
+                'success': False,
+                'reason': f"Timed out ({watchdog.expired_reason})",
+                'timed_out': True,
+                'retryable': True,
+                'keyword': spec['keyword'],
+                'start_date': spec['start_date'],
+                'end_date': spec['end_date'],
+                'partial_path': result.get('path') if result['success'] else None
+            }
+        
+        result['harvest'] = parser.stats()
+        result['timings'] = timer.as_dict()
+        if not result['success']:
+            result['failure'], result['failure_cause'] = classify_failure(result)
+            result['retryable'] = result['failure'] == 'transient'
+        return result
+    
+    def _collect_output(self, spec, timer):
+        keyword = spec['keyword']
+        filename = spec['filename']
+        expected_file = spec['output_path']
+        tweets_data_file = os.path.join(self.output_dir, "tweets-data", filename)
+        
+        saved_path = spec['parser'].saved_path
+        if not os.path.exists(tweets_data_file) and saved_path and os.path.isfile(saved_path):
+            # Trust the path the harvester reported over our guess of where it writes
+            tweets_data_file = saved_path
+        
+        if os.path.exists(tweets_data_file):
+            logger.info(f"Moving harvester output into {os.path.dirname(expected_file)}")
+            os.makedirs(os.path.dirname(expected_file), exist_ok=True)
+            shutil.move(tweets_data_file, expected_file)
+        timer.mark('moved')
+        
+        if not os.path.exists(expected_file):
+            logger.error(f"No valid output file found for {keyword}")
+            return {'success': False, 'reason': 'File not created', 'keyword': keyword}
+        
+        file_size = os.path.getsize(expected_file)
+        if file_size == 0:
+            logger.warning("File created but empty (0 bytes)")
+            return {'success': False, 'reason': 'Empty file', 'keyword': keyword}
+        
+        if self.compression != COMPRESSION_NONE:
+            try:
+                raw_size = file_size
+                expected_file = compress_file(expected_file, self.compression)
                 file_size = os.path.getsize(expected_file)
-                if file_size > 0:
-                    final_path = os.path.join(self.output_dir, filename)
-                    logger.info(f"Success! File size: {file_size} bytes")
-                    logger.info(f"File saved at: {final_path}")
-                    
-                    try:
-                        df = pd.read_csv(expected_file)
-                        num_tweets = len(df)
-                        logger.info(f"Retrieved {num_tweets} tweets")
-                    except Exception as e:
-                        logger.warning(f"Could not read CSV: {e}")
-                        num_tweets = None
-                    
-                    return {
-                        'success': True,
-                        'filename': filename,
-                        'path': os.path.join(self.output_dir, filename),
-                        'size': file_size,
-                        'tweet_count': num_tweets,
-                        'keyword': keyword,
-                        'search_query': search_keyword,
-                        'start_date': start_date,
-                        'end_date': end_date
-                    }
-                else:
-                    logger.warning("File created but empty (0 bytes)")
-                    return {'success': False, 'reason': 'Empty file', 'keyword': keyword}
-            else:
-                tweets_data_file = os.path.join("tweets-data", filename)
-                if os.path.exists(tweets_data_file):
-                    logger.info(f"File only found in tweets-data subfolder")
-                    try:
-                        import shutil
-                        shutil.copy2(tweets_data_file, filename)
-                        logger.info(f"Successfully copied file from tweets-data to main directory")
-                        
-                        file_size = os.path.getsize(filename)
-                        return {
-                            'success': True,
-                            'filename': filename,
-                            'path': os.path.join(self.output_dir, filename),
-                            'size': file_size,
-                            'keyword': keyword,
-                            'search_query': search_keyword,
-                            'start_date': start_date,
-                            'end_date': end_date
-                        }
-                    except Exception as e:
-                        logger.error(f"Error copying file: {e}")
-                
-                try:
-                    for file in os.listdir():
-                        if file.endswith('.csv') and file.lower().startswith(safe_keyword.lower()):
-                            logger.info(f"Found alternative file: {file}")
-                            file_size = os.path.getsize(file)
-                            return {
-                                'success': True, 
-                                'filename': file,
-                                'path': os.path.join(self.output_dir, file),
-                                'size': file_size,
-                                'keyword': keyword,
-                                'search_query': search_keyword,
-                                'start_date': start_date,
-                                'end_date': end_date
-                            }
-                except Exception as e:
-                    logger.error(f"Error checking for alternative files: {e}")
-                
-                logger.error(f"No valid output file found for {keyword}")
-                return {'success': False, 'reason': 'File not created', 'keyword': keyword}
-                
+                logger.info(f"Compressed with {self.compression}: {raw_size} -> {file_size} bytes")
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"Could not compress {expected_file}, keeping it uncompressed: {e}")
+        
+        logger.info(f"Success! File size: {file_size} bytes")
+        logger.info(f"File saved at: {expected_file}")
+        
+        try:
+            num_tweets = count_rows(expected_file)
+            logger.info(f"Retrieved {num_tweets} tweets")
         except Exception as e:
-            logger.error(f"Error during scraping: {e}")
-            return {'success': False, 'reason': str(e), 'keyword': keyword}
+            logger.warning(f"Could not read CSV: {e}")
+            num_tweets = None
+        timer.mark('counted')
         
-        finally:
-            os.chdir(original_cwd)
+        try:
+            replaced = OutputIndex(self.output_dir).record(
+                expected_file, keyword, spec['use_quotes'], spec['lang'], spec['tab'], spec['search_query'],
+                spec['start_date'], spec['end_date'], size=file_size, tweet_count=num_tweets
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not add {filename} to the output index: {e}")
+            replaced = []
+        for stale in replaced:
+            # The same job stored with another compression before; this file supersedes it
+            logger.info(f"Replacing earlier output {stale}")
+            self._ingest_pool().forget(self.output_dir, stale)
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove {stale}: {e}")
+        
+        self._ingest_later(expected_file, keyword, query_hash(keyword, spec['use_quotes'], spec['lang'], spec['tab']))
+        if config['normalize']:
+            self._normalize_later(expected_file)
+        
+        return {
+            'success': True,
+            'filename': os.path.basename(expected_file),
+            'path': expected_file,
+            'size': file_size,
+            'tweet_count': num_tweets,
+            'keyword': keyword,
+            'search_query': spec['search_query'],
+            'start_date': spec['start_date'],
+            'end_date': spec['end_date']
+        }
+    
+    def _normalize_later(self, path):
+        if not arrow_available():
+            if not self.normalize_skipped:
+                logger.warning("pyarrow is not installed (pip install -r requirements.txt), so no typed tables are written")
+                self.normalize_skipped = True
+            return
+        if self.normalizer is None:
+            self.normalizer = NormalizePool(config['normalize_workers'] or self.max_concurrent)
+        try:
+            self.normalizer.submit(path)
+        except RuntimeError as e:
+            logger.warning(f"Could not queue {path} for normalization: {e}")
+    
+    def _ingest_pool(self):
+        if self.ingester is None:
+            self.ingester = IngestPool()
+        return self.ingester
+    
+    def _ingest_later(self, path, keyword, query):
+        # The derived stores are filled off the supervisor thread, which keeps serving the other jobs
+        try:
+            self._ingest_pool().ingest(self.output_dir, path, keyword, query)
+        except RuntimeError as e:
+            logger.warning(f"Could not queue {path} for the search index and rollups: {e}")
+    
+    def finish_background(self, cancelled=False):
+        """Let queued ingestion and typed tables finish, then stop their worker processes.
+
+        After a cancel they get BACKGROUND_CANCEL_WAIT seconds; files still
+        queued then are dropped (the CSVs are kept, 'cli.py search --reindex'
+        catches the stores up).
+        """
+        pools = [pool for pool in (self.ingester, self.normalizer) if pool is not None]
+        self.ingester = self.normalizer = None
+        deadline = time.monotonic() + BACKGROUND_CANCEL_WAIT if cancelled else None
+        for pool in pools:
+            finished = pool.wait(None if deadline is None else max(0, deadline - time.monotonic()))
+            dropped = pool.shutdown(cancel=not finished)
+            if dropped:
+                logger.warning(f"Cancelled with {dropped} files left to {pool.action}")
     
     def generate_date_ranges(self, start_date, end_date, interval='monthly'):
         start = datetime.strptime(start_date, '%Y-%m-%d')
@@ -334,8 +634,101 @@ class TwitterScraper:
         
         return date_ranges
     
+    def iter_batch_scrape(self, *args, **kwargs):
+        """Run batch_scrape in a worker thread and yield its BatchEvents as they happen.
+
+        The last event has kind 'done' and carries the batch results. If a
+        cancel_token is passed, Ctrl+C while waiting for events cancels the
+        batch and the remaining events are still delivered.
+        """
+        cancel_token = kwargs.get('cancel_token')
+        events = queue.SimpleQueue()
+        kwargs['progress_callback'] = events.put
+        outcome = {}
+        
+        def run():
+            try:
+                outcome['results'] = self.batch_scrape(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Batch scrape failed: {e}")
+                outcome['results'] = {'success': False, 'reason': str(e)}
+            finally:
+                events.put(None)
+        
+        threading.Thread(target=run, daemon=True).start()
+        while True:
+            try:
+                event = events.get()
+            except KeyboardInterrupt:
+                if cancel_token is None:
+                    raise
+                logger.warning("Interrupted, cancelling batch")
+                cancel_token.cancel()
+                continue
+            if event is None:
+                break
+            yield event
+        results = outcome['results']
+        yield BatchEvent(
+            EVENT_DONE,
+            total_jobs=results.get('total_jobs'),
+            result=results,
+            completed=results.get('completed_jobs', 0),
+            successful=results.get('successful_jobs', 0),
+            failed=results.get('failed_jobs', 0)
+        )
+    
+    def _emit(self, callback, kind, job, results, line=None, output=None, result=None):
+        try:
+            callback(BatchEvent(
+                kind,
+                job_number=job['job_number'],
+                total_jobs=results['total_jobs'],
+                keyword=job['keyword'],
+                start_date=job['start_date'],
+                end_date=job['end_date'],
+                line=line,
+                output=output,
+                result=result,
+                completed=results['completed_jobs'],
+                successful=results['successful_jobs'],
+                failed=results['failed_jobs']
+            ))
+        except Exception as e:
+            # A broken subscriber must never take the batch down with it
+            logger.warning(f"Progress callback raised for {kind} event: {e}")
+    
     def batch_scrape(self, keywords, start_date, end_date, interval='monthly', 
-                    use_quotes=None, limit=100, lang='id', tab='LATEST'):
+                    use_quotes=None, limit=100, lang='id', tab='LATEST',
+                    progress_callback=None, journal_path=None, cancel_token=None,
+                    max_concurrent=None, retry_policy=None, preflight=None):
+        """Scrape every keyword over every date range.
+
+        Up to max_concurrent harvesters (default MAX_CONCURRENT_JOBS) run at
+        once; their output is read from this thread by a HarvestSupervisor.
+        Each slot waits job_delay seconds after its job before taking the next.
+
+        With journal_path set, per-job details, created files and errors are
+        appended to a JSON-lines journal instead of being kept in the returned
+        results, which then only hold running aggregates plus a 'journal' key.
+        
+        cancel_token (a process_control.CancelToken) stops the batch early: no
+        new jobs are started, running harvesters are killed and the results
+        cover the jobs that ran, with 'cancelled' set.
+        
+        Failures classified as transient (see retry_policy.classify_failure)
+        are retried after a jittered exponential backoff, up to the policy's
+        max_attempts, while other jobs keep running. Only a job's last attempt
+        counts towards completed/failed jobs and is recorded in the details.
+        
+        The auth token and any AUTH_TOKENS backups are preflight-checked
+        (unless preflight is False) and guarded by an AuthCircuitBreaker: a
+        token the harvester keeps rejecting is swapped for the next one and
+        its failed jobs rerun; with no token left the batch halts and
+        'auth_halted' is set. Without any real token (neither the auth token
+        nor a backup) no job is started: a result with success False and the
+        reason is returned at once, since every job would fail the same way.
+        """
 
         if not keywords:
             return {'success': False, 'reason': 'No keywords provided'}
@@ -348,7 +741,18 @@ class TwitterScraper:
         elif len(use_quotes) != len(keywords):
             return {'success': False, 'reason': 'use_quotes list must match keywords list length'}
         
+        max_concurrent = max(1, int(max_concurrent or self.max_concurrent))
+        retry_policy = retry_policy or self.retry_policy
+        
+        if all(is_placeholder_token(token) for token in [self.auth_token] + self.backup_tokens):
+            return {'success': False, 'reason': 'No valid auth token provided'}
+        tokens = self._token_pool(self.auth_preflight if preflight is None else preflight)
+        if not tokens:
+            return {'success': False, 'reason': 'Auth token rejected by preflight check, please update it in the settings'}
+        breaker = AuthCircuitBreaker(tokens, self.auth_failure_threshold)
+        
         self.setup_output_directory()
+        self._ensure_toolchain()
         
         date_ranges = self.generate_date_ranges(start_date, end_date, interval)
         if not date_ranges:
@@ -363,68 +767,268 @@ class TwitterScraper:
             'total_keywords': len(keywords),
             'total_date_ranges': len(date_ranges),
             'total_jobs': len(keywords) * len(date_ranges),
+            'max_concurrent': max_concurrent,
             'completed_jobs': 0,
             'successful_jobs': 0,
             'failed_jobs': 0,
+            'retried_attempts': 0,
+            'auth_halted': False,
+            'tokens_retired': 0,
             'files_created': [],
             'errors': [],
             'date_ranges': date_ranges,
-            'details': []
+            'details': [],
+            'timing_summary': {},
+            'cancelled': False
         }
+        timing_stats = TimingStats()
+        
+        journal = None
+        if journal_path:
+            journal = JobJournal(journal_path)
+            results['journal'] = str(journal.path)
+            for key in ('files_created', 'errors', 'details'):
+                del results[key]
+            logger.info(f"Journaling job results to {journal.path}")
         
         logger.info(f"Starting batch scrape with {len(keywords)} keywords and {len(date_ranges)} date ranges")
-        logger.info(f"Total jobs: {results['total_jobs']}")
+        logger.info(f"Total jobs: {results['total_jobs']} ({max_concurrent} at a time)")
         
-        for i, keyword in enumerate(keywords):
-            for j, (range_start, range_end) in enumerate(date_ranges):
-                job_number = i * len(date_ranges) + j + 1
-                logger.info(f"Job {job_number}/{results['total_jobs']}: {keyword} from {range_start} to {range_end}")
-                
-                job_result = self.scrape_tweets(
-                    keyword=keyword,
-                    start_date=range_start,
-                    end_date=range_end,
-                    use_quotes=use_quotes[i],
-                    limit=limit,
-                    lang=lang,
-                    tab=tab
+        def is_cancelled():
+            return cancel_token is not None and cancel_token.cancelled
+        
+        def is_stopping():
+            return is_cancelled() or breaker.tripped
+        
+        def launch(job, ready_at):
+            timer = JobTimer(ready_at)
+            timer.mark('started')
+            logger.info(f"Job {job['job_number']}/{results['total_jobs']}: {job['keyword']} from {job['start_date']} to {job['end_date']}")
+            
+            on_line = on_output = None
+            if progress_callback is not None:
+                self._emit(progress_callback, EVENT_STARTED, job, results)
+                on_line = lambda line: self._emit(progress_callback, EVENT_LINE, job, results, line=line)
+                on_output = lambda output: self._emit(progress_callback, EVENT_PROGRESS, job, results, output=output)
+            
+            job['token'] = breaker.current_token
+            spec = self._prepare_job(job['keyword'], job['start_date'], job['end_date'],
+                                     job['use_quotes'], limit, lang, tab, token=job['token'])
+            watchdog = self._make_watchdog()
+            try:
+                process = self._start_job(spec, timer, cancel_token)
+            except Exception as e:
+                job_finished(job, timer, self._failed_start(spec, timer, e))
+                return
+            
+            supervisor.add(
+                job['job_number'],
+                process,
+                on_line=lambda line: self._handle_output_line(spec, line, timer, on_line, on_output),
+                on_exit=lambda return_code: job_finished(
+                    job, timer, self._finish_job(spec, process, timer, watchdog, cancel_token)
+                ),
+                watchdog=watchdog
+            )
+        
+        def job_finished(job, timer, job_result):
+            attempt = job.get('attempt', 1)
+            job_result['attempt'] = attempt
+            if job.get('previous_failures'):
+                job_result['previous_failures'] = job['previous_failures']
+            
+            retired_before = len(breaker.retired)
+            breaker.record(job['token'], job_result)
+            results['tokens_retired'] = len(breaker.retired)
+            
+            final = False
+            if job_result.get('auth_error') and not is_stopping() and breaker.current_token != job['token']:
+                # Its token has been retired; rerun it on the next one without spending an attempt
+                requeue(job, job_result, 0)
+            elif job_result.get('auth_error') and not is_stopping() and breaker.has_backup:
+                # Hold it until we know whether the token gets retired
+                parked.append((job, job_result))
+            elif job_result['success'] or is_stopping() or not retry_policy.should_retry(job_result, attempt):
+                final = True
+                record_outcome(job, job_result)
+            else:
+                delay = retry_policy.delay(attempt)
+                results['retried_attempts'] += 1
+                logger.warning(
+                    f"Job {job['job_number']} attempt {attempt} failed ({job_result.get('failure_cause')}): "
+                    f"{job_result.get('reason', 'Unknown error')}; retrying in {delay:.0f}s"
                 )
-                
-                results['completed_jobs'] += 1
-                
-                if job_result['success']:
-                    results['successful_jobs'] += 1
-                    results['files_created'].append(job_result['path'])
+                requeue(dict(job, attempt=attempt + 1), job_result, delay)
+            
+            if parked and (len(breaker.retired) != retired_before or is_stopping() or job_result['success']):
+                settle_parked()
+            
+            # The slot stays taken while it cools down, like the old sleep between jobs
+            cooling.append((time.monotonic() + self.job_delay, job, timer, job_result, final))
+        
+        def requeue(job, job_result, delay):
+            job_result['retry_in'] = round(delay, 1)
+            retry_job = dict(job, previous_failures=job.get('previous_failures', []) + [job_result.get('reason')])
+            heapq.heappush(retries, (time.monotonic() + delay, job['job_number'], retry_job, job_result))
+            if progress_callback is not None:
+                self._emit(progress_callback, EVENT_RETRY, job, results, result=job_result)
+        
+        def settle_parked():
+            # Jobs of a retired token run again on the next one; the rest keep their failure
+            for job, job_result in parked:
+                if job['token'] in breaker.retired and not is_stopping():
+                    requeue(job, job_result, 0)
                 else:
-                    results['failed_jobs'] += 1
+                    record_outcome(job, job_result)
+                    record_detail(job, job_result)
+            parked.clear()
+        
+        def record_outcome(job, job_result):
+            results['completed_jobs'] += 1
+            
+            if job_result['success']:
+                results['successful_jobs'] += 1
+                if journal is None:
+                    results['files_created'].append(job_result['path'])
+            else:
+                results['failed_jobs'] += 1
+                if journal is None:
                     results['errors'].append({
-                        'keyword': keyword,
-                        'start_date': range_start,
-                        'end_date': range_end,
+                        'keyword': job['keyword'],
+                        'start_date': job['start_date'],
+                        'end_date': job['end_date'],
                         'reason': job_result.get('reason', 'Unknown error')
                     })
-                    logger.error(f"Job {job_number} failed: {job_result.get('reason', 'Unknown error')}")
+                logger.error(f"Job {job['job_number']} failed: {job_result.get('reason', 'Unknown error')}")
+            
+            if progress_callback is not None:
+                kind = EVENT_FINISHED if job_result['success'] else EVENT_FAILED
+                self._emit(progress_callback, kind, job, results, result=job_result)
+        
+        def release(job, timer, job_result, final):
+            timer.mark('slept')
+            job_result['timings'] = timer.as_dict()
+            timing_stats.add(job_result['timings']['phases'])
+            if final:
+                record_detail(job, job_result)
+        
+        def record_detail(job, job_result):
+            detail = {
+                'job_number': job['job_number'],
+                'keyword': job['keyword'],
+                'use_quotes': job['use_quotes'],
+                'start_date': job['start_date'],
+                'end_date': job['end_date'],
+                'success': job_result['success'],
+                'attempts': job_result.get('attempt', 1),
+                'timings': job_result['timings']['phases'],
+                'result': job_result
+            }
+            if journal is None:
+                results['details'].append(detail)
+            else:
+                journal.append(detail)
+        
+        pending = self._iter_jobs(keywords, use_quotes, date_ranges)
+        next_job = next(pending, None)
+        supervisor = HarvestSupervisor()
+        cooling = []
+        # (due, job_number, job, last_result) heap of failed attempts waiting for their backoff
+        retries = []
+        # Auth failures on a token that has not been retired yet (only with backup tokens)
+        parked = []
+        slot_free_at = time.monotonic()
+        
+        try:
+            while True:
+                now = time.monotonic()
+                if cooling:
+                    still_cooling = []
+                    for entry in cooling:
+                        if is_stopping() or now >= entry[0]:
+                            release(*entry[1:])
+                            slot_free_at = now
+                        else:
+                            still_cooling.append(entry)
+                    cooling = still_cooling
                 
-                results['details'].append({
-                    'job_number': job_number,
-                    'keyword': keyword,
-                    'use_quotes': use_quotes[i],
-                    'start_date': range_start,
-                    'end_date': range_end,
-                    'success': job_result['success'],
-                    'result': job_result
-                })
+                # Due retries go first; a retry still backing off never holds up fresh jobs
+                while not is_stopping() and len(supervisor) + len(cooling) < max_concurrent:
+                    if retries and retries[0][0] <= now:
+                        due, _, retry_job, _ = heapq.heappop(retries)
+                        launch(retry_job, max(slot_free_at, due))
+                    elif next_job is not None:
+                        launch(next_job, slot_free_at)
+                        next_job = next(pending, None)
+                    else:
+                        break
+                
+                if not supervisor and not cooling and (is_stopping() or (next_job is None and not retries)):
+                    break
                 
-                time.sleep(2)
+                timeout = 0.25
+                if cooling:
+                    timeout = min(timeout, min(entry[0] for entry in cooling) - now)
+                if retries and len(supervisor) + len(cooling) < max_concurrent:
+                    timeout = min(timeout, retries[0][0] - now)
+                supervisor.poll(max(0, timeout))
+        finally:
+            supervisor.close()
+        
+        settle_parked()
+        self.finish_background(cancelled=is_cancelled())
+        # A cancel or halt leaves retries unscheduled; their last attempt is the final word
+        for _, _, retry_job, last_result in sorted(retries):
+            previous_job = dict(retry_job, attempt=last_result['attempt'])
+            record_outcome(previous_job, last_result)
+            record_detail(previous_job, last_result)
         
         batch_end_time = datetime.now()
         results['end_time'] = batch_end_time
         results['total_duration'] = (batch_end_time - batch_start_time).total_seconds()
+        results['timing_summary'] = timing_stats.summary()
+        
+        if is_cancelled():
+            results['cancelled'] = True
+            logger.warning(f"Batch cancelled after {results['completed_jobs']}/{results['total_jobs']} jobs")
+        
+        if breaker.tripped:
+            results['auth_halted'] = True
+            results['overall_success'] = False
+            results['halt_reason'] = 'Every auth token was rejected by the harvester; update the token and run the remaining jobs again'
+            logger.error(f"Batch halted after {results['completed_jobs']}/{results['total_jobs']} jobs: {results['halt_reason']}")
         
         if results['failed_jobs'] == results['total_jobs']:
             results['overall_success'] = False
         
         logger.info(f"Batch scrape completed. Success: {results['successful_jobs']}/{results['total_jobs']}")
         logger.info(f"Total duration: {results['total_duration']} seconds")
+        for phase, stats in results['timing_summary'].items():
+            logger.info(f"Timing {phase}: p50={stats['p50']}s p90={stats['p90']}s max={stats['max']}s total={stats['total']}s")
         
         return results
+    
+    def _token_pool(self, preflight=True):
+        """The primary token followed by the backups, minus any a preflight check rejects"""
+        tokens = []
+        for token in [self.auth_token] + self.backup_tokens:
+            if is_placeholder_token(token) or token in tokens:
+                continue
+            if preflight:
+                status, detail = preflight_token(token)
+                logger.info(f"Preflight for auth token {mask_token(token)}: {status} ({detail})")
+                if status == TOKEN_INVALID:
+                    continue
+            tokens.append(token)
+        return tokens
+    
+    def _iter_jobs(self, keywords, use_quotes, date_ranges):
+        for i, keyword in enumerate(keywords):
+            for j, (range_start, range_end) in enumerate(date_ranges):
+                yield {
+                    'job_number': i * len(date_ranges) + j + 1,
+                    'keyword': keyword,
+                    'use_quotes': use_quotes[i],
+                    'start_date': range_start,
+                    'end_date': range_end
+                }
@@ -0,0 +1,71 @@
+
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from config import logger, setup_worker_logging
+
+
+class WorkerPool:
+    """Runs follow-up work on finished output files in worker processes, so scraping never waits on it.
+
+    The pool is created on first use; with one worker, tasks run in the
+    order they were submitted. wait() blocks until everything submitted so
+    far is done, shutdown() stops the workers and is called at the end of a
+    batch. Failures are logged, the raw CSV stays the source of truth.
+    """
+
+    action = 'process'
+
+    def __init__(self, max_workers=1):
+        self.max_workers = max(1, int(max_workers))
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, path, function, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     initializer=setup_worker_logging)
+            future = self._executor.submit(function, *args)
+            self._pending.add(future)
+        future.add_done_callback(lambda done: self._finished(path, done))
+        return future
+
+    def _finished(self, path, future):
+        with self._lock:
+            self._pending.discard(future)
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.warning(f"Could not {self.action} {path}: {e}")
+            return
+        self.report(path, result)
+
+    def report(self, path, result):
+        pass
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def wait(self, timeout=None):
+        """Wait for the tasks submitted so far; False if some were still running at the timeout"""
+        with self._lock:
+            pending = list(self._pending)
+        return not pending or not wait(pending, timeout=timeout).not_done
+
+    def shutdown(self, cancel=False):
+        """Stop the workers; cancel=True drops queued tasks and does not wait for the running ones"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            pending = list(self._pending) if cancel else []
+        # Cancelled by hand: shutdown(cancel_futures=...) needs Python 3.9
+        for future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=not cancel)
+        return len(pending)